@@ -0,0 +1,38 @@
+from fastapi import APIRouter, HTTPException, Request
+
+from app.auth import verify_token
+from app.manager import ModelLoadError, ModelLoadInProgress, model_manager
+
+admin_router = APIRouter(prefix="/admin")
+
+
+@admin_router.get("/model")
+def model_status(request: Request):
+    verify_token(request)
+    return model_manager.status()
+
+
+@admin_router.post("/model/reload")
+def reload_model(request: Request, version: str = None):
+    """Load ``version`` (or what the stage now points to) and hot swap it in."""
+    verify_token(request)
+    try:
+        model_manager.load(version, blocking=False)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ModelLoadInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ModelLoadError as e:
+        raise HTTPException(status_code=500, detail=f"Reload failed: {e}")
+    return model_manager.status()
+
+
+@admin_router.post("/model/rollback")
+def rollback_model(request: Request):
+    """Swap the previous model back in. Polling pauses until the next reload."""
+    verify_token(request)
+    try:
+        model_manager.rollback()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return model_manager.status()
@@ -0,0 +1,160 @@
+import io
+import json
+from collections import Counter
+
+import numpy as np
+
+from app.codec import loads
+from app.model import FEATURE_NAMES
+
+ARROW_CONTENT_TYPE = "application/vnd.apache.arrow.stream"
+NUMPY_CONTENT_TYPE = "application/x-npy"
+
+
+class BatchValidationError(ValueError):
+    def __init__(self, message, status_code=422):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def parse_batch(body, content_type):
+    """Decode a batch request body into an ``(n_rows, n_features)`` float matrix.
+
+    Supported bodies:
+
+    - JSON array of objects ``[{"sepal_length": ..., ...}, ...]`` or of rows
+      ``[[5.1, 3.5, 1.4, 0.2], ...]``
+    - columnar JSON ``{"sepal_length": [...], "sepal_width": [...], ...}``
+    - Arrow IPC stream (``application/vnd.apache.arrow.stream``) with one
+      column per feature
+    - ``.npy`` array (``application/x-npy``) with columns in feature order
+
+    Returns the matrix and the name of the detected format.
+    """
+    content_type = (content_type or "application/json").split(";")[0].strip()
+
+    if content_type == ARROW_CONTENT_TYPE:
+        return _parse_arrow(body), "arrow"
+    if content_type == NUMPY_CONTENT_TYPE:
+        return _parse_numpy(body), "numpy"
+    if content_type == "application/json":
+        return _parse_json(body)
+
+    raise BatchValidationError(
+        f"Unsupported content type: {content_type}", status_code=415
+    )
+
+
+def validate_rows(rows, bounds=None):
+    """Check shape and finiteness of the whole matrix in one vectorized pass.
+
+    ``bounds`` is the ``(low, high)`` per feature from the model's schema.
+    """
+    if rows.ndim != 2 or rows.shape[1] != len(FEATURE_NAMES):
+        raise BatchValidationError(
+            f"Expected rows of {len(FEATURE_NAMES)} features "
+            f"({', '.join(FEATURE_NAMES)}), got shape {list(rows.shape)}"
+        )
+    if rows.shape[0] == 0:
+        raise BatchValidationError("Batch is empty")
+
+    bad = np.flatnonzero(~np.isfinite(rows).all(axis=1))
+    if bad.size:
+        raise BatchValidationError(
+            f"{bad.size} rows contain missing or non-finite values "
+            f"(first: {bad[:10].tolist()})"
+        )
+
+    if bounds is not None:
+        low, high = bounds
+        bad = np.flatnonzero(~((rows >= low) & (rows <= high)).all(axis=1))
+        if bad.size:
+            raise BatchValidationError(
+                f"{bad.size} rows have features outside the model's range "
+                f"(first: {bad[:10].tolist()})"
+            )
+    return rows
+
+
+def summarize(predictions):
+    """Count predictions per class for the batch log row."""
+    return {str(label): count for label, count in Counter(predictions).items()}
+
+
+def iter_json_predictions(predictions, chunk_size=10_000):
+    """Yield ``{"predictions": [...]}`` in chunks so large batches stream out."""
+    yield b'{"predictions":['
+    for start in range(0, len(predictions), chunk_size):
+        chunk = json.dumps(predictions[start:start + chunk_size])[1:-1]
+        if start:
+            chunk = "," + chunk
+        yield chunk.encode()
+    yield b"]}"
+
+
+def _parse_json(body):
+    try:
+        payload = loads(body)
+    except ValueError as e:
+        raise BatchValidationError(f"Invalid JSON body: {e}")
+
+    if isinstance(payload, dict):
+        missing = [f for f in FEATURE_NAMES if f not in payload]
+        if missing:
+            raise BatchValidationError(f"Missing columns: {', '.join(missing)}")
+        columns = [payload[f] for f in FEATURE_NAMES]
+        if not all(isinstance(c, list) for c in columns) or (
+            len({len(c) for c in columns}) != 1
+        ):
+            raise BatchValidationError("Columns must be arrays of equal length")
+        return _to_matrix(columns).T, "columnar"
+
+    if isinstance(payload, list):
+        if payload and all(isinstance(row, dict) for row in payload):
+            try:
+                records = [[row[f] for f in FEATURE_NAMES] for row in payload]
+            except KeyError as e:
+                raise BatchValidationError(f"Missing field {e} in batch rows")
+            return _to_matrix(records), "records"
+        return _to_matrix(payload), "rows"
+
+    raise BatchValidationError("Batch body must be a JSON array or object")
+
+
+def _parse_arrow(body):
+    # Imported on first use to keep pyarrow out of the app's startup time
+    try:
+        import pyarrow as pa
+    except ImportError:  # Arrow bodies are optional
+        raise BatchValidationError(
+            "Arrow bodies require pyarrow to be installed", status_code=415
+        )
+    try:
+        table = pa.ipc.open_stream(body).read_all()
+    except Exception as e:
+        raise BatchValidationError(f"Invalid Arrow stream: {e}")
+
+    missing = [f for f in FEATURE_NAMES if f not in table.column_names]
+    if missing:
+        raise BatchValidationError(f"Missing columns: {', '.join(missing)}")
+    return np.column_stack(
+        [table.column(f).to_numpy().astype(np.float64) for f in FEATURE_NAMES]
+    )
+
+
+def _parse_numpy(body):
+    try:
+        rows = np.load(io.BytesIO(body), allow_pickle=False)
+    except Exception as e:
+        raise BatchValidationError(f"Invalid .npy body: {e}")
+    try:
+        return rows.astype(np.float64, copy=False)
+    except (TypeError, ValueError):
+        raise BatchValidationError(f"Non-numeric .npy dtype: {rows.dtype}")
+
+
+def _to_matrix(values):
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise BatchValidationError("All feature values must be numbers")
@@ -0,0 +1,100 @@
+import asyncio
+
+import numpy as np
+
+from app.config import BATCH_MAX_SIZE, BATCH_MAX_WAIT_US
+
+
+class InferenceBatcher:
+    """Coalesces concurrent single-row predictions into one vectorized call.
+
+    Each ``submit`` parks its feature row, with the model the request chose,
+    and awaits a future. A collector task waits until ``max_batch_size`` rows
+    are pending or ``max_wait_us`` microseconds have passed, stacks the rows of
+    each model into one NumPy matrix, runs ``predict_fn(model, rows)`` on it in
+    the default executor and resolves every future with its own result. A
+    model swapped in while rows wait does not score them. Rows arriving while
+    a batch is being predicted are collected into the next one. ``executor``
+    (a BoundedExecutor) replaces the default executor.
+    """
+
+    def __init__(
+        self,
+        predict_fn,
+        max_batch_size=BATCH_MAX_SIZE,
+        max_wait_us=BATCH_MAX_WAIT_US,
+        executor=None,
+    ):
+        self.predict_fn = predict_fn
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_us / 1_000_000
+
+        self._pending = []
+        self._full = None
+        self._task = None
+        self._loop = None
+
+    async def submit(self, row, model=None):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # A new event loop (e.g. a fresh TestClient) starts a fresh window
+            self._loop = loop
+            self._pending = []
+            self._full = None
+            self._task = None
+
+        future = loop.create_future()
+        self._pending.append((row, model, future))
+
+        if len(self._pending) >= self.max_batch_size and self._full is not None:
+            if not self._full.done():
+                self._full.set_result(None)
+
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            if len(self._pending) < self.max_batch_size:
+                self._full = loop.create_future()
+                await asyncio.wait([self._full], timeout=self.max_wait)
+                self._full = None
+
+            batch = self._pending[: self.max_batch_size]
+            del self._pending[: self.max_batch_size]
+
+            # Usually one group, more while a model is swapped in or canaried
+            groups = {}
+            for item in batch:
+                groups.setdefault(id(item[1]), []).append(item)
+            for group in groups.values():
+                await self._predict(loop, group)
+
+    async def _predict(self, loop, batch):
+        model = batch[0][1]
+        rows = np.asarray([row for row, _, _ in batch], dtype=np.float64)
+        try:
+            if self.executor is not None:
+                predictions = await self.executor.run(self.predict_fn, model, rows)
+            else:
+                predictions = await loop.run_in_executor(
+                    None, self.predict_fn, model, rows
+                )
+            if len(predictions) != len(batch):
+                raise ValueError(
+                    f"Model returned {len(predictions)} predictions "
+                    f"for {len(batch)} rows"
+                )
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, _, future), prediction in zip(batch, predictions):
+            if not future.done():
+                future.set_result(prediction)
@@ -0,0 +1,139 @@
+"""JSON encoding and single-row request parsing for the prediction endpoints.
+
+orjson is used when it is installed and the standard library otherwise, both
+produce compact UTF-8 bytes. A /predict body is parsed once: plain numeric
+bodies are validated with NumPy and their bytes are reused for the request
+log, anything else goes through the pydantic model so clients get the same
+422 errors as before.
+"""
+import json
+
+import numpy as np
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+
+from app.model import FEATURE_NAMES
+
+try:
+    import orjson
+except ImportError:  # The stdlib json module is the fallback
+    orjson = None
+
+
+def numpy_default(obj):
+    """Convert NumPy scalars and arrays, which predictions often are."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def loads(body):
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def dumps(obj):
+    """Serialize ``obj`` to compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(
+            obj, default=numpy_default, option=orjson.OPT_SERIALIZE_NUMPY
+        )
+    return json.dumps(obj, default=numpy_default, separators=(",", ":")).encode()
+
+
+def to_json(value):
+    """JSON text for a log column. Bytes are taken as already serialized."""
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode()
+    return dumps(value).decode()
+
+
+def check_row(row, low=-np.inf, high=np.inf):
+    """Reject non-finite features or ones outside ``[low, high]`` in one
+    vectorized pass. The bounds are scalars or one value per feature, the
+    model's schema ranges when it has one.
+    """
+    bad = np.flatnonzero(~(np.isfinite(row) & (row >= low) & (row <= high)))
+    if bad.size:
+        low = np.broadcast_to(low, row.shape)
+        high = np.broadcast_to(high, row.shape)
+        raise RequestValidationError(
+            [
+                {
+                    "type": "value_error",
+                    "loc": ("body", FEATURE_NAMES[i]),
+                    "msg": (
+                        "Value must be a finite number"
+                        if np.isinf(low[i]) and np.isinf(high[i])
+                        else f"Value must be between {low[i]:g} and {high[i]:g}"
+                    ),
+                    # Starlette refuses to render NaN and infinity
+                    "input": row[i].item() if np.isfinite(row[i]) else str(row[i]),
+                }
+                for i in bad
+            ]
+        )
+
+
+def parse_features(body, schema):
+    """Parse and validate a single-row body.
+
+    Returns ``(features, row, body_json)``: the features in FEATURE_NAMES
+    order, the same values as a float64 array and the input as JSON bytes
+    for the log. ``schema`` is the pydantic model used for bodies the fast
+    path does not accept (numeric strings, extra or missing fields).
+    """
+    if not body:
+        raise RequestValidationError(
+            [
+                {
+                    "type": "missing",
+                    "loc": ("body",),
+                    "msg": "Field required",
+                    "input": None,
+                }
+            ]
+        )
+    try:
+        payload = loads(body)
+    except ValueError as e:
+        raise RequestValidationError(
+            [
+                {
+                    "type": "json_invalid",
+                    "loc": ("body",),
+                    "msg": "JSON decode error",
+                    "input": {},
+                    "ctx": {"error": str(e)},
+                }
+            ]
+        )
+
+    values = None
+    if isinstance(payload, dict) and len(payload) == len(FEATURE_NAMES):
+        values = [payload.get(name) for name in FEATURE_NAMES]
+        # bool is an int subclass, pydantic decides what to do with it
+        if not all(type(v) in (float, int) for v in values):
+            values = None
+
+    if values is None:
+        try:
+            data = schema.model_validate(payload)
+        except ValidationError as e:
+            raise RequestValidationError(
+                [
+                    {**error, "loc": ("body", *error["loc"])}
+                    for error in e.errors(include_url=False)
+                ]
+            )
+        values = [getattr(data, name) for name in FEATURE_NAMES]
+        body = None
+
+    row = np.array(values, dtype=np.float64)
+    # Only finiteness here, ranges come from the model (see check_bounds)
+    check_row(row)
+    features = dict(zip(FEATURE_NAMES, row.tolist()))
+    return features, row, body if body is not None else dumps(features)
@@ -13,6 +13,117 @@ MODEL_VERSION = os.getenv("MODEL_VERSION", None)
 # token
 API_TOKEN = os.getenv("API_TOKEN", "supersecret")
 
+# "eager" loads the model at import, "background" loads it after startup
+# while /health reports warming
+MODEL_LOAD_MODE = os.getenv("MODEL_LOAD_MODE", "eager")
+
+# Registry models are downloaded here so restarts skip the registry round
+# trip. Stage-resolved models are re-resolved once older than the max age
+# (seconds), pinned versions never expire. An empty dir disables the cache.
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", "models/.cache")
+MODEL_CACHE_MAX_AGE = float(os.getenv("MODEL_CACHE_MAX_AGE", "3600"))
+
+# Seconds between checks of the registry stage (or local model file) for a
+# new model to hot swap in, 0 disables polling
+MODEL_POLL_INTERVAL = float(os.getenv("MODEL_POLL_INTERVAL", "30"))
+
+# Models served under /models/{name}/{version}/predict are loaded on demand
+# and evicted least recently used first once they exceed the memory budget.
+# "local" versions load from MODEL_POOL_LOCAL_DIR/{name}. An empty allow
+# list serves any registered model.
+MODEL_POOL_MAX_MB = float(os.getenv("MODEL_POOL_MAX_MB", "512"))
+MODEL_POOL_LOCAL_DIR = os.getenv("MODEL_POOL_LOCAL_DIR", "models")
+MODEL_POOL_ALLOWED = [
+    name.strip()
+    for name in os.getenv("MODEL_POOL_ALLOWED", "").split(",")
+    if name.strip()
+]
+
+# Shadow scoring: this fraction of /predict traffic is also scored by
+# SHADOW_VERSION of MODEL_NAME on a separate thread pool and compared
+SHADOW_VERSION = os.getenv("SHADOW_VERSION")
+SHADOW_FRACTION = float(os.getenv("SHADOW_FRACTION", "0"))
+SHADOW_WORKERS = int(os.getenv("SHADOW_WORKERS", "2"))
+SHADOW_MAX_PENDING = int(os.getenv("SHADOW_MAX_PENDING", "1000"))
+
+# Canary: this share of /predict traffic is served by CANARY_VERSION
+CANARY_VERSION = os.getenv("CANARY_VERSION")
+CANARY_WEIGHT = float(os.getenv("CANARY_WEIGHT", "0"))
+
+# Replace supported sklearn models with a compiled NumPy predictor
+FAST_PATH = os.getenv("FAST_PATH", "false").lower() == "true"
+
+# Prediction cache, 0 entries disables it. TTL in seconds, 0 never expires.
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "300"))
+
+# Micro-batching of /predict requests
+PREDICT_BATCHING = os.getenv("PREDICT_BATCHING", "false").lower() == "true"
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "64"))
+BATCH_MAX_WAIT_US = int(os.getenv("BATCH_MAX_WAIT_US", "1000"))
+
+# /predict/batch responses larger than this many rows are streamed
+BATCH_STREAM_THRESHOLD = int(os.getenv("BATCH_STREAM_THRESHOLD", "10000"))
+
+# Bounded executors: "inference" runs model predictions, "io" hands request
+# logs to the log writer. Requests arriving while either has WORKERS busy and
+# QUEUE_SIZE more waiting get 503 with Retry-After.
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(os.cpu_count() or 1)))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "64"))
+IO_WORKERS = int(os.getenv("IO_WORKERS", "4"))
+IO_QUEUE_SIZE = int(os.getenv("IO_QUEUE_SIZE", "1024"))
+OVERLOAD_RETRY_AFTER = int(os.getenv("OVERLOAD_RETRY_AFTER", "1"))
+
+# Requests are rejected when a feature lies further outside the model's
+# training range than this fraction of the range (needs a feature schema)
+FEATURE_RANGE_MARGIN = float(os.getenv("FEATURE_RANGE_MARGIN", "0.5"))
+
+# Seconds between background deep health checks (0: check on every /health)
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "30"))
+
+# Pre-fork server (python -m app.serve)
+SERVE_HOST = os.getenv("SERVE_HOST", "0.0.0.0")
+SERVE_PORT = int(os.getenv("SERVE_PORT", "8000"))
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", "1"))
+
+# Request log writer
+LOG_DB_PATH = os.getenv("LOG_DB_PATH", "logs/logs.db")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "500"))
+LOG_FLUSH_INTERVAL_MS = int(os.getenv("LOG_FLUSH_INTERVAL_MS", "200"))
+LOG_BACKPRESSURE = os.getenv("LOG_BACKPRESSURE", "block")
+LOG_SPILL_PATH = os.getenv("LOG_SPILL_PATH", "logs/spill.jsonl")
+
+# Where log rows are written: sqlite, jsonl and/or segments. With several,
+# every row goes to each of them and /metrics reads from the first.
+LOG_SINKS = [
+    name.strip() for name in os.getenv("LOG_SINKS", "sqlite").split(",") if name.strip()
+]
+# When written rows are forced to disk: always, interval or never
+LOG_FSYNC = os.getenv("LOG_FSYNC", "interval")
+LOG_FSYNC_INTERVAL_MS = int(os.getenv("LOG_FSYNC_INTERVAL_MS", "1000"))
+LOG_JSONL_PATH = os.getenv("LOG_JSONL_PATH", "logs/requests.jsonl")
+LOG_JSONL_MAX_BYTES = int(os.getenv("LOG_JSONL_MAX_BYTES", str(64 * 1024 * 1024)))
+LOG_SEGMENT_DIR = os.getenv("LOG_SEGMENT_DIR", "logs/segments")
+LOG_SEGMENT_ROWS = int(os.getenv("LOG_SEGMENT_ROWS", "50000"))
+LOG_SEGMENT_SECONDS = int(os.getenv("LOG_SEGMENT_SECONDS", "60"))
+
+# SQLite access shared by the logger, /metrics and /health
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", "4"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "30000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))
+SQLITE_STATEMENT_CACHE = int(os.getenv("SQLITE_STATEMENT_CACHE", "256"))
+
+# Request log retention: daily tables, archived to Parquet once expired
+LOG_PARTITIONING = os.getenv("LOG_PARTITIONING", "daily")
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "7"))
+LOG_ARCHIVE_DIR = os.getenv("LOG_ARCHIVE_DIR", "logs/archive")
+# Archives older than this are deleted, 0 keeps them forever
+LOG_ARCHIVE_RETENTION_DAYS = int(os.getenv("LOG_ARCHIVE_RETENTION_DAYS", "90"))
+# Seconds between maintenance runs, 0 disables the background thread
+LOG_MAINTENANCE_INTERVAL = int(os.getenv("LOG_MAINTENANCE_INTERVAL", "3600"))
+
 
 # Validate MODEL_SOURCE
 if MODEL_SOURCE not in ("LOCAL", "REMOTE"):
@@ -29,3 +140,62 @@ if MODEL_NAME is None:
 if MODEL_SOURCE == "REMOTE" and MODEL_VERSION is None:
     print("MODEL_VERSION is required when MODEL_SOURCE is 'REMOTE'.")
     sys.exit(1)
+
+# Validate MODEL_LOAD_MODE
+if MODEL_LOAD_MODE not in ("eager", "background"):
+    print("Invalid MODEL_LOAD_MODE. Must be 'eager' or 'background'.")
+    sys.exit(1)
+
+# Validate traffic fractions
+if not (0 <= SHADOW_FRACTION <= 1 and 0 <= CANARY_WEIGHT <= 1):
+    print("SHADOW_FRACTION and CANARY_WEIGHT must be between 0 and 1.")
+    sys.exit(1)
+
+# Validate executors
+if INFERENCE_WORKERS < 1 or IO_WORKERS < 1:
+    print("INFERENCE_WORKERS and IO_WORKERS must be at least 1.")
+    sys.exit(1)
+
+if INFERENCE_QUEUE_SIZE < 0 or IO_QUEUE_SIZE < 0:
+    print("INFERENCE_QUEUE_SIZE and IO_QUEUE_SIZE must not be negative.")
+    sys.exit(1)
+
+if FEATURE_RANGE_MARGIN < 0:
+    print("FEATURE_RANGE_MARGIN must not be negative.")
+    sys.exit(1)
+
+if HEALTH_CHECK_INTERVAL < 0:
+    print("HEALTH_CHECK_INTERVAL must not be negative.")
+    sys.exit(1)
+
+# Validate LOG_BACKPRESSURE
+if LOG_BACKPRESSURE not in ("block", "drop", "spill"):
+    print("Invalid LOG_BACKPRESSURE. Must be 'block', 'drop' or 'spill'.")
+    sys.exit(1)
+
+# Validate log sinks
+if not LOG_SINKS or any(s not in ("sqlite", "jsonl", "segments") for s in LOG_SINKS):
+    print("Invalid LOG_SINKS. Must list 'sqlite', 'jsonl' or 'segments'.")
+    sys.exit(1)
+
+if len(set(LOG_SINKS)) != len(LOG_SINKS):
+    print("LOG_SINKS must not list a sink twice.")
+    sys.exit(1)
+
+if LOG_FSYNC not in ("always", "interval", "never"):
+    print("Invalid LOG_FSYNC. Must be 'always', 'interval' or 'never'.")
+    sys.exit(1)
+
+# Validate log retention
+if LOG_PARTITIONING not in ("daily", "none"):
+    print("Invalid LOG_PARTITIONING. Must be 'daily' or 'none'.")
+    sys.exit(1)
+
+if LOG_RETENTION_DAYS < 1:
+    print("LOG_RETENTION_DAYS must be at least 1.")
+    sys.exit(1)
+
+# Validate SQLite access
+if SQLITE_READ_POOL_SIZE < 1:
+    print("SQLITE_READ_POOL_SIZE must be at least 1.")
+    sys.exit(1)
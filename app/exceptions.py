@@ -2,14 +2,37 @@ from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 import json
-from app.logger import log_request
+from app.config import OVERLOAD_RETRY_AFTER
+from app.executors import Overloaded, io_executor
+from app.logger import log_request, log_writer
+
+
+async def read_input(request: Request):
+    if request.method != "POST":
+        return {}
+    try:
+        return await request.json()
+    except ValueError:
+        # Binary or malformed bodies are not echoed into the log
+        return {}
+
+
+async def log_error(**kwargs):
+    """Log from the IO pool, dropping the row if that pool is full.
+
+    Logging inline could block the event loop on a full log queue.
+    """
+    try:
+        await io_executor.run(log_request, **kwargs)
+    except Overloaded:
+        log_writer.drop()
 
 
 async def handle_validation_error(request: Request, exc: RequestValidationError):
-    input_data = await request.json() if request.method == "POST" else {}
+    input_data = await read_input(request)
     error_detail = exc.errors()
 
-    log_request(
+    await log_error(
         request=request,
         input_data=input_data,
         prediction=None,
@@ -23,10 +46,10 @@ async def handle_validation_error(request: Request, exc: RequestValidationError)
 
 
 async def handle_http_exception(request: Request, exc: HTTPException):
-    input_data = await request.json() if request.method == "POST" else {}
+    input_data = await read_input(request)
     error_detail = {"status_code": exc.status_code, "detail": exc.detail}
 
-    log_request(
+    await log_error(
         request=request,
         input_data=input_data,
         prediction=None,
@@ -36,4 +59,26 @@ async def handle_http_exception(request: Request, exc: HTTPException):
         details=None,
     )
 
-    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers=exc.headers,
+    )
+
+
+async def handle_overloaded(request: Request, exc: Overloaded):
+    await log_error(
+        request=request,
+        input_data={},
+        prediction=None,
+        status="error",
+        error=str(exc),
+        source="overload",
+        details=None,
+    )
+
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(OVERLOAD_RETRY_AFTER)},
+    )
@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import (
+    INFERENCE_QUEUE_SIZE,
+    INFERENCE_WORKERS,
+    IO_QUEUE_SIZE,
+    IO_WORKERS,
+)
+
+
+class Overloaded(RuntimeError):
+    """An executor queue is full, the request should be retried later."""
+
+
+class BoundedExecutor:
+    """A thread pool that refuses work instead of queueing it without bound.
+
+    At most ``workers`` tasks run at once and ``queue_size`` more wait for a
+    thread. Anything beyond that is rejected with Overloaded right away, so a
+    saturated server answers quickly instead of letting latency grow. Threads
+    are started on first use, so forked workers do not inherit them.
+    """
+
+    def __init__(self, name, workers, queue_size):
+        self.name = name
+        self.workers = workers
+        self.queue_size = queue_size
+        self.submitted = 0
+        self.started = 0
+        self.completed = 0
+        self.rejected = 0
+        self.running = 0
+        self.in_flight = 0
+        self.queue_wait_total = 0.0
+
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def full(self):
+        with self._lock:
+            return self.in_flight >= self.workers + self.queue_size
+
+    def admit(self):
+        """Raise Overloaded if new work would be rejected now."""
+        if self.full():
+            with self._lock:
+                self.rejected += 1
+            raise Overloaded(f"The {self.name} queue is full")
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue ``fn`` and return its concurrent Future, or raise Overloaded."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise Overloaded(f"The {self.name} queue is full")
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix=self.name
+                )
+            executor = self._executor
+            self.submitted += 1
+            self.in_flight += 1
+        try:
+            future = executor.submit(self._call, time.perf_counter(), fn, args, kwargs)
+        except Exception:
+            self._done(None)
+            raise
+        # Also called when the task is cancelled before it started
+        future.add_done_callback(self._done)
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        """Run ``fn`` on the pool without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def stats(self):
+        with self._lock:
+            wait = self.queue_wait_total / self.started if self.started else None
+            return {
+                "workers": self.workers,
+                "queue_capacity": self.queue_size,
+                "queue_depth": self.in_flight - self.running,
+                "running": self.running,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "mean_queue_wait_ms": round(wait * 1000, 4) if self.started else None,
+            }
+
+    def _call(self, queued_at, fn, args, kwargs):
+        with self._lock:
+            self.running += 1
+            self.started += 1
+            self.queue_wait_total += time.perf_counter() - queued_at
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def _done(self, future):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+        self._slots.release()
+
+
+inference_executor = BoundedExecutor(
+    "inference", INFERENCE_WORKERS, INFERENCE_QUEUE_SIZE
+)
+io_executor = BoundedExecutor("io", IO_WORKERS, IO_QUEUE_SIZE)
+
+
+def admit():
+    """Admission control: reject a request up front if either pool is full."""
+    inference_executor.admit()
+    io_executor.admit()
+
+
+def executor_stats():
+    return {
+        "inference": inference_executor.stats(),
+        "io": io_executor.stats(),
+    }
@@ -0,0 +1,191 @@
+import os
+import pickle
+
+import numpy as np
+import yaml
+
+# Rows walked together by a compiled forest; bounds the (rows x trees) buffers
+FOREST_CHUNK_ROWS = 256
+# Larger batches are handed to the raw sklearn estimator
+FOREST_FAST_MAX_ROWS = 2048
+PARITY_PROBE_ROWS = 512
+
+
+class LinearPredictor:
+    """LogisticRegression reduced to one matrix multiply and an argmax."""
+
+    kind = "linear"
+
+    def __init__(self, coef, intercept, classes):
+        self.weights = np.ascontiguousarray(np.asarray(coef, dtype=np.float64).T)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.classes = np.asarray(classes)
+        self.n_features = self.weights.shape[0]
+
+    def predict(self, rows):
+        scores = np.asarray(rows, dtype=np.float64) @ self.weights + self.intercept
+        if scores.shape[1] == 1:
+            # Binary models have a single decision function column
+            return self.classes[(scores[:, 0] > 0).astype(np.intp)]
+        return self.classes[scores.argmax(axis=1)]
+
+
+class ForestPredictor:
+    """RandomForestClassifier flattened into contiguous node arrays.
+
+    All trees are concatenated into one set of ``feature``/``threshold``/
+    ``children`` arrays. Leaves point to themselves, so every row walks every
+    tree for at most ``max_depth`` vectorized steps and then reads the leaf
+    class probabilities, which are averaged over trees as sklearn does.
+
+    The vectorized walk wins for the small batches the API sees. Batches
+    above ``FOREST_FAST_MAX_ROWS`` go to the raw estimator, whose compiled
+    traversal is faster at that size and still skips the pyfunc wrapper.
+    """
+
+    kind = "forest"
+
+    def __init__(self, trees, classes, n_features, estimator=None):
+        left, right, feature, threshold, value, roots = [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            n_nodes = tree.node_count
+            is_leaf = tree.children_left == -1
+            own = np.arange(n_nodes)
+            left.append(np.where(is_leaf, own, tree.children_left) + offset)
+            right.append(np.where(is_leaf, own, tree.children_right) + offset)
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            counts = tree.value[:, 0, :]
+            value.append(counts / counts.sum(axis=1, keepdims=True))
+            roots.append(offset)
+            offset += n_nodes
+
+        left = np.concatenate(left)
+        right = np.concatenate(right)
+        # children[2 * node + went_left] -> next node, one gather per step
+        self.children = np.stack([right, left], axis=1).ravel().astype(np.intp)
+        self.is_leaf = left == np.arange(len(left))
+        self.feature = np.concatenate(feature).astype(np.intp)
+        self.threshold = np.concatenate(threshold).astype(np.float64)
+        # Per-class leaf values pre-divided by the tree count, so the forest
+        # average is a row sum of one contiguous gather per class
+        self.value = np.ascontiguousarray(np.concatenate(value).T) / len(trees)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = max(tree.max_depth for tree in trees)
+        self.classes = np.asarray(classes)
+        self.n_features = n_features
+        self.estimator = estimator
+
+    def predict_proba(self, rows):
+        # sklearn compares float32 features against float64 thresholds
+        rows = np.asarray(rows, dtype=np.float32).astype(np.float64)
+        out = np.empty((rows.shape[0], len(self.classes)))
+        for start in range(0, rows.shape[0], FOREST_CHUNK_ROWS):
+            chunk = rows[start:start + FOREST_CHUNK_ROWS]
+            out[start:start + len(chunk)] = self._proba_chunk(chunk)
+        return out
+
+    def predict(self, rows):
+        if self.estimator is not None and len(rows) > FOREST_FAST_MAX_ROWS:
+            return np.asarray(self.estimator.predict(np.asarray(rows)))
+        return self.classes[self.predict_proba(rows).argmax(axis=1)]
+
+    def _proba_chunk(self, rows):
+        n_rows, n_features = rows.shape
+        flat_rows = rows.ravel()
+        row_base = (np.arange(n_rows) * n_features)[:, None]
+        nodes = np.broadcast_to(self.roots, (n_rows, len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            values = np.take(flat_rows, row_base + np.take(self.feature, nodes))
+            go_left = values <= np.take(self.threshold, nodes)
+            nodes = np.take(self.children, nodes * 2 + go_left)
+            if np.take(self.is_leaf, nodes).all():
+                break
+
+        proba = np.empty((n_rows, len(self.classes)))
+        for k, class_value in enumerate(self.value):
+            proba[:, k] = np.take(class_value, nodes).sum(axis=1)
+        return proba
+
+
+def load_sklearn_estimator(path):
+    """Load the raw estimator from an MLflow model directory's sklearn flavor."""
+    with open(os.path.join(path, "MLmodel")) as f:
+        flavors = yaml.safe_load(f).get("flavors", {})
+    if "sklearn" not in flavors:
+        raise ValueError(f"No sklearn flavor in {path}/MLmodel")
+    with open(os.path.join(path, flavors["sklearn"]["pickled_model"]), "rb") as f:
+        return pickle.load(f)
+
+
+def unwrap_estimator(model):
+    """Return the sklearn estimator behind a pyfunc model (or the model itself)."""
+    impl = getattr(model, "_model_impl", model)
+    return getattr(impl, "sklearn_model", impl)
+
+
+def compile_estimator(estimator):
+    """Build a fast predictor for supported estimators, or None."""
+    name = type(estimator).__name__
+    if name == "LogisticRegression" and hasattr(estimator, "coef_"):
+        return LinearPredictor(
+            estimator.coef_, estimator.intercept_, estimator.classes_
+        )
+    if name == "RandomForestClassifier" and hasattr(estimator, "estimators_"):
+        if getattr(estimator, "n_outputs_", 1) != 1:
+            return None
+        return ForestPredictor(
+            [tree.tree_ for tree in estimator.estimators_],
+            estimator.classes_,
+            estimator.n_features_in_,
+            estimator=estimator,
+        )
+    return None
+
+
+def probe_rows(compiled, n_rows=PARITY_PROBE_ROWS, seed=0):
+    """Random rows spanning the region where the model's decisions change."""
+    rng = np.random.default_rng(seed)
+    if isinstance(compiled, ForestPredictor):
+        splits = ~compiled.is_leaf
+        low = np.full(compiled.n_features, -1.0)
+        high = np.full(compiled.n_features, 1.0)
+        for f in range(compiled.n_features):
+            used = compiled.threshold[splits & (compiled.feature == f)]
+            if used.size:
+                low[f], high[f] = used.min() - 1.0, used.max() + 1.0
+        return rng.uniform(low, high, size=(n_rows, compiled.n_features))
+    return rng.normal(0.0, 5.0, size=(n_rows, compiled.n_features))
+
+
+def parity_check(original, compiled, rows=None):
+    """True when the compiled predictor agrees with the original on every row."""
+    if rows is None:
+        rows = probe_rows(compiled)
+    expected = np.asarray(original.predict(rows))
+    actual = compiled.predict(rows)
+    return bool(np.array_equal(expected.astype(str), actual.astype(str)))
+
+
+def build_fast_path(model, rows=None):
+    """Swap ``model`` for a compiled predictor when it is supported and agrees."""
+    estimator = unwrap_estimator(model)
+    compiled = compile_estimator(estimator)
+    if compiled is None:
+        print(f"Fast path not available for {type(estimator).__name__}")
+        return model
+
+    try:
+        agrees = parity_check(model, compiled, rows)
+    except Exception as e:
+        print(f"Fast path parity check failed to run: {e}")
+        return model
+    if not agrees:
+        print("Fast path predictions differ from the original model, not using it")
+        return model
+
+    # Keep MLflow metadata (model uuid, signature) reachable from the predictor
+    compiled.metadata = getattr(model, "metadata", None)
+    print(f"Using compiled {compiled.kind} fast path for {type(estimator).__name__}")
+    return compiled
@@ -1,35 +1,180 @@
-from app.model import predict
+import threading
+import time
+from datetime import datetime, timezone
+
 from fastapi import APIRouter
-import sqlite3
+from fastapi.responses import JSONResponse
+
+from app.config import HEALTH_CHECK_INTERVAL
+from app.logger import log_sink, log_writer
+from app.manager import model_manager
+from app.model import WARM_UP_ROW, model_warming
+from app.serve import worker_readiness
 
 
 health_router = APIRouter()
 
+# Worst status first, the overall status is the worst component status
+STATUS_ORDER = ["error", "warming", "ok"]
 
-@health_router.get("/health")
-def health_check():
-    # Check SQLite DB and logs table
-    try:
-        conn = sqlite3.connect("logs/logs.db")
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name='logs'"
-        )
-        if not cursor.fetchone():
-            raise Exception("Table 'logs' does not exist")
-    except Exception as e:
-        return {"status": "error", "component": "sqlite", "detail": str(e)}
 
-    # Check model prediction
+def check_log_sink():
+    # The SQLite logs table by default
+    log_sink.check()
+    return "ok", None
+
+
+def check_model():
+    # The model is still loading in the background
+    if model_warming.is_set():
+        return "warming", None
+    served = model_manager.current
+    if served is None or served.model is None:
+        raise RuntimeError("No model is loaded")
+    # Called directly: app.model.predict turns model errors into "error"
+    served.model.predict([WARM_UP_ROW])
+    return "ok", f"version {served.version}"
+
+
+def check_workers():
+    # In pre-fork mode every worker must have loaded and warmed the model
+    readiness = worker_readiness()
+    if readiness is not None and readiness[0] < readiness[1]:
+        return "warming", f"{readiness[0]}/{readiness[1]} workers ready"
+    return "ok", None
+
+
+CHECKS = {"log_sink": check_log_sink, "model": check_model, "workers": check_workers}
+
+
+def run_check(check):
+    started = time.perf_counter()
     try:
-        dummy_input = {
-            "sepal_length": 5.1,
-            "sepal_width": 3.5,
-            "petal_length": 1.4,
-            "petal_width": 0.2,
-        }
-        _ = predict(None, dummy_input)
+        status, detail = check()
     except Exception as e:
-        return {"status": "error", "component": "model", "detail": str(e)}
+        status, detail = "error", str(e)
+    return {
+        "status": status,
+        "detail": detail,
+        "checked_at": datetime.now(timezone.utc).isoformat(),
+        "latency_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+class HealthMonitor:
+    """Runs the deep health checks on a schedule and caches their results.
+
+    A background thread runs every check in ``CHECKS`` each ``interval``
+    seconds, so /health answers from memory however often it is probed.
+    Results are rechecked on read when they are missing, older than two
+    intervals (the thread is not running) or still warming, so /health
+    reports the model as soon as it is ready. ``interval`` 0 disables the
+    thread and checks on every read.
+    """
+
+    def __init__(self, interval=HEALTH_CHECK_INTERVAL):
+        self.interval = interval
+        self.runs = 0
+        self.results = {}
+        self.last_run = None
 
-    return {"status": "ok", "components": ["sqlite", "model"]}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval <= 0:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="health-monitor", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping.set()
+        thread.join(timeout)
+
+    def run_once(self):
+        results = {name: run_check(check) for name, check in CHECKS.items()}
+        with self._lock:
+            self.results = results
+            self.last_run = time.monotonic()
+            self.runs += 1
+        return results
+
+    def snapshot(self):
+        """The cached results, checked now if they cannot be reused."""
+        with self._lock:
+            results, last_run = self.results, self.last_run
+        stale = last_run is None or time.monotonic() - last_run > 2 * self.interval
+        if stale or overall_status(results) == "warming":
+            results = self.run_once()
+        return results
+
+    def _run(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Health check run failed: {e}")
+            if self._stopping.wait(self.interval):
+                return
+
+
+def overall_status(results):
+    statuses = [result["status"] for result in results.values()]
+    return next((s for s in STATUS_ORDER if s in statuses), "ok")
+
+
+health_monitor = HealthMonitor()
+
+
+@health_router.get("/livez")
+def liveness():
+    """The process is serving requests. Checks nothing else."""
+    return {"status": "ok"}
+
+
+@health_router.get("/readyz")
+def readiness():
+    """Ready for traffic: model warmed in every worker, request logs accepted."""
+    reasons = []
+    if model_warming.is_set() or model_manager.model is None:
+        reasons.append("model not loaded")
+    workers = worker_readiness()
+    if workers is not None and workers[0] < workers[1]:
+        reasons.append(f"{workers[0]}/{workers[1]} workers ready")
+    if not log_writer.accepting():
+        reasons.append("log queue full")
+    # The last scheduled check, the sink itself is not touched here
+    sink = health_monitor.results.get("log_sink")
+    if sink is not None and sink["status"] == "error":
+        reasons.append(f"log sink failing: {sink['detail']}")
+
+    if reasons:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "not_ready", "detail": "; ".join(reasons)},
+            headers={"Retry-After": "1"},
+        )
+    return {"status": "ready"}
+
+
+@health_router.get("/health")
+def health_check():
+    results = health_monitor.snapshot()
+    body = {"status": overall_status(results), "components": results}
+    # Name the first failing component, as /health always has
+    for name, result in results.items():
+        if result["status"] == body["status"] != "ok":
+            body["component"] = name
+            body["detail"] = result["detail"]
+            break
+    return body
@@ -0,0 +1,287 @@
+import functools
+import math
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bounds (seconds) of the latency histogram buckets, last one is +Inf
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    math.inf,
+)
+
+# Rolling windows are built from fixed slots of SLOT_SECONDS each
+SLOT_SECONDS = 10
+WINDOWS = {"1m": 60, "5m": 300, "1h": 3600}
+RING_SLOTS = max(WINDOWS.values()) // SLOT_SECONDS
+
+
+class _Shard:
+    """Per-thread series storage. Only its owning thread ever writes to it."""
+
+    def __init__(self):
+        self.totals = {}
+        self.ring = [None] * RING_SLOTS
+
+
+class ShardedHistogram:
+    """Latency histogram that never takes a lock on the hot path.
+
+    Every thread records into its own shard (an event loop counts as one
+    thread), so concurrent observers never contend. Readers sum the shards.
+    Besides lifetime totals each shard keeps a ring of ``SLOT_SECONDS`` slots
+    used for the rolling 1m/5m/1h windows.
+    """
+
+    def __init__(self, name, documentation, labelnames, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = buckets
+        self.clock = time.time
+
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._new_shard()
+
+        idx = bisect_left(self.buckets, value)
+        self._record(shard.totals, labels, idx, value)
+
+        epoch = int(self.clock() // SLOT_SECONDS)
+        slot = shard.ring[epoch % RING_SLOTS]
+        if slot is None or slot[0] != epoch:
+            slot = (epoch, {})
+            shard.ring[epoch % RING_SLOTS] = slot
+        self._record(slot[1], labels, idx, value)
+
+    def collect(self, window=None):
+        """Sum shards into ``{labels: [bucket_counts, sum, count]}``.
+
+        Without ``window`` the lifetime totals are returned, otherwise only
+        slots newer than ``window`` seconds.
+        """
+        merged = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+
+        if window is None:
+            for shard in shards:
+                self._merge(merged, dict(shard.totals))
+            return merged
+
+        oldest = int(self.clock() // SLOT_SECONDS) - window // SLOT_SECONDS
+        for shard in shards:
+            for slot in list(shard.ring):
+                if slot is not None and slot[0] > oldest:
+                    self._merge(merged, dict(slot[1]))
+        return merged
+
+    def _new_shard(self):
+        shard = _Shard()
+        self._local.shard = shard
+        with self._shards_lock:
+            self._shards.append(shard)
+        return shard
+
+    def _record(self, series, labels, idx, value):
+        entry = series.get(labels)
+        if entry is None:
+            entry = [[0] * len(self.buckets), 0.0, 0]
+            series[labels] = entry
+        entry[0][idx] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def _merge(self, merged, series):
+        for labels, (counts, total, count) in series.items():
+            entry = merged.setdefault(labels, [[0] * len(self.buckets), 0.0, 0])
+            entry[0] = [a + b for a, b in zip(entry[0], counts)]
+            entry[1] += total
+            entry[2] += count
+
+
+def quantile(buckets, counts, q):
+    """Estimate a quantile from bucket counts by linear interpolation."""
+    total = sum(counts)
+    if total == 0:
+        return None
+    rank = q * total
+    seen = 0
+    lower = 0.0
+    for upper, count in zip(buckets, counts):
+        if count and seen + count >= rank:
+            if math.isinf(upper):
+                return lower
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+        lower = upper
+    return lower
+
+
+stage_latency = ShardedHistogram(
+    "mlops_stage_latency_seconds",
+    "Time spent per serving stage",
+    ["stage"],
+)
+
+request_latency = ShardedHistogram(
+    "mlops_request_duration_seconds",
+    "End-to-end HTTP request time by route, status and model version",
+    ["route", "status", "model_version"],
+)
+
+
+def timed(stage):
+    """Decorator recording the wrapped function's duration under ``stage``."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stage_latency.observe(time.perf_counter() - start, stage)
+
+        return wrapper
+
+    return decorator
+
+
+class TimingMiddleware:
+    """ASGI middleware timing every HTTP request.
+
+    It stamps ``request.state.received_at`` so handlers can measure the time
+    spent before they run (body parsing and validation), and records the total
+    duration labelled with the matched route, status code and model version.
+    ``model_version`` may be a callable returning the version being served.
+    """
+
+    def __init__(self, app, model_version=None):
+        self.app = app
+        self.model_version = model_version
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        scope.setdefault("state", {})["received_at"] = start
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            version = self.model_version
+            if callable(version):
+                version = version()
+            request_latency.observe(
+                time.perf_counter() - start,
+                getattr(route, "path", "unmatched"),
+                str(status["code"]),
+                str(version),
+            )
+
+
+def observe_since(stage, start):
+    stage_latency.observe(time.perf_counter() - start, stage)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_bound(bound):
+    return "+Inf" if math.isinf(bound) else repr(bound)
+
+
+def render_histogram(histogram):
+    lines = [
+        f"# HELP {histogram.name} {histogram.documentation}",
+        f"# TYPE {histogram.name} histogram",
+    ]
+    for labels, (counts, total, count) in sorted(histogram.collect().items()):
+        cumulative = 0
+        for bound, bucket_count in zip(histogram.buckets, counts):
+            cumulative += bucket_count
+            le = ("le", _format_bound(bound))
+            label_str = _format_labels(histogram.labelnames, labels, le)
+            lines.append(f"{histogram.name}_bucket{label_str} {cumulative}")
+        label_str = _format_labels(histogram.labelnames, labels)
+        lines.append(f"{histogram.name}_sum{label_str} {total}")
+        lines.append(f"{histogram.name}_count{label_str} {count}")
+    return lines
+
+
+def render_samples(name, documentation, kind, samples):
+    """Render a counter or gauge from ``(labels_dict, value)`` samples."""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        label_str = _format_labels(list(labels), list(labels.values()))
+        lines.append(f"{name}{label_str} {value}")
+    return lines
+
+
+def summarize_window(histogram, seconds):
+    """Rate, mean and percentiles (ms) for each series over a rolling window."""
+    summary = []
+    for labels, (counts, total, count) in sorted(histogram.collect(seconds).items()):
+        entry = dict(zip(histogram.labelnames, labels))
+        entry.update(
+            {
+                "count": count,
+                "rate_per_sec": round(count / seconds, 4),
+                "mean_ms": round(total / count * 1000, 4) if count else None,
+            }
+        )
+        for name, q in (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+            value = quantile(histogram.buckets, counts, q)
+            entry[name] = round(value * 1000, 4) if value is not None else None
+        summary.append(entry)
+    return summary
+
+
+def rolling_summary():
+    return {
+        window: {
+            "stages": summarize_window(stage_latency, seconds),
+            "requests": summarize_window(request_latency, seconds),
+        }
+        for window, seconds in WINDOWS.items()
+    }
@@ -1,11 +1,48 @@
+import atexit
 import json
+import os
+import queue
 import sqlite3
-from app.config import MODEL_STAGE, MODEL_NAME, MODEL_SOURCE, MODEL_VERSION
+import threading
+import time
+import traceback
+from collections import Counter
+from datetime import datetime, timezone
 
-conn = sqlite3.connect("logs/logs.db", check_same_thread=False)
-conn.execute(
-    """
-    CREATE TABLE IF NOT EXISTS logs (
+from app.codec import to_json
+from app.instrumentation import timed
+from app.sinks import (
+    LOG_COLUMNS,
+    STATUS_INDEX,
+    FanoutSink,
+    JsonlSink,
+    LogSink,
+    SegmentSink,
+)
+from app.storage import get_pool
+from app.manager import model_manager
+from app.config import (
+    MODEL_STAGE,
+    MODEL_NAME,
+    MODEL_SOURCE,
+    LOG_DB_PATH,
+    LOG_QUEUE_SIZE,
+    LOG_BATCH_SIZE,
+    LOG_FLUSH_INTERVAL_MS,
+    LOG_BACKPRESSURE,
+    LOG_SPILL_PATH,
+    LOG_PARTITIONING,
+    LOG_SINKS,
+)
+
+# Rows go to one table per UTC day (logs_YYYYMMDD) with LOG_PARTITIONING=daily.
+# The original "logs" table is kept as the oldest partition, so databases
+# written before partitioning stay readable.
+LEGACY_TABLE = "logs"
+PARTITION_PREFIX = "logs_"
+
+CREATE_LOGS_TABLE = """
+    CREATE TABLE IF NOT EXISTS {table} (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         timestamp TEXT,
         method TEXT,
@@ -22,9 +59,469 @@ conn.execute(
         model_version TEXT
     );
 """
-)
 
+# Aggregates kept in sync by triggers so /metrics never scans the logs tables.
+# Dropping an archived partition does not fire the delete trigger, so the
+# counters keep counting every row ever logged.
+CREATE_COUNTERS_TABLE = """
+    CREATE TABLE IF NOT EXISTS log_counters (
+        name TEXT PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0
+    );
+"""
+
+CREATE_COUNTER_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS {table}_counters_insert AFTER INSERT ON {table}
+    BEGIN
+        INSERT INTO log_counters (name, count) VALUES ('total', 1)
+            ON CONFLICT(name) DO UPDATE SET count = count + 1;
+        INSERT INTO log_counters (name, count)
+            VALUES ('status:' || COALESCE(NEW.status, 'none'), 1)
+            ON CONFLICT(name) DO UPDATE SET count = count + 1;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS {table}_counters_delete AFTER DELETE ON {table}
+    BEGIN
+        UPDATE log_counters SET count = count - 1
+            WHERE name IN ('total', 'status:' || COALESCE(OLD.status, 'none'));
+    END;
+    """,
+]
+
+BACKFILL_COUNTERS = """
+    INSERT INTO log_counters (name, count)
+    SELECT 'total', COUNT(*) FROM logs
+    UNION ALL
+    SELECT 'status:' || COALESCE(status, 'none'), COUNT(*) FROM logs GROUP BY status
+"""
+
+CREATE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_{table}_timestamp ON {table} (timestamp);",
+    "CREATE INDEX IF NOT EXISTS idx_{table}_status ON {table} (status);",
+    "CREATE INDEX IF NOT EXISTS idx_{table}_source ON {table} (source);",
+]
+
+# Highest id handed out by a partition that has since been archived
+LAST_ID_COUNTER = "last_id"
+
+INSERT_INTO = f"""
+    INSERT INTO {{table}} ({", ".join(LOG_COLUMNS)})
+    VALUES ({", ".join("?" for _ in LOG_COLUMNS)})
+"""
+
+INSERT_LOG = INSERT_INTO.format(table=LEGACY_TABLE)
+
+
+def partition_name(timestamp, partitioning=LOG_PARTITIONING):
+    """Table for a row logged at ``timestamp`` ("YYYY-MM-DD HH:MM:SS", UTC)."""
+    if partitioning != "daily":
+        return LEGACY_TABLE
+    return PARTITION_PREFIX + timestamp[:10].replace("-", "")
+
+
+def partition_day(table):
+    """The UTC date of a daily partition, or None for the legacy table."""
+    if not table.startswith(PARTITION_PREFIX):
+        return None
+    return datetime.strptime(table[len(PARTITION_PREFIX):], "%Y%m%d").date()
+
+
+def list_partitions(db):
+    """Log tables present in ``db``, newest first and the legacy table last."""
+    names = [
+        row[0]
+        for row in db.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' "
+            "AND (name = ? OR name GLOB 'logs_[0-9]*')",
+            (LEGACY_TABLE,),
+        ).fetchall()
+    ]
+    daily = sorted((n for n in names if n != LEGACY_TABLE), reverse=True)
+    return daily + [n for n in names if n == LEGACY_TABLE]
+
+
+def create_partition(db, table):
+    """Create a log table with its indexes and counter triggers."""
+    db.execute(CREATE_LOGS_TABLE.format(table=table))
+    for statement in CREATE_INDEXES + CREATE_COUNTER_TRIGGERS:
+        db.execute(statement.format(table=table))
+
+
+def claim_ids(db, table):
+    """Continue ``table``'s ids after the highest id of any partition.
+
+    Every partition hands out ids from the same sequence, so ids grow across
+    partitions in insertion order and /metrics can page through them with
+    one cursor. Must run in the transaction that inserts the rows.
+    """
+    high = db.execute(
+        "SELECT MAX(seq) FROM (SELECT seq FROM sqlite_sequence "
+        "UNION ALL SELECT count FROM log_counters WHERE name = ?)",
+        (LAST_ID_COUNTER,),
+    ).fetchone()[0] or 0
+    updated = db.execute(
+        "UPDATE sqlite_sequence SET seq = ? WHERE name = ?", (high, table)
+    ).rowcount
+    if not updated:
+        db.execute(
+            "INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table, high)
+        )
+
+
+def ensure_schema(db):
+    """Create the logs table, its indexes and counters in one transaction."""
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        has_counters = db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='log_counters'"
+        ).fetchone()
+        db.execute(CREATE_COUNTERS_TABLE)
+        create_partition(db, LEGACY_TABLE)
+        if not has_counters:
+            # Existing databases start with counters matching their rows
+            db.execute(BACKFILL_COUNTERS)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
+def init_db(path=LOG_DB_PATH):
+    """Create the log database so read-only connections can open it."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with get_pool(path).connection() as db:
+        ensure_schema(db)
+
+
+def recent_logs(db, where_clause, params, limit, offset=0):
+    """Newest matching rows across all log partitions.
+
+    Ids grow across partitions, so partitions are read newest first and
+    reading stops as soon as enough rows were found.
+    """
+    wanted = limit + offset
+    rows = []
+    for table in list_partitions(db):
+        query = f"""
+            SELECT * FROM {table}
+            {where_clause}
+            ORDER BY id DESC
+            LIMIT ?
+        """
+        try:
+            found = db.execute(query, params + [wanted - len(rows)]).fetchall()
+        except sqlite3.OperationalError:
+            # Archived by maintenance since it was listed
+            continue
+        rows.extend(dict(row) for row in found)
+        if len(rows) >= wanted:
+            break
+    return rows[offset:offset + limit]
+
+
+class SQLiteSink(LogSink):
+    """Writes rows to the SQLite log database, one transaction per batch.
+
+    With daily partitioning rows go to the table of the day they were logged.
+    WAL with ``synchronous=NORMAL`` only syncs on checkpoints, so ``always``
+    switches the writer to ``synchronous=FULL`` and ``interval`` runs a
+    passive checkpoint every ``fsync_interval`` seconds.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_path=LOG_DB_PATH, partitioning=LOG_PARTITIONING, **kwargs):
+        super().__init__(**kwargs)
+        self.db_path = db_path
+        self.partitioning = partitioning
+        # Created now so read-only connections can open it
+        init_db(db_path)
+        self.pool = get_pool(db_path)
+        # Read-only connections (rows are sqlite3.Row), never blocked by writes
+        self.read_pool = get_pool(db_path, readonly=True)
+        # Partitions this sink has created or seen, so it creates each once
+        self._partitions = set()
+
+    def open(self):
+        # The connection is shared with maintenance, so it is only held per batch
+        with self.pool.connection() as db:
+            ensure_schema(db)
+            if self.fsync == "always":
+                db.execute("PRAGMA synchronous=FULL")
+
+    def write(self, rows):
+        tables = {}
+        for row in rows:
+            tables.setdefault(partition_name(row[0], self.partitioning), []).append(row)
+        with self.pool.connection() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                for table, table_rows in tables.items():
+                    if table not in self._partitions:
+                        create_partition(db, table)
+                    claim_ids(db, table)
+                    db.executemany(INSERT_INTO.format(table=table), table_rows)
+                db.commit()
+            except Exception:
+                db.rollback()
+                # A partition may have been archived meanwhile, recreate it
+                self._partitions.clear()
+                raise
+        self._partitions.update(tables)
+        self._unsynced = True
+        if self.fsync == "always":
+            # Already synced by the commit
+            self._synced()
+
+    def poll(self, force=False):
+        if self._sync_due(force):
+            with self.pool.connection() as db:
+                db.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            self._synced()
+
+    def close(self):
+        self.poll(force=True)
+
+    def read(self, status=None, source=None, limit=25, offset=0, cursor=None):
+        filters = []
+        params = []
+        if status is not None:
+            filters.append("status = ?")
+            params.append(status)
+        if source is not None:
+            filters.append("source = ?")
+            params.append(source)
+        # Keyset pagination: ids only grow, so "older than the cursor" is an
+        # index range scan instead of skipping OFFSET rows
+        if cursor is not None:
+            filters.append("id < ?")
+            params.append(cursor)
+        where_clause = "WHERE " + " AND ".join(filters) if filters else ""
+
+        with self.read_pool.connection() as db:
+            # One read transaction, so counts and rows come from the same snapshot
+            db.execute("BEGIN")
+            # Counts are maintained by triggers on insert, so this is a single lookup
+            counters = {
+                row["name"]: row["count"]
+                for row in db.execute("SELECT name, count FROM log_counters")
+            }
+            return counters, recent_logs(db, where_clause, params, limit, offset)
+
+    def check(self):
+        with self.read_pool.connection(timeout=5) as db:
+            table = db.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name='logs'"
+            ).fetchone()
+        if not table:
+            raise Exception("Table 'logs' does not exist")
+
+    def stats(self):
+        with self.read_pool.connection() as db:
+            partitions = list_partitions(db)
+        return {
+            **super().stats(),
+            "partitions": partitions,
+            "read_pool": self.read_pool.stats(),
+        }
+
+
+SINKS = {"sqlite": SQLiteSink, "jsonl": JsonlSink, "segments": SegmentSink}
+
+
+def build_sink(names=LOG_SINKS):
+    """The sink for ``names``, fanning out when there are several."""
+    sinks = [SINKS[name]() for name in names]
+    return sinks[0] if len(sinks) == 1 else FanoutSink(sinks)
+
+
+class LogWriter:
+    """Drains queued log rows into a log sink from a single background thread.
+
+    Rows are handed to ``sink`` (SQLite at ``db_path`` by default) one batch at
+    a time. A batch is flushed once it reaches ``batch_size`` rows or
+    ``flush_interval`` seconds after its first row arrived, whichever comes
+    first. When the queue is full the ``backpressure`` policy decides what
+    happens to new rows:
+
+    - ``block``: wait for space (no rows are lost)
+    - ``drop``: discard the row and count it
+    - ``spill``: append the row as JSON to ``spill_path``
+    """
+
+    def __init__(
+        self,
+        db_path=LOG_DB_PATH,
+        queue_size=LOG_QUEUE_SIZE,
+        batch_size=LOG_BATCH_SIZE,
+        flush_interval=LOG_FLUSH_INTERVAL_MS / 1000,
+        backpressure=LOG_BACKPRESSURE,
+        spill_path=LOG_SPILL_PATH,
+        partitioning=LOG_PARTITIONING,
+        sink=None,
+    ):
+        self.sink = sink or SQLiteSink(db_path, partitioning)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.backpressure = backpressure
+        self.spill_path = spill_path
+
+        self.written = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.failed = 0
+        self.status_counts = Counter()
+
+        self._lock = threading.Lock()
+        # Spill writes are serialized apart from _lock, so a slow disk does
+        # not hold up submit() or stats() in request threads
+        self._spill_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
 
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="log-writer", daemon=True
+            )
+            self._thread.start()
+
+    def submit(self, row):
+        """Queue a row for writing. Returns False if it did not reach the queue."""
+        self.start()
+
+        if self.backpressure == "block":
+            self.queue.put(row)
+            return True
+
+        try:
+            self.queue.put_nowait(row)
+            return True
+        except queue.Full:
+            if self.backpressure == "spill":
+                self._spill([row])
+            else:
+                self.drop()
+            return False
+
+    def drop(self, count=1):
+        """Count rows that were given up on before reaching the queue."""
+        with self._lock:
+            self.dropped += count
+
+    def accepting(self):
+        """Whether a new row would reach the queue now without waiting."""
+        return not self._stopping.is_set() and not self.queue.full()
+
+    def flush(self):
+        """Block until every queued row has been written (or failed)."""
+        if self._thread is not None and self._thread.is_alive():
+            self.queue.join()
+
+    def stop(self, timeout=10):
+        """Drain the queue and stop the writer thread."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping.set()
+        thread.join(timeout)
+        if thread.is_alive():
+            print(f"Log writer did not drain within {timeout}s")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": self.queue.qsize(),
+                "queue_capacity": self.queue.maxsize,
+                "written": self.written,
+                "dropped": self.dropped,
+                "spilled": self.spilled,
+                "failed": self.failed,
+                "status_counts": dict(self.status_counts),
+                "backpressure": self.backpressure,
+            }
+
+    def _run(self):
+        self.sink.open()
+        while not (self._stopping.is_set() and self.queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+            self._sink_call(self.sink.poll)
+        self._sink_call(self.sink.close)
+
+    def _sink_call(self, method):
+        try:
+            method()
+        except Exception:
+            print(f"Log sink {self.sink.name} failed to {method.__name__}")
+            traceback.print_exc()
+
+    def _next_batch(self):
+        try:
+            first = self.queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = 0 if self._stopping.is_set() else deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self.queue.get(timeout=remaining))
+                else:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        try:
+            self.sink.write(batch)
+            with self._lock:
+                self.written += len(batch)
+                self.status_counts.update(row[STATUS_INDEX] for row in batch)
+        except Exception:
+            print(f"Failed to write {len(batch)} log rows")
+            traceback.print_exc()
+            with self._lock:
+                self.failed += len(batch)
+            if self.backpressure == "spill":
+                self._spill(batch)
+        finally:
+            for _ in batch:
+                self.queue.task_done()
+
+    def _spill(self, rows):
+        try:
+            lines = "".join(
+                json.dumps(dict(zip(LOG_COLUMNS, row))) + "\n" for row in rows
+            )
+            with self._spill_lock:
+                with open(self.spill_path, "a") as f:
+                    f.write(lines)
+        except Exception:
+            print(f"Failed to spill {len(rows)} log rows to {self.spill_path}")
+            traceback.print_exc()
+            self.drop(len(rows))
+            return
+        with self._lock:
+            self.spilled += len(rows)
+
+
+log_sink = build_sink()
+log_writer = LogWriter(sink=log_sink)
+atexit.register(log_writer.stop)
+
+
+@timed("logging")
 def log_request(
     request,
     input_data,
@@ -33,32 +530,26 @@ def log_request(
     error=None,
     source=None,
     details=None,
+    model_version=None,
+    model_name=MODEL_NAME,
 ):
-    conn = sqlite3.connect("logs/logs.db")
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-            INSERT INTO logs (
-                timestamp, method, url, input, prediction, status, error,
-                source, details, model_stage, model_name, model_source, model_version)
-            VALUES (CURRENT_TIMESTAMP, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
+    if model_version is None:
+        # The version actually being served, which changes on a hot swap
+        model_version = model_manager.version()
+    log_writer.submit(
         (
+            datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
             request.method,
             str(request.url),
-            json.dumps(input_data),
-            json.dumps(prediction),
+            to_json(input_data),
+            to_json(prediction),
             status,
             error,
             source,
             details,
             MODEL_STAGE,
-            MODEL_NAME,
+            model_name,
             MODEL_SOURCE,
-            MODEL_VERSION,
-        ),
+            model_version,
+        )
     )
-
-    conn.commit()
-    conn.close()
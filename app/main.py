@@ -1,24 +1,147 @@
 import json
+import threading
+import time
 import traceback
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from app.model import load_model, predict
-from app.logger import log_request
+from app.model import (
+    MISSING,
+    feature_bounds,
+    model_warming,
+    predict,
+    predict_batch,
+    prediction_cache,
+)
+from app.manager import model_manager
+from app.pool import check_model_ref, model_pool
+from app.rollout import canary_split, shadow_runner
+from app.serve import mark_worker_ready, mark_worker_stopped
+from app.batcher import InferenceBatcher
+from app.batch import (
+    BatchValidationError,
+    iter_json_predictions,
+    parse_batch,
+    summarize,
+    validate_rows,
+)
+from app.config import (
+    PREDICT_BATCHING,
+    BATCH_STREAM_THRESHOLD,
+    LOG_SINKS,
+    MODEL_LOAD_MODE,
+)
+from app.instrumentation import TimingMiddleware, observe_since
+from app.codec import check_row, dumps, parse_features
+from app.executors import Overloaded, admit, inference_executor, io_executor
+from app.logger import log_request, log_writer
+from app.retention import log_maintenance
 from app.metrics import metrics_router
-from app.health import health_router
+from app.health import health_monitor, health_router
+from app.admin import admin_router
 from app.auth import verify_token
-from app.exceptions import handle_validation_error, handle_http_exception
+from app.exceptions import (
+    handle_http_exception,
+    handle_overloaded,
+    handle_validation_error,
+)
 from fastapi.exceptions import RequestValidationError
 from fastapi import HTTPException
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_writer.start()
+    if "sqlite" in LOG_SINKS:
+        log_maintenance.start()
+    if model_warming.is_set():
+        # Serve /health right away, the model becomes available when loaded
+        start_background_load()
+    else:
+        model_manager.start()
+        mark_worker_ready()
+    health_monitor.start()
+    yield
+    mark_worker_stopped()
+    health_monitor.stop()
+    model_manager.stop()
+    # Finish queued shadow comparisons so their rows are logged
+    shadow_runner.shutdown()
+    inference_executor.shutdown()
+    # Log rows still being handed over reach the writer before it drains
+    io_executor.shutdown()
+    log_maintenance.stop()
+    # Drain queued log rows before the process exits
+    log_writer.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(TimingMiddleware, model_version=model_manager.version)
 app.add_exception_handler(RequestValidationError, handle_validation_error)
 app.add_exception_handler(HTTPException, handle_http_exception)
+app.add_exception_handler(Overloaded, handle_overloaded)
 app.include_router(metrics_router)
 app.include_router(health_router)
+app.include_router(admin_router)
+
+if MODEL_LOAD_MODE == "background":
+    model_warming.set()
+else:
+    model_manager.load()
+
+batcher = InferenceBatcher(predict_batch, executor=inference_executor)
+
+
+def load_and_warm_up():
+    try:
+        model_manager.load()
+    finally:
+        model_warming.clear()
+
+
+def start_background_load():
+    def run():
+        load_and_warm_up()
+        model_manager.start()
+        mark_worker_ready()
+
+    threading.Thread(target=run, name="model-loader", daemon=True).start()
+
+
+def ensure_model_ready():
+    if model_warming.is_set():
+        raise HTTPException(
+            status_code=503,
+            detail="Model is warming up",
+            headers={"Retry-After": "1"},
+        )
 
-model = load_model()
+
+async def log_off_loop(**kwargs):
+    """Log a request from the IO pool, dropping the row if that pool is full.
+
+    Logging inline instead could block the event loop on a full log queue
+    or a spill file.
+    """
+    try:
+        await io_executor.run(log_request, **kwargs)
+    except Overloaded:
+        log_writer.drop()
+
+
+async def predict_batched(model, row):
+    """Score one row through the micro-batcher, skipping it on a cache hit."""
+    key = prediction_cache.key(model, row) if model is not None else None
+    if key is not None:
+        cached = prediction_cache.get(key)
+        if cached is not MISSING:
+            return cached
+    prediction = await batcher.submit(row, model)
+    if key is not None:
+        prediction_cache.put(key, prediction)
+    return prediction
 
 
 class Input(BaseModel):
@@ -28,10 +151,56 @@ class Input(BaseModel):
     petal_width: float
 
 
-@app.post("/predict")
-async def predict_endpoint(data: Input, request: Request):
+# Bodies are parsed by parse_features, this documents them in OpenAPI
+INPUT_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": Input.model_json_schema()}},
+    }
+}
+
+
+async def read_features(request):
+    """Parse the body once: the features, as an array and as JSON bytes."""
+    parsed = parse_features(await request.body(), Input)
+    # Reading, parsing and validating the body
+    observe_since("validation", request.state.received_at)
+    return parsed
+
+
+def check_bounds(model, row):
+    """Reject features outside the model's schema ranges with a 422."""
+    bounds = feature_bounds(model)
+    if bounds is not None:
+        check_row(row, *bounds)
+
+
+def prediction_response(prediction_json, **fields):
+    """Respond with ``fields`` and the prediction, serialized once for the log."""
+    head = dumps(fields)[:-1] + b"," if fields else b"{"
+    return Response(
+        head + b'"prediction":' + prediction_json + b"}",
+        media_type="application/json",
+    )
+
+
+@app.post("/predict", openapi_extra=INPUT_BODY)
+async def predict_endpoint(request: Request):
+    input_dict, row, input_json = await read_features(request)
     verify_token(request)
-    input_dict = data.dict()
+    ensure_model_ready()
+    admit()
+    # Read once: a hot swap mid-request does not change the model it uses
+    served = model_manager.current
+    model, version = served.model, served.version
+    # The primary model's ranges apply to canary traffic too
+    check_bounds(model, row)
+
+    canary = None
+    if canary_split.pick():
+        canary = await run_in_threadpool(canary_split.load)
+        if canary is not None:
+            model, version = canary, canary_split.version
 
     prediction = None
     status = "success"
@@ -39,7 +208,19 @@ async def predict_endpoint(data: Input, request: Request):
     details = None
 
     try:
-        prediction = predict(model, input_dict)
+        started = time.perf_counter()
+        if canary is not None:
+            # The prediction cache holds the primary model's results only
+            prediction = await inference_executor.run(
+                predict, model, input_dict, use_cache=False
+            )
+        elif PREDICT_BATCHING:
+            prediction = await predict_batched(model, row)
+        else:
+            prediction = await inference_executor.run(predict, model, input_dict)
+        seconds = time.perf_counter() - started
+    except Overloaded:
+        raise
     except Exception as e:
         status = "error"
         error = str(e)
@@ -51,18 +232,151 @@ async def predict_endpoint(data: Input, request: Request):
             }
         )
 
+    prediction_json = dumps(prediction)
+
     # Always log the request
-    log_request(
+    await log_off_loop(
+        request=request,
+        input_data=input_json,
+        prediction=prediction_json,
+        status=status,
+        error=error,
+        source="prediction",
+        details=details,
+        model_version=version,
+    )
+
+    if status == "error":
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {error}")
+
+    if canary is None:
+        shadow_runner.maybe_submit(request, input_dict, prediction, seconds)
+
+    return prediction_response(prediction_json)
+
+
+@app.post("/models/{name}/{version}/predict", openapi_extra=INPUT_BODY)
+async def predict_pooled_endpoint(name: str, version: str, request: Request):
+    input_dict, row, input_json = await read_features(request)
+    verify_token(request)
+    try:
+        check_model_ref(name, version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    admit()
+
+    prediction = None
+    status = "success"
+    error = None
+    details = None
+
+    try:
+        # Loads on first use, other requests for the same model wait for it
+        model = await run_in_threadpool(model_pool.get, name, version)
+        check_bounds(model, row)
+        # The prediction cache holds one model's results at a time
+        prediction = await inference_executor.run(
+            predict, model, input_dict, use_cache=False
+        )
+    except (Overloaded, RequestValidationError):
+        raise
+    except Exception as e:
+        status = "error"
+        error = str(e)
+        details = json.dumps(
+            {
+                "type": type(e).__name__,
+                "message": str(e),
+                "traceback": traceback.format_exc(),
+            }
+        )
+
+    prediction_json = dumps(prediction)
+
+    await log_off_loop(
         request=request,
-        input_data=input_dict,
-        prediction=prediction,
+        input_data=input_json,
+        prediction=prediction_json,
         status=status,
         error=error,
         source="prediction",
         details=details,
+        model_version=version,
+        model_name=name,
     )
 
     if status == "error":
         raise HTTPException(status_code=500, detail=f"Prediction failed: {error}")
 
-    return {"prediction": prediction}
+    return prediction_response(prediction_json, model=name, version=version)
+
+
+@app.post("/predict/batch")
+async def predict_batch_endpoint(request: Request, stream: bool = False):
+    verify_token(request)
+    ensure_model_ready()
+    admit()
+    served = model_manager.current
+    body = await request.body()
+    summary = {"bytes": len(body)}
+
+    try:
+        started = time.perf_counter()
+        rows, summary["format"] = parse_batch(
+            body, request.headers.get("content-type")
+        )
+        validate_rows(rows, feature_bounds(served.model))
+        observe_since("validation", started)
+    except BatchValidationError as e:
+        await log_off_loop(
+            request=request,
+            input_data=summary,
+            prediction=None,
+            status="error",
+            error=str(e),
+            source="batch_validation",
+            details=None,
+        )
+        return JSONResponse(status_code=e.status_code, content={"detail": str(e)})
+
+    summary["rows"] = len(rows)
+    predictions = None
+    status = "success"
+    error = None
+    details = None
+
+    try:
+        predictions = await inference_executor.run(predict_batch, served.model, rows)
+    except Overloaded:
+        raise
+    except Exception as e:
+        status = "error"
+        error = str(e)
+        details = json.dumps(
+            {
+                "type": type(e).__name__,
+                "message": str(e),
+                "traceback": traceback.format_exc(),
+            }
+        )
+
+    # One summary row per batch
+    await log_off_loop(
+        request=request,
+        input_data=summary,
+        prediction=summarize(predictions) if predictions is not None else None,
+        status=status,
+        error=error,
+        source="batch",
+        details=details,
+        model_version=served.version,
+    )
+
+    if status == "error":
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {error}")
+
+    if stream or len(predictions) > BATCH_STREAM_THRESHOLD:
+        return StreamingResponse(
+            iter_json_predictions(predictions), media_type="application/json"
+        )
+    return {"predictions": predictions}
@@ -0,0 +1,228 @@
+import os
+import threading
+import time
+import traceback
+
+from app.config import (
+    MODEL_NAME,
+    MODEL_POLL_INTERVAL,
+    MODEL_SOURCE,
+    MODEL_STAGE,
+    MODEL_VERSION,
+)
+from app.model import WARM_UP_ROW, import_mlflow, load_model, model_identity
+
+
+class ModelLoadError(RuntimeError):
+    pass
+
+
+class ModelLoadInProgress(RuntimeError):
+    pass
+
+
+class ServedModel:
+    """A loaded model together with the version it was loaded as."""
+
+    def __init__(self, model, version, fingerprint=None):
+        self.model = model
+        self.version = version
+        self.fingerprint = fingerprint
+        self.loaded_at = time.time()
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "model_uuid": model_identity(self.model),
+            "loaded_at": self.loaded_at,
+        }
+
+
+def local_fingerprint(path=None):
+    """Modification time of the local model, changes when it is replaced."""
+    path = path or f"models/{MODEL_NAME}"
+    if os.path.isdir(path):
+        path = os.path.join(path, "MLmodel")
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def registry_version():
+    """Latest ``(version, run_id)`` in MODEL_STAGE, or None."""
+    mlflow = import_mlflow()
+    versions = mlflow.search_model_versions(filter_string=f"name='{MODEL_NAME}'")
+    staged = [v for v in versions if v.current_stage == MODEL_STAGE]
+    if not staged:
+        return None
+    latest = max(staged, key=lambda v: int(v.version))
+    return str(latest.version), latest.run_id
+
+
+def warm_up(model):
+    """Score one row so a broken model fails here and not on live traffic."""
+    if model is not None:
+        model.predict([WARM_UP_ROW])
+
+
+class ModelManager:
+    """Owns the served model and swaps in new versions without a restart.
+
+    A new version is loaded and warmed while the current one keeps serving,
+    then swapped in with a single reference assignment. Requests read
+    ``current`` once, so in-flight requests finish on the model they started
+    with. The previous model is kept for ``rollback``.
+
+    With ``poll_interval`` set, a background thread watches the registry
+    stage (REMOTE) or the model file (LOCAL) and reloads when it changes.
+    A rollback pauses polling until the next explicit reload.
+    """
+
+    def __init__(self, poll_interval=MODEL_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self.current = None
+        self.previous = None
+        self.auto_update = True
+        self.swaps = 0
+        self.last_error = None
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def model(self):
+        current = self.current
+        return current.model if current is not None else None
+
+    def version(self):
+        current = self.current
+        return current.version if current is not None else MODEL_VERSION
+
+    def load(self, version=None, blocking=True):
+        """Load ``version`` (default: what the config resolves to) and swap it in.
+
+        Raises ModelLoadInProgress if another load is running and
+        ``blocking`` is False, and ModelLoadError if the model fails to load
+        or warm up, in which case the current model keeps serving.
+        """
+        if version and MODEL_SOURCE != "REMOTE":
+            raise ValueError("A version can only be selected with MODEL_SOURCE=REMOTE")
+        if not self._lock.acquire(blocking=blocking):
+            raise ModelLoadInProgress("A model load is already in progress")
+        try:
+            fingerprint = local_fingerprint() if MODEL_SOURCE == "LOCAL" else None
+            try:
+                # Only the initial load may fall back to a cached or local
+                # model, a reload keeps the current model instead
+                model = load_model(version, fallback=self.current is None)
+                if model is None and self.current is not None:
+                    raise RuntimeError("New model could not be loaded")
+                warm_up(model)
+            except Exception as e:
+                self.last_error = str(e)
+                raise ModelLoadError(str(e)) from e
+
+            self._swap(ServedModel(model, self._label(model, version), fingerprint))
+            self.auto_update = True
+            self.last_error = None
+            return self.current
+        finally:
+            self._lock.release()
+
+    def rollback(self):
+        """Swap the previous model back in and pause automatic updates."""
+        with self._lock:
+            if self.previous is None:
+                raise ValueError("No previous model to roll back to")
+            self._swap(self.previous)
+            self.auto_update = False
+            return self.current
+
+    def check_for_update(self):
+        """Reload if the registry stage or local model changed. True on swap."""
+        current = self.current
+        if not self.auto_update or current is None:
+            return False
+
+        if MODEL_SOURCE == "LOCAL":
+            fingerprint = local_fingerprint()
+            if fingerprint is None or fingerprint == current.fingerprint:
+                return False
+            print("Local model changed on disk, reloading")
+            self.load(blocking=False)
+            return True
+
+        # A pinned version never changes
+        if MODEL_VERSION:
+            return False
+        latest = registry_version()
+        if latest is None or latest[0] == current.version:
+            return False
+        version, run_id = latest
+        metadata = getattr(current.model, "metadata", None)
+        if run_id and run_id == getattr(metadata, "run_id", None):
+            # Loaded by stage name, this is the version we already serve
+            current.version = version
+            return False
+        print(f"{MODEL_STAGE} now points to version {version}, reloading")
+        self.load(version, blocking=False)
+        return True
+
+    def start(self):
+        if self.poll_interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._poll, name="model-poller", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def status(self):
+        return {
+            "current": self.current.describe() if self.current else None,
+            "previous": self.previous.describe() if self.previous else None,
+            "source": MODEL_SOURCE,
+            "stage": MODEL_STAGE,
+            "auto_update": self.auto_update,
+            "poll_interval": self.poll_interval,
+            "swaps": self.swaps,
+            "last_error": self.last_error,
+        }
+
+    def _swap(self, served):
+        if self.current is not None:
+            self.previous = self.current
+            self.swaps += 1
+        self.current = served
+        print(f"Serving model version {served.version}")
+
+    def _label(self, model, version):
+        if version:
+            return str(version)
+        if MODEL_SOURCE == "LOCAL":
+            uuid = getattr(getattr(model, "metadata", None), "model_uuid", None)
+            return f"local-{uuid[:8]}" if uuid else "local"
+        # Loaded by stage, the poller fills in the number from the registry
+        return MODEL_VERSION or MODEL_STAGE
+
+    def _poll(self):
+        # Check once right away so a stage-loaded model learns its version
+        while True:
+            try:
+                self.check_for_update()
+            except Exception:
+                print("Model update check failed")
+                traceback.print_exc()
+            if self._stop.wait(self.poll_interval):
+                return
+
+
+model_manager = ModelManager()
@@ -1,64 +1,128 @@
 from fastapi import APIRouter, Query
-import sqlite3
+from fastapi.responses import PlainTextResponse
+from app.config import LOG_SINKS
+from app.executors import executor_stats
+from app.logger import log_sink, log_writer
+from app.model import prediction_cache
+from app.pool import model_pool
+from app.retention import log_maintenance
+from app.rollout import SHADOW_STATUSES, canary_split, shadow_runner
+from app.instrumentation import (
+    render_histogram,
+    render_samples,
+    request_latency,
+    rolling_summary,
+    stage_latency,
+)
 
 metrics_router = APIRouter()
-conn = sqlite3.connect("logs/logs.db", check_same_thread=False)
-conn.row_factory = sqlite3.Row  # for dict-like access
 
 
 @metrics_router.get("/metrics")
 def get_metrics(
     limit: int = Query(25, ge=1),
     offset: int = Query(0, ge=0),
+    cursor: int = Query(
+        None, ge=1, description="Return logs older than this id (next_cursor)"
+    ),
     status: str = Query(None, description="Filter by 'success' or 'error'"),
     source: str = Query(
         None, description="Filter by request source (e.g., 'api', 'cli')"
     ),
 ):
-    # Total count
-    cursor = conn.execute("SELECT COUNT(*) FROM logs")
-    total = cursor.fetchone()[0]
-
-    # Success count
-    cursor = conn.execute("SELECT COUNT(*) FROM logs WHERE status = 'success'")
-    success_count = cursor.fetchone()[0]
-
-    # Error count
-    cursor = conn.execute("SELECT COUNT(*) FROM logs WHERE status = 'error'")
-    error_count = cursor.fetchone()[0]
-
-    # Build dynamic WHERE clause
-    filters = []
-    params = []
-
-    if status in ("success", "error"):
-        filters.append("status = ?")
-        params.append(status)
-
-    if source:
-        filters.append("source = ?")
-        params.append(source)
+    # Rows come from the first configured sink. OFFSET is only kept for
+    # older clients, the cursor pages without skipping rows.
+    counters, logs = log_sink.read(
+        status=status if status in ("success", "error") else None,
+        source=source or None,
+        limit=limit,
+        offset=0 if cursor is not None else offset,
+        cursor=cursor,
+    )
 
-    where_clause = "WHERE " + " AND ".join(filters) if filters else ""
-
-    # Paginated logs with filters
-    query = f"""
-        SELECT * FROM logs
-        {where_clause}
-        ORDER BY timestamp DESC
-        LIMIT ? OFFSET ?
-    """
-    params.extend([limit, offset])
-    cursor = conn.execute(query, params)
-    logs = [dict(row) for row in cursor.fetchall()]
+    # Shadow comparisons are logged next to requests but are not requests
+    shadow_rows = sum(counters.get(f"status:{s}", 0) for s in SHADOW_STATUSES)
 
     return {
-        "total_requests": total,
-        "success_count": success_count,
-        "error_count": error_count,
+        "total_requests": counters.get("total", 0) - shadow_rows,
+        "success_count": counters.get("status:success", 0),
+        "error_count": counters.get("status:error", 0),
         "limit": limit,
         "offset": offset,
+        "cursor": cursor,
+        "next_cursor": logs[-1]["id"] if len(logs) == limit else None,
         "status_filter": status,
         "source_filter": source,
         "logs": logs,
+        "log_writer": log_writer.stats(),
+        "log_storage": {
+            "sink": log_sink.name,
+            **log_sink.stats(),
+            # Archiving only applies to the SQLite sink
+            **(log_maintenance.stats() if "sqlite" in LOG_SINKS else {}),
+        },
+        "prediction_cache": prediction_cache.stats(),
+        "model_pool": model_pool.stats(),
+        "shadow": shadow_runner.stats(),
+        "canary": canary_split.stats(),
+        "executors": executor_stats(),
     }
+
+
+@metrics_router.get("/metrics/prometheus", response_class=PlainTextResponse)
+def get_prometheus_metrics():
+    writer = log_writer.stats()
+    lines = render_histogram(stage_latency) + render_histogram(request_latency)
+    lines += render_samples(
+        "mlops_log_queue_depth",
+        "Log rows waiting to be written",
+        "gauge",
+        [({}, writer["queue_depth"])],
+    )
+    lines += render_samples(
+        "mlops_log_rows_total",
+        "Log rows by outcome",
+        "counter",
+        [
+            ({"outcome": outcome}, writer[outcome])
+            for outcome in ("written", "dropped", "spilled", "failed")
+        ],
+    )
+    executors = executor_stats()
+    lines += render_samples(
+        "mlops_executor_queue_depth",
+        "Tasks waiting for an executor thread",
+        "gauge",
+        [({"executor": name}, s["queue_depth"]) for name, s in executors.items()],
+    )
+    lines += render_samples(
+        "mlops_executor_rejected_total",
+        "Requests turned away because an executor queue was full",
+        "counter",
+        [({"executor": name}, s["rejected"]) for name, s in executors.items()],
+    )
+    cache = prediction_cache.stats()
+    lines += render_samples(
+        "mlops_prediction_cache_events_total",
+        "Prediction cache lookups and removals by kind",
+        "counter",
+        [
+            ({"event": event}, cache[event])
+            for event in ("hits", "misses", "evictions", "expirations")
+        ],
+    )
+    lines += render_samples(
+        "mlops_prediction_cache_entries",
+        "Predictions currently cached",
+        "gauge",
+        [({}, cache["size"])],
+    )
+    return PlainTextResponse(
+        "\n".join(lines) + "\n", media_type="text/plain; version=0.0.4"
+    )
+
+
+@metrics_router.get("/metrics/latency")
+def get_latency_metrics():
+    """Per-stage latency and per-route request rates over rolling windows."""
+    return {"windows": rolling_summary()}
@@ -1,47 +1,291 @@
 import os
-import mlflow.pyfunc
+import hashlib
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
 import traceback
-import mlflow
+import numpy as np
 
+from app.instrumentation import timed
+from app.fastpath import build_fast_path
+from app.schema import SchemaModel, model_schema
 from app.config import (
     MLFLOW_TRACKING_URI,
     MODEL_STAGE,
     MODEL_NAME,
     MODEL_SOURCE,
     MODEL_VERSION,
+    FAST_PATH,
+    FEATURE_RANGE_MARGIN,
+    MODEL_CACHE_DIR,
+    MODEL_CACHE_MAX_AGE,
+    PREDICTION_CACHE_SIZE,
+    PREDICTION_CACHE_TTL,
 )
 
-mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+# Column order the model expects, matching the /predict Input fields
+FEATURE_NAMES = ["sepal_length", "sepal_width", "petal_length", "petal_width"]
 
+# Scored once by every freshly loaded model before it serves traffic
+WARM_UP_ROW = [5.1, 3.5, 1.4, 0.2]
 
-def load_model():
+
+# Set while the model is loaded in the background (MODEL_LOAD_MODE=background)
+model_warming = threading.Event()
+
+# Written next to a cached model artifact, its mtime is the download time
+CACHE_MARKER = ".downloaded"
+
+# Sentinel for cache misses, since None can be a real prediction
+MISSING = object()
+
+
+def model_identity(model):
+    """Identify the loaded model by the model_uuid in its MLmodel file."""
+    if model is None:
+        return None
+    metadata = getattr(model, "metadata", None)
+    uuid = getattr(metadata, "model_uuid", None)
+    return uuid or f"object-{id(model)}"
+
+
+class PredictionCache:
+    """Bounded LRU cache of predictions with an optional TTL.
+
+    Keys are a digest of the float64 feature vector (so ``5`` and ``5.0`` or
+    ``-0.0`` and ``0.0`` share an entry) plus the model identity. When a
+    different model is seen the whole cache is dropped, so predictions from a
+    previous model are never served.
+    """
+
+    def __init__(self, max_entries=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+        self._entries = OrderedDict()
+        self._model_id = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def key(self, model, row):
+        if not self.enabled:
+            return None
+        model_id = model_identity(model)
+        if model_id != self._model_id:
+            with self._lock:
+                if model_id != self._model_id:
+                    if self._entries:
+                        self.invalidations += 1
+                    self._entries.clear()
+                    self._model_id = model_id
+        vector = np.asarray(row, dtype=np.float64) + 0.0
+        digest = hashlib.blake2b(vector.tobytes(), digest_size=16).digest()
+        return model_id, digest
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else None
+        with self._lock:
+            if key[0] != self._model_id:
+                # The model changed while this prediction was being computed
+                return
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "model_id": self._model_id,
+            }
+
+
+prediction_cache = PredictionCache()
+
+
+def load_model(version=None, fallback=True):
+    model = resolve_model(version, fallback)
+    if model is None:
+        return None
+    # Read before the fast path replaces the pyfunc wrapper
+    schema = model_schema(model)
+    if FAST_PATH:
+        model = build_fast_path(model)
+    return with_schema(model, schema)
+
+
+def with_schema(model, schema):
+    """Serve ``model`` through its feature schema.
+
+    Raises SchemaMismatch if the schema does not fit the request fields or
+    the model. Models saved without a schema are served as they are.
+    """
+    if schema is None:
+        print("Model has no feature schema, features are passed in field order")
+        return model
+    print(f"Feature schema: {', '.join(schema.names)}")
+    return SchemaModel(model, schema, FEATURE_NAMES, FEATURE_RANGE_MARGIN)
+
+
+def feature_bounds(model):
+    """``(low, high)`` arrays of valid feature values, None without a schema."""
+    return model.bounds if isinstance(model, SchemaModel) else None
+
+
+def import_mlflow():
+    """Import mlflow on first use, it takes over a second to import."""
+    import mlflow
+    import mlflow.artifacts
+    import mlflow.pyfunc
+
+    mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+    return mlflow
+
+
+def resolve_model(version=None, fallback=True):
+    """Load the model from the cache, the registry or the local file.
+
+    With ``fallback`` False a registry failure raises instead of serving a
+    stale cached artifact or the local model in place of ``version``.
+    """
     print("Calling load_model")
-    print("MLFLOW_TRACKING_URI:", mlflow.get_tracking_uri())
+    print("MLFLOW_TRACKING_URI:", MLFLOW_TRACKING_URI)
     print("MODEL_SOURCE:", MODEL_SOURCE)
 
     if MODEL_SOURCE == "LOCAL":
         return load_local_model()
 
+    version = version or MODEL_VERSION
+    if version:
+        model_uri = f"models:/{MODEL_NAME}/{version}"
+    else:
+        model_uri = f"models:/{MODEL_NAME}/{MODEL_STAGE}"
+
+    # A pinned version never changes, a stage is re-resolved once stale
+    max_age = None if version else MODEL_CACHE_MAX_AGE
+    model = load_cached_model(model_uri, max_age)
+    if model is not None:
+        return model
+
     # Try remote first
     try:
+        mlflow = import_mlflow()
         print("Searching for model versions...")
         versions = mlflow.search_model_versions(filter_string=f"name='{MODEL_NAME}'")
         print(versions)
 
-        if MODEL_VERSION:
-            model_uri = f"models:/{MODEL_NAME}/{MODEL_VERSION}"
-            print(f"Loading specific version: {MODEL_VERSION}")
+        if version:
+            print(f"Loading specific version: {version}")
         else:
-            model_uri = f"models:/{MODEL_NAME}/{MODEL_STAGE}"
             print(f"Loading from stage: {MODEL_STAGE}")
 
+        if MODEL_CACHE_DIR:
+            return mlflow.pyfunc.load_model(download_model(model_uri))
         return mlflow.pyfunc.load_model(model_uri)
 
-    except Exception:
+    except Exception as e:
         print("Failed to load from MLflow registry")
         traceback.print_exc()
-        print("Falling back to local model...")
-        return load_local_model()
+        if not fallback:
+            raise RuntimeError(f"Could not load {model_uri} from the registry") from e
+
+    # A stale cached artifact beats the local fallback
+    model = load_cached_model(model_uri, max_age=None)
+    if model is not None:
+        return model
+    print("Falling back to local model...")
+    return load_local_model()
+
+
+def cached_model_path(model_uri):
+    name = model_uri.replace("models:/", "", 1).replace("/", "--")
+    return os.path.join(MODEL_CACHE_DIR, name)
+
+
+def load_cached_model(model_uri, max_age):
+    """Load a previously downloaded artifact, or None when missing or stale."""
+    if not MODEL_CACHE_DIR:
+        return None
+    path = cached_model_path(model_uri)
+    marker = os.path.join(path, CACHE_MARKER)
+    if not os.path.exists(marker):
+        return None
+    age = time.time() - os.path.getmtime(marker)
+    if max_age is not None and age > max_age:
+        print(f"Cached model for {model_uri} is {age:.0f}s old, re-resolving")
+        return None
+
+    print(f"Loading cached model artifact from: {path}")
+    try:
+        return import_mlflow().pyfunc.load_model(path)
+    except Exception:
+        print(f"Failed to load cached model from: {path}")
+        traceback.print_exc()
+        return None
+
+
+def download_model(model_uri):
+    """Download a registry model into the local cache and return its path.
+
+    The artifact lands in a temporary directory first and is moved into place
+    once complete, so a crash mid-download never leaves a partial cache entry.
+    """
+    mlflow = import_mlflow()
+    os.makedirs(MODEL_CACHE_DIR, exist_ok=True)
+    path = cached_model_path(model_uri)
+    staging = tempfile.mkdtemp(dir=MODEL_CACHE_DIR)
+    try:
+        local = mlflow.artifacts.download_artifacts(
+            artifact_uri=model_uri, dst_path=staging
+        )
+        open(os.path.join(local, CACHE_MARKER), "w").close()
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(local, path)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    print(f"Cached model artifact at: {path}")
+    return path
 
 
 def load_local_model():
@@ -51,7 +295,7 @@ def load_local_model():
     try:
         if os.path.isdir(path) and os.path.exists(os.path.join(path, "MLmodel")):
             print("Detected MLflow model directory")
-            return mlflow.pyfunc.load_model(path)
+            return import_mlflow().pyfunc.load_model(path)
         elif os.path.isfile(path):
             print("Detected raw pickle file")
             import pickle
@@ -72,12 +316,38 @@ def load_local_model():
     return None
 
 
-def predict(model, features):
+def predict(model, features, use_cache=True):
     if model is None:
         return "dummy-class"
+
+    # By name, the request may list the fields in any order
+    row = [features[name] for name in FEATURE_NAMES]
+    key = prediction_cache.key(model, row) if use_cache else None
+    if key is not None:
+        cached = prediction_cache.get(key)
+        if cached is not MISSING:
+            return cached
+
     try:
-        return model.predict([list(features.values())])[0]
+        prediction = predict_row(model, row)
     except Exception:
         print("Failed to load local model")
         traceback.print_exc()
         return "error"
+
+    if key is not None:
+        prediction_cache.put(key, prediction)
+    return prediction
+
+
+@timed("inference")
+def predict_row(model, row):
+    return model.predict([row])[0]
+
+
+@timed("inference")
+def predict_batch(model, rows):
+    """Predict a 2-D array of feature rows with a single model call."""
+    if model is None:
+        return ["dummy-class"] * len(rows)
+    return np.asarray(model.predict(rows)).tolist()
@@ -0,0 +1,202 @@
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from app.config import (
+    FAST_PATH,
+    MODEL_CACHE_DIR,
+    MODEL_CACHE_MAX_AGE,
+    MODEL_POOL_ALLOWED,
+    MODEL_POOL_LOCAL_DIR,
+    MODEL_POOL_MAX_MB,
+)
+from app.fastpath import build_fast_path, unwrap_estimator
+from app.manager import warm_up
+from app.model import (
+    download_model,
+    import_mlflow,
+    load_cached_model,
+    with_schema,
+)
+from app.schema import model_schema
+
+# Registry names and versions, also used as directory names for local models
+NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+
+
+class PoolEntry:
+    def __init__(self, model, nbytes):
+        self.model = model
+        self.nbytes = nbytes
+        self.loaded_at = time.time()
+        self.hits = 0
+
+
+class _PendingLoad:
+    """A load in progress that concurrent requests for the same model wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.model = None
+        self.error = None
+
+
+def model_nbytes(model):
+    """Approximate memory held by a model, measured as its pickled size."""
+    try:
+        return len(pickle.dumps(unwrap_estimator(model), protocol=5))
+    except Exception:
+        return 0
+
+
+def load_pool_model(name, version):
+    """Load ``name`` at a registry version or stage, or from disk for "local"."""
+    mlflow = import_mlflow()
+    if version == "local":
+        return mlflow.pyfunc.load_model(os.path.join(MODEL_POOL_LOCAL_DIR, name))
+
+    model_uri = f"models:/{name}/{version}"
+    # Numbered versions never change, stages are re-resolved once stale
+    max_age = None if version.isdigit() else MODEL_CACHE_MAX_AGE
+    model = load_cached_model(model_uri, max_age)
+    if model is None:
+        path = download_model(model_uri) if MODEL_CACHE_DIR else model_uri
+        model = mlflow.pyfunc.load_model(path)
+    return model
+
+
+def prepare_model(name, version):
+    model = load_pool_model(name, version)
+    schema = model_schema(model)
+    if FAST_PATH:
+        model = build_fast_path(model)
+    model = with_schema(model, schema)
+    warm_up(model)
+    return model
+
+
+class ModelPool:
+    """Lazily loaded models kept in LRU order within a memory budget.
+
+    The first request for a model loads it; concurrent requests for the same
+    model wait for that one load instead of starting their own. After each
+    load the least recently used models are evicted until the pool fits in
+    ``max_bytes`` again. The model just loaded is never evicted, so a single
+    model larger than the budget is still served. Requests already holding an
+    evicted model finish with it.
+    """
+
+    def __init__(
+        self, max_bytes=int(MODEL_POOL_MAX_MB * 1024 * 1024), loader=prepare_model
+    ):
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_failures = 0
+        self.shared_loads = 0
+        self.evictions = 0
+
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def get(self, name, version):
+        key = (name, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry.hits += 1
+                self.hits += 1
+                return entry.model
+
+            self.misses += 1
+            pending = self._loading.get(key)
+            owner = pending is None
+            if owner:
+                pending = _PendingLoad()
+                self._loading[key] = pending
+            else:
+                self.shared_loads += 1
+
+        if not owner:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.model
+
+        try:
+            model = self.loader(name, version)
+            nbytes = model_nbytes(model)
+        except Exception as e:
+            pending.error = e
+            with self._lock:
+                self.load_failures += 1
+                del self._loading[key]
+            pending.done.set()
+            raise
+
+        pending.model = model
+        with self._lock:
+            self.loads += 1
+            self._entries[key] = PoolEntry(model, nbytes)
+            del self._loading[key]
+            self._evict(keep=key)
+        pending.done.set()
+        return model
+
+    def evict(self, name, version):
+        with self._lock:
+            return self._entries.pop((name, version), None) is not None
+
+    def _evict(self, keep):
+        used = sum(entry.nbytes for entry in self._entries.values())
+        for key in list(self._entries):
+            if used <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            used -= self._entries.pop(key).nbytes
+            self.evictions += 1
+            print(f"Evicted model {key[0]}/{key[1]} from the pool")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "models": [
+                    {
+                        "name": name,
+                        "version": version,
+                        "bytes": entry.nbytes,
+                        "hits": entry.hits,
+                        "loaded_at": entry.loaded_at,
+                    }
+                    for (name, version), entry in self._entries.items()
+                ],
+                "bytes": sum(entry.nbytes for entry in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "loading": len(self._loading),
+                "hits": self.hits,
+                "misses": self.misses,
+                "loads": self.loads,
+                "load_failures": self.load_failures,
+                "shared_loads": self.shared_loads,
+                "evictions": self.evictions,
+            }
+
+
+def check_model_ref(name, version):
+    """Raise ValueError unless ``name``/``version`` may be loaded by the pool."""
+    for value in (name, version):
+        if not NAME_PATTERN.match(value) or ".." in value:
+            raise ValueError(f"Invalid model reference: {name}/{version}")
+    if MODEL_POOL_ALLOWED and name not in MODEL_POOL_ALLOWED:
+        raise ValueError(f"Model '{name}' is not served by this deployment")
+
+
+model_pool = ModelPool()
@@ -0,0 +1,263 @@
+import fcntl
+import os
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta, timezone
+
+from app.config import (
+    LOG_ARCHIVE_DIR,
+    LOG_ARCHIVE_RETENTION_DAYS,
+    LOG_DB_PATH,
+    LOG_MAINTENANCE_INTERVAL,
+    LOG_RETENTION_DAYS,
+)
+from app.logger import LAST_ID_COUNTER, LOG_COLUMNS, list_partitions, partition_day
+from app.sinks import row_schema
+from app.storage import get_pool
+
+# Rows read from SQLite per Parquet row group when archiving a partition
+ARCHIVE_BATCH_ROWS = 50_000
+
+
+def archive_path(archive_dir, table):
+    """A new archive file for ``table``, numbered if one already exists.
+
+    A partition is archived again if late rows recreated it after its first
+    archive, and the first archive must not be overwritten.
+    """
+    path = os.path.join(archive_dir, f"{table}.parquet")
+    n = 1
+    while os.path.exists(path):
+        path = os.path.join(archive_dir, f"{table}.{n}.parquet")
+        n += 1
+    return path
+
+
+def export_partition(db, table, path):
+    """Write every row of ``table`` to a zstd-compressed Parquet file."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = row_schema()
+    tmp_path = path + ".tmp"
+    rows = 0
+    cursor = db.execute(f"SELECT id, {', '.join(LOG_COLUMNS)} FROM {table} ORDER BY id")
+    with pq.ParquetWriter(tmp_path, schema, compression="zstd") as writer:
+        while True:
+            batch = cursor.fetchmany(ARCHIVE_BATCH_ROWS)
+            if not batch:
+                break
+            arrays = [
+                pa.array(values, type=field.type)
+                for values, field in zip(zip(*batch), schema)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            rows += len(batch)
+    # Readers never see a partly written archive
+    os.replace(tmp_path, path)
+    return rows
+
+
+def drop_partition(db, table, archived_rows):
+    """Drop an archived partition, remembering its highest id.
+
+    Returns False, leaving the table alone, if rows arrived after the export.
+    """
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        count = db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        if count != archived_rows:
+            db.rollback()
+            return False
+        seq = db.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)
+        ).fetchone()
+        if seq is not None:
+            db.execute(
+                "INSERT INTO log_counters (name, count) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET count = MAX(count, excluded.count)",
+                (LAST_ID_COUNTER, seq[0]),
+            )
+        db.execute(f"DROP TABLE IF EXISTS {table}")
+        db.commit()
+        return True
+    except Exception:
+        db.rollback()
+        raise
+
+
+def reclaim_space(db):
+    """Return freed pages to the filesystem and truncate the WAL."""
+    if db.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        # The pragma frees one page per step, executescript runs all of them
+        db.executescript("PRAGMA incremental_vacuum;")
+    else:
+        # Databases created before incremental auto-vacuum are rewritten once,
+        # which also switches them to incremental mode
+        db.execute("VACUUM")
+    db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+class LogMaintenance:
+    """Archives expired log partitions and keeps the log database small.
+
+    Each run exports the daily partitions older than ``retention_days`` to
+    compressed Parquet files in ``archive_dir``, drops them, vacuums the freed
+    pages and checkpoints the WAL. Archives older than
+    ``archive_retention_days`` are deleted (0 keeps them). With several
+    worker processes only one runs maintenance at a time, the others skip
+    that run.
+    """
+
+    def __init__(
+        self,
+        db_path=LOG_DB_PATH,
+        retention_days=LOG_RETENTION_DAYS,
+        archive_dir=LOG_ARCHIVE_DIR,
+        archive_retention_days=LOG_ARCHIVE_RETENTION_DAYS,
+        interval=LOG_MAINTENANCE_INTERVAL,
+    ):
+        self.db_path = db_path
+        self.retention_days = retention_days
+        self.archive_dir = archive_dir
+        self.archive_retention_days = archive_retention_days
+        self.interval = interval
+
+        self.runs = 0
+        self.archived_partitions = 0
+        self.archived_rows = 0
+        self.deleted_archives = 0
+        self.failures = 0
+        self.last_run = None
+
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval <= 0:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="log-maintenance", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping.set()
+        thread.join(timeout)
+
+    def run_once(self, today=None):
+        """Archive expired partitions now.
+
+        Returns what was done, or None if another process is running
+        maintenance.
+        """
+        today = today or datetime.now(timezone.utc).date()
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        with open(f"{self.db_path}.maintenance.lock", "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+            try:
+                result = self._maintain(today)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        with self._lock:
+            self.runs += 1
+            self.archived_partitions += len(result["archived"])
+            self.archived_rows += result["rows"]
+            self.deleted_archives += len(result["deleted_archives"])
+            self.last_run = time.time()
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "retention_days": self.retention_days,
+                "archive_dir": self.archive_dir,
+                "runs": self.runs,
+                "archived_partitions": self.archived_partitions,
+                "archived_rows": self.archived_rows,
+                "deleted_archives": self.deleted_archives,
+                "failures": self.failures,
+                "last_run": self.last_run,
+            }
+
+    def _maintain(self, today):
+        cutoff = today - timedelta(days=self.retention_days)
+        archived, rows = [], 0
+        # Exports only read, so the log writer keeps the write connection
+        reader = get_pool(self.db_path, readonly=True)
+        writer = get_pool(self.db_path)
+
+        with reader.connection() as db:
+            tables = list_partitions(db)
+        for table in tables:
+            day = partition_day(table)
+            if day is None or day >= cutoff:
+                continue
+            os.makedirs(self.archive_dir, exist_ok=True)
+            path = archive_path(self.archive_dir, table)
+            with reader.connection() as db:
+                exported = export_partition(db, table, path)
+            with writer.connection() as db:
+                dropped = drop_partition(db, table, exported)
+            if not dropped:
+                # Late rows were logged meanwhile, retry on the next run
+                os.remove(path)
+                continue
+            rows += exported
+            archived.append(path)
+            print(f"Archived log partition {table} to {path}")
+
+        with writer.connection() as db:
+            if archived:
+                reclaim_space(db)
+            else:
+                db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        return {
+            "archived": archived,
+            "rows": rows,
+            "deleted_archives": self._delete_old_archives(today),
+        }
+
+    def _delete_old_archives(self, today):
+        if self.archive_retention_days <= 0 or not os.path.isdir(self.archive_dir):
+            return []
+        cutoff = today - timedelta(days=self.archive_retention_days)
+        deleted = []
+        for name in sorted(os.listdir(self.archive_dir)):
+            if not name.endswith(".parquet"):
+                continue
+            try:
+                day = partition_day(name.split(".")[0])
+            except ValueError:
+                continue
+            if day is not None and day < cutoff:
+                os.remove(os.path.join(self.archive_dir, name))
+                deleted.append(name)
+        return deleted
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                print("Log maintenance failed")
+                traceback.print_exc()
+                with self._lock:
+                    self.failures += 1
+
+
+log_maintenance = LogMaintenance()
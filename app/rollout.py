@@ -0,0 +1,204 @@
+import random
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import (
+    CANARY_VERSION,
+    CANARY_WEIGHT,
+    MODEL_NAME,
+    SHADOW_FRACTION,
+    SHADOW_MAX_PENDING,
+    SHADOW_VERSION,
+    SHADOW_WORKERS,
+)
+from app.instrumentation import stage_latency
+from app.logger import log_request
+from app.model import FEATURE_NAMES
+from app.pool import model_pool
+
+# Log statuses of shadow comparison rows, kept apart from request outcomes
+SHADOW_STATUSES = ("agree", "disagree", "shadow_error")
+
+
+def json_value(value):
+    """Plain Python value for NumPy scalars, so predictions can be logged."""
+    item = getattr(value, "item", None)
+    return item() if callable(item) else value
+
+
+class ShadowRunner:
+    """Scores sampled live traffic with a candidate version, off the request path.
+
+    Shadow predictions run on their own small thread pool after the primary
+    response is computed, so they never add to request latency. At most
+    ``max_pending`` comparisons are queued; beyond that new ones are dropped
+    rather than building a backlog. Every comparison is written to the request
+    log with source ``shadow``, status ``agree``/``disagree``/``shadow_error``
+    and both predictions and latencies.
+    """
+
+    def __init__(
+        self,
+        version=SHADOW_VERSION,
+        fraction=SHADOW_FRACTION,
+        workers=SHADOW_WORKERS,
+        max_pending=SHADOW_MAX_PENDING,
+        name=MODEL_NAME,
+    ):
+        self.name = name
+        self.version = version
+        self.fraction = fraction if version else 0.0
+        self.workers = workers
+        self.submitted = 0
+        self.dropped = 0
+        self.agreed = 0
+        self.disagreed = 0
+        self.failed = 0
+        self.latency_delta_total = 0.0
+
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.fraction > 0
+
+    def maybe_submit(self, request, features, prediction, seconds):
+        """Queue a shadow comparison for a sampled fraction of requests."""
+        if not self.enabled or random.random() >= self.fraction:
+            return False
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="shadow"
+                )
+            self.submitted += 1
+        self._executor.submit(self._compare, request, features, prediction, seconds)
+        return True
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def stats(self):
+        with self._lock:
+            compared = self.agreed + self.disagreed
+            rate = self.agreed / compared if compared else None
+            delta = self.latency_delta_total / compared if compared else None
+            return {
+                "version": self.version,
+                "fraction": self.fraction,
+                "submitted": self.submitted,
+                "dropped": self.dropped,
+                "agreed": self.agreed,
+                "disagreed": self.disagreed,
+                "failed": self.failed,
+                "agreement_rate": round(rate, 4) if compared else None,
+                "mean_latency_delta_ms": round(delta * 1000, 4) if compared else None,
+            }
+
+    def _compare(self, request, features, primary, primary_seconds):
+        shadow = None
+        error = None
+        try:
+            model = model_pool.get(self.name, self.version)
+            start = time.perf_counter()
+            row = [features[name] for name in FEATURE_NAMES]
+            shadow = json_value(model.predict([row])[0])
+            seconds = time.perf_counter() - start
+            stage_latency.observe(seconds, "shadow")
+        except Exception as e:
+            error = str(e)
+            traceback.print_exc()
+        finally:
+            self._slots.release()
+
+        with self._lock:
+            if error is not None:
+                status = "shadow_error"
+                self.failed += 1
+            elif str(shadow) == str(primary):
+                status = "agree"
+                self.agreed += 1
+            else:
+                status = "disagree"
+                self.disagreed += 1
+            if error is None:
+                self.latency_delta_total += seconds - primary_seconds
+
+        comparison = {"primary": json_value(primary), "shadow": shadow}
+        if error is None:
+            comparison.update(
+                {
+                    "primary_ms": round(primary_seconds * 1000, 4),
+                    "shadow_ms": round(seconds * 1000, 4),
+                    "latency_delta_ms": round((seconds - primary_seconds) * 1000, 4),
+                }
+            )
+        log_request(
+            request=request,
+            input_data=features,
+            prediction=comparison,
+            status=status,
+            error=error,
+            source="shadow",
+            details=None,
+            model_version=self.version,
+            model_name=self.name,
+        )
+
+
+class CanarySplit:
+    """Routes a weighted share of /predict traffic to a second version."""
+
+    def __init__(self, version=CANARY_VERSION, weight=CANARY_WEIGHT, name=MODEL_NAME):
+        self.name = name
+        self.version = version
+        self.weight = weight if version else 0.0
+        self.routed = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.weight > 0
+
+    def pick(self):
+        """True if this request should be served by the canary version."""
+        return self.enabled and random.random() < self.weight
+
+    def load(self):
+        """The canary model from the pool, or None if it cannot be loaded."""
+        try:
+            model = model_pool.get(self.name, self.version)
+        except Exception:
+            print(f"Canary version {self.version} failed to load")
+            traceback.print_exc()
+            with self._lock:
+                self.failed += 1
+            return None
+        with self._lock:
+            self.routed += 1
+        return model
+
+    def stats(self):
+        with self._lock:
+            return {
+                "version": self.version,
+                "weight": self.weight,
+                "routed": self.routed,
+                "failed": self.failed,
+            }
+
+
+shadow_runner = ShadowRunner()
+canary_split = CanarySplit()
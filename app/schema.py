@@ -0,0 +1,197 @@
+"""Feature schema captured at training time and stored with the model.
+
+``src/model_train.py`` records the training columns (order, dtype, value
+range) and the StandardScaler parameters in the MLmodel metadata of every
+model it saves. At load time the server checks the schema against its
+request fields and wraps the model in a SchemaModel, which lays requests
+out in training column order. A model whose schema does not fit is rejected
+when it is loaded instead of mispredicting.
+"""
+import re
+import warnings
+
+import numpy as np
+
+from app.fastpath import unwrap_estimator
+
+SCHEMA_VERSION = 1
+
+# Key of the schema in the MLmodel metadata
+METADATA_KEY = "feature_schema"
+
+# Estimators fitted on DataFrames warn when given arrays. Column names are
+# checked against the schema when the model is loaded instead.
+FEATURE_NAMES_WARNING = "X does not have valid feature names"
+
+
+class SchemaMismatch(ValueError):
+    """A model's feature schema does not match the features it is served."""
+
+
+def field_name(column):
+    """Request field for a training column, ``SepalLengthCm`` -> ``sepal_length``."""
+    name = re.sub(r"Cm$", "", column)
+    return re.sub(r"(?<=[a-z0-9])(?=[A-Z])", "_", name).lower()
+
+
+class FeatureSchema:
+    """Training columns in order, with their dtype, range and scaling."""
+
+    def __init__(self, columns, scaler=None):
+        self.columns = columns
+        self.scaler = scaler
+        self.names = [c["name"] for c in columns]
+        self.fields = [c["field"] for c in columns]
+        self.low = np.array([c["min"] for c in columns], dtype=np.float64)
+        self.high = np.array([c["max"] for c in columns], dtype=np.float64)
+
+    @classmethod
+    def capture(cls, X, scaler=None):
+        """Record the layout of the unscaled training frame ``X``.
+
+        ``scaler`` is a fitted StandardScaler applied to ``X`` before the
+        model saw it, or None when the model takes raw features.
+        """
+        columns = []
+        for name, dtype in X.dtypes.items():
+            if not np.issubdtype(dtype, np.number):
+                raise SchemaMismatch(f"Feature column {name} is {dtype}, not numeric")
+            values = X[name].to_numpy(dtype=np.float64)
+            columns.append(
+                {
+                    "name": str(name),
+                    "field": field_name(str(name)),
+                    "dtype": str(dtype),
+                    "min": float(np.nanmin(values)),
+                    "max": float(np.nanmax(values)),
+                }
+            )
+        schema = cls(columns)
+        if scaler is not None:
+            schema.scaler = {
+                "mean": scaler.mean_.tolist(),
+                "scale": scaler.scale_.tolist(),
+            }
+        return schema
+
+    def observe(self, X):
+        """Widen the recorded ranges with another batch of training rows."""
+        values = X[self.names].to_numpy(dtype=np.float64)
+        self.low = np.fmin(self.low, np.nanmin(values, axis=0))
+        self.high = np.fmax(self.high, np.nanmax(values, axis=0))
+        for column, low, high in zip(self.columns, self.low, self.high):
+            column["min"], column["max"] = float(low), float(high)
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("version") != SCHEMA_VERSION:
+            raise SchemaMismatch(
+                f"Unsupported feature schema version {data.get('version')}"
+            )
+        return cls(data["columns"], data.get("scaler"))
+
+    def to_dict(self):
+        return {
+            "version": SCHEMA_VERSION,
+            "columns": self.columns,
+            "scaler": self.scaler,
+        }
+
+    def columns_for(self, fields):
+        """Training column names of ``fields``, in that order."""
+        return [self.names[self.fields.index(field)] for field in fields]
+
+    def check(self, fields, n_features=None, feature_names=None):
+        """Raise SchemaMismatch unless a model with this schema can be fed
+        ``fields``. ``n_features`` and ``feature_names`` come from the model.
+        """
+        missing = [f for f in fields if f not in self.fields]
+        unknown = [f for f in self.fields if f not in fields]
+        if missing or unknown or len(set(self.fields)) != len(self.fields):
+            raise SchemaMismatch(
+                f"Model features {self.fields} do not match request fields "
+                f"{list(fields)}"
+            )
+        if n_features is not None and n_features != len(self.columns):
+            raise SchemaMismatch(
+                f"Model takes {n_features} features, its schema lists "
+                f"{len(self.columns)}"
+            )
+        if feature_names is not None and list(feature_names) != self.names:
+            raise SchemaMismatch(
+                f"Model was fitted on columns {list(feature_names)}, its schema "
+                f"lists {self.names}"
+            )
+        if self.scaler is not None and not (
+            len(self.scaler["mean"]) == len(self.scaler["scale"]) == len(self.columns)
+        ):
+            raise SchemaMismatch("Scaler parameters do not match the columns")
+
+
+def model_schema(model):
+    """The FeatureSchema stored in a loaded pyfunc model, or None."""
+    metadata = getattr(getattr(model, "metadata", None), "metadata", None)
+    if not isinstance(metadata, dict) or METADATA_KEY not in metadata:
+        return None
+    return FeatureSchema.from_dict(metadata[METADATA_KEY])
+
+
+class SchemaModel:
+    """Feeds a model rows laid out by its feature schema.
+
+    Rows arrive with their features in ``fields`` order. Each call copies
+    them into one contiguous float64 array in training column order, scales
+    it in place if the model was trained on scaled features, and passes the
+    array to the estimator behind the pyfunc wrapper, so no DataFrame is
+    built per request. ``bounds`` holds the valid range of each field: the
+    training range widened by ``margin`` times its span on each side.
+    """
+
+    def __init__(self, model, schema, fields, margin=0.5):
+        predictor = unwrap_estimator(model)
+        if not hasattr(predictor, "predict"):
+            predictor = model
+        schema.check(
+            fields,
+            n_features=getattr(
+                predictor, "n_features_in_", getattr(predictor, "n_features", None)
+            ),
+            feature_names=getattr(predictor, "feature_names_in_", None),
+        )
+        self.model = model
+        self.schema = schema
+        self.predictor = predictor
+        # Keeps the model uuid reachable for the prediction cache
+        self.metadata = getattr(model, "metadata", None)
+        self.width = len(schema.columns)
+
+        order = np.array([list(fields).index(f) for f in schema.fields], dtype=np.intp)
+        self.order = None if np.array_equal(order, np.arange(self.width)) else order
+
+        if schema.scaler is not None:
+            self.mean = np.asarray(schema.scaler["mean"], dtype=np.float64)
+            self.scale = np.asarray(schema.scaler["scale"], dtype=np.float64)
+        else:
+            self.mean = self.scale = None
+
+        span = schema.high - schema.low
+        low, high = np.empty(self.width), np.empty(self.width)
+        low[order] = schema.low - margin * span
+        high[order] = schema.high + margin * span
+        self.bounds = (low, high)
+
+    def predict(self, rows):
+        rows = np.asarray(rows, dtype=np.float64)
+        out = np.empty((rows.shape[0], self.width))
+        if self.order is None:
+            out[...] = rows
+        else:
+            np.take(rows, self.order, axis=1, out=out)
+        if self.mean is not None:
+            out -= self.mean
+            out /= self.scale
+        with warnings.catch_warnings():
+            warnings.filterwarnings(
+                "ignore", message=FEATURE_NAMES_WARNING, category=UserWarning
+            )
+            return self.predictor.predict(out)
@@ -0,0 +1,134 @@
+"""Pre-fork server: load the model once, then fork workers that share it.
+
+Run with ``python -m app.serve``. The parent imports ``app.main`` (which loads
+and warms the model), freezes the GC so refcount updates do not copy the
+model's pages, binds the listening socket and forks ``SERVE_WORKERS`` uvicorn
+workers. They all accept on the inherited socket and read the model from
+copy-on-write memory. The parent only supervises: it respawns workers that
+die and forwards SIGTERM/SIGINT for a graceful shutdown.
+"""
+import gc
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+from app.config import SERVE_HOST, SERVE_PORT, SERVE_WORKERS
+
+# Shared with forked workers; None when not running under app.serve
+worker_ready = None
+worker_id = None
+
+
+def mark_worker_ready():
+    if worker_ready is not None:
+        worker_ready[worker_id] = 1
+
+
+def mark_worker_stopped():
+    if worker_ready is not None:
+        worker_ready[worker_id] = 0
+
+
+def worker_readiness():
+    """``(ready, expected)`` workers, or None outside pre-fork mode."""
+    if worker_ready is None:
+        return None
+    return sum(worker_ready), len(worker_ready)
+
+
+def bind_socket(host, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock, index):
+    global worker_id
+    import uvicorn
+
+    from app.main import app
+
+    worker_id = index
+
+    # Default signal handling, uvicorn installs its own
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    print(f"Worker {index} (pid {os.getpid()}) starting")
+    server = uvicorn.Server(uvicorn.Config(app, lifespan="on"))
+    server.run(sockets=[sock])
+    os._exit(0)
+
+
+def spawn_worker(sock, index):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(sock, index)
+        finally:
+            os._exit(1)
+    return pid
+
+
+def serve(host=SERVE_HOST, port=SERVE_PORT, workers=SERVE_WORKERS):
+    global worker_ready
+
+    # Load and warm the model once, before forking
+    from app import main
+
+    if main.model_warming.is_set():
+        main.load_and_warm_up()
+
+    worker_ready = multiprocessing.Array("b", workers)
+    sock = bind_socket(host, port)
+    print(f"Listening on http://{host}:{port} with {workers} workers")
+
+    # Move everything loaded so far out of the GC's reach, so collections in
+    # the workers do not write to (and un-share) the model's memory pages
+    gc.collect()
+    gc.freeze()
+
+    children = {spawn_worker(sock, i): i for i in range(workers)}
+    stopping = False
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+
+        index = children.pop(pid, None)
+        if index is None:
+            continue
+        worker_ready[index] = 0
+        if stopping:
+            continue
+        print(f"Worker {index} (pid {pid}) exited with status {status}, respawning")
+        time.sleep(1)
+        children[spawn_worker(sock, index)] = index
+
+    sock.close()
+    print("All workers stopped")
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,640 @@
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from operator import itemgetter
+
+from app.config import (
+    LOG_FSYNC,
+    LOG_FSYNC_INTERVAL_MS,
+    LOG_JSONL_MAX_BYTES,
+    LOG_JSONL_PATH,
+    LOG_SEGMENT_DIR,
+    LOG_SEGMENT_ROWS,
+    LOG_SEGMENT_SECONDS,
+)
+
+LOG_COLUMNS = (
+    "timestamp",
+    "method",
+    "url",
+    "input",
+    "prediction",
+    "status",
+    "error",
+    "source",
+    "details",
+    "model_stage",
+    "model_name",
+    "model_source",
+    "model_version",
+)
+
+STATUS_INDEX = LOG_COLUMNS.index("status")
+
+# Closed files are named after the first and last id they hold
+ID_RANGE = re.compile(r"-(\d+)-(\d+)\.\w+$")
+
+
+def row_schema():
+    """Arrow schema of a stored log row: its id, then every log column."""
+    import pyarrow as pa
+
+    return pa.schema(
+        [("id", pa.int64())] + [(column, pa.string()) for column in LOG_COLUMNS]
+    )
+
+
+def status_counters(statuses):
+    """Counts in the shape of the SQLite ``log_counters`` table."""
+    counts = Counter(f"status:{'none' if s is None else s}" for s in statuses)
+    counts["total"] = sum(counts.values())
+    return counts
+
+
+def row_filter(status=None, source=None, cursor=None):
+    def matches(row):
+        return (
+            (status is None or row["status"] == status)
+            and (source is None or row["source"] == source)
+            and (cursor is None or row["id"] < cursor)
+        )
+
+    return matches
+
+
+def newest_rows(sources, wanted):
+    """The ``wanted`` rows with the highest ids across ``sources``.
+
+    ``sources`` are ``(last_id, read)`` pairs, where ``read()`` returns up to
+    ``wanted`` matching rows of one file, newest first. Files are read newest
+    first and reading stops once no remaining file can hold a newer row.
+    """
+    rows = []
+    for last_id, read in sorted(sources, key=itemgetter(0), reverse=True):
+        if len(rows) >= wanted and last_id < rows[-1]["id"]:
+            break
+        rows = sorted(rows + read(), key=itemgetter("id"), reverse=True)[:wanted]
+    return rows
+
+
+def reverse_lines(path, block_size=1 << 16):
+    """Complete lines of ``path``, last first.
+
+    A last line without its newline is still being written and is skipped.
+    """
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        rest = None
+        while pos > 0:
+            size = min(block_size, pos)
+            pos -= size
+            f.seek(pos)
+            chunk = f.read(size)
+            if rest is None:
+                cut = chunk.rfind(b"\n")
+                if cut < 0:
+                    continue
+                chunk, rest = chunk[:cut], b""
+            lines = (chunk + rest).split(b"\n")
+            rest = lines[0]
+            for line in reversed(lines[1:]):
+                if line:
+                    yield line
+        if rest:
+            yield rest
+
+
+def fsync_path(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class IdSequence:
+    """Row ids shared by every process writing to one sink.
+
+    The last id handed out is kept in a small file and advanced under an
+    exclusive lock. ``recover`` gives the last id when the file is new.
+    """
+
+    def __init__(self, path, recover=None):
+        self.path = path
+        self.recover = recover
+
+    @contextmanager
+    def claim(self, n):
+        """Reserve ``n`` ids and yield the first, holding the lock meanwhile.
+
+        The ids are used up even if the body fails, so a partly written
+        batch never shares ids with the next one.
+        """
+        # Opened per claim, a descriptor inherited over fork would share the lock
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            data = os.pread(fd, 32, 0).strip()
+            last = int(data) if data else (self.recover() if self.recover else 0)
+            # Fixed width, so the file never needs truncating
+            os.pwrite(fd, b"%020d" % (last + n), 0)
+            yield last + 1
+        finally:
+            os.close(fd)
+
+    def next(self, n):
+        with self.claim(n) as first:
+            return first
+
+
+class LogSink:
+    """Where the log writer sends rows and /metrics reads them back from.
+
+    The writer thread calls ``open`` once, ``write`` for every batch of row
+    tuples (``LOG_COLUMNS`` order) and ``poll`` while idle, so time-based
+    work like interval fsyncs happens without new rows. ``fsync`` is
+    ``always`` (before a batch counts as written), ``interval`` (at most
+    ``fsync_interval`` seconds after it) or ``never`` (left to the OS).
+    """
+
+    name = None
+
+    def __init__(self, fsync=LOG_FSYNC, fsync_interval=LOG_FSYNC_INTERVAL_MS / 1000):
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.syncs = 0
+        self._last_sync = time.monotonic()
+        self._unsynced = False
+
+    def open(self):
+        pass
+
+    def write(self, rows):
+        raise NotImplementedError
+
+    def poll(self):
+        pass
+
+    def close(self):
+        pass
+
+    def read(self, status=None, source=None, limit=25, offset=0, cursor=None):
+        """Counters and the newest matching rows, as ``(counters, rows)``.
+
+        Rows are dicts of ``id`` and ``LOG_COLUMNS``, newest first.
+        """
+        raise NotImplementedError
+
+    def check(self):
+        """Raise if rows cannot be written or read back."""
+
+    def stats(self):
+        return {"fsync": self.fsync, "syncs": self.syncs}
+
+    def _sync_due(self, force=False):
+        if not self._unsynced or self.fsync == "never":
+            return False
+        if force or self.fsync == "always":
+            return True
+        return time.monotonic() - self._last_sync >= self.fsync_interval
+
+    def _synced(self):
+        self._last_sync = time.monotonic()
+        self._unsynced = False
+        self.syncs += 1
+
+
+class FileSink(LogSink):
+    """Shared by the sinks that write files to one directory."""
+
+    def __init__(self, directory, **kwargs):
+        super().__init__(**kwargs)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        # Per closed file counters, closed files never change
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def closed_files(self, pattern):
+        """``(first_id, last_id, path)`` of closed files, newest first."""
+        files = []
+        for name in os.listdir(self.directory):
+            match = ID_RANGE.search(name)
+            if re.fullmatch(pattern, name) and match:
+                first, last = int(match.group(1)), int(match.group(2))
+                files.append((first, last, os.path.join(self.directory, name)))
+        return sorted(files, reverse=True)
+
+    def _closed_counts(self, path, count):
+        name = os.path.basename(path)
+        if name not in self._counts:
+            self._counts[name] = count(path)
+        return self._counts[name]
+
+    def check(self):
+        if not os.access(self.directory, os.W_OK):
+            raise Exception(f"Log directory {self.directory} is not writable")
+
+
+class JsonlSink(FileSink):
+    """Appends rows as JSON lines to ``path``, rotated by size.
+
+    Each batch is one ``write`` call. Once the file reaches ``max_bytes`` it
+    is renamed to ``<name>-<first id>-<last id>.jsonl`` and a new file is
+    started. Several processes can append to the same file, appends and
+    rotation happen while holding the id lock.
+    """
+
+    name = "jsonl"
+
+    def __init__(self, path=LOG_JSONL_PATH, max_bytes=LOG_JSONL_MAX_BYTES, **kwargs):
+        super().__init__(os.path.dirname(path) or ".", **kwargs)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.stem = os.path.splitext(os.path.basename(path))[0]
+        self.sequence = IdSequence(path + ".seq", recover=self._last_id_on_disk)
+        self.rotations = 0
+
+        self._fd = None
+        self._pid = None
+        # Inode, offset already counted and counts of the active file
+        self._active = (None, 0, Counter())
+
+    def write(self, rows):
+        with self.sequence.claim(len(rows)) as first:
+            fd = self._open()
+            data = "".join(
+                json.dumps({"id": first + i, **dict(zip(LOG_COLUMNS, row))}) + "\n"
+                for i, row in enumerate(rows)
+            ).encode()
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            self._unsynced = True
+            if os.fstat(fd).st_size >= self.max_bytes:
+                self._rotate(fd, first + len(rows) - 1)
+                return
+        if self._sync_due():
+            os.fsync(fd)
+            self._synced()
+
+    def poll(self):
+        if self._fd is not None and self._sync_due():
+            os.fsync(self._fd)
+            self._synced()
+
+    def close(self):
+        if self._fd is None:
+            return
+        if self._sync_due(force=True):
+            os.fsync(self._fd)
+            self._synced()
+        os.close(self._fd)
+        self._fd = None
+
+    def _open(self):
+        if self._fd is not None:
+            # Reopen when another process rotated the file or after a fork
+            try:
+                current = os.stat(self.path).st_ino == os.fstat(self._fd).st_ino
+            except FileNotFoundError:
+                current = False
+            if current and self._pid == os.getpid():
+                return self._fd
+            os.close(self._fd)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._pid = os.getpid()
+        return self._fd
+
+    def _rotate(self, fd, last_id):
+        with open(self.path, "rb") as f:
+            first_id = json.loads(f.readline())["id"]
+        if self.fsync != "never":
+            os.fsync(fd)
+            self._synced()
+        name = f"{self.stem}-{first_id:012d}-{last_id:012d}.jsonl"
+        os.rename(self.path, os.path.join(self.directory, name))
+        os.close(fd)
+        self._fd = None
+        self.rotations += 1
+
+    def _closed(self):
+        return self.closed_files(re.escape(self.stem) + r"-\d+-\d+\.jsonl")
+
+    def _last_id_on_disk(self):
+        if os.path.exists(self.path):
+            for line in reverse_lines(self.path):
+                return json.loads(line)["id"]
+        closed = self._closed()
+        return closed[0][1] if closed else 0
+
+    def _count_file(self, path):
+        with open(path, "rb") as f:
+            return status_counters(json.loads(line)["status"] for line in f)
+
+    def _active_counts(self):
+        inode, offset, counts = self._active
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return Counter()
+        with f:
+            st = os.fstat(f.fileno())
+            if st.st_ino != inode:
+                # Rotated since the last read, its rows are in a closed file now
+                offset, counts = 0, Counter()
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                counts.update(status_counters([json.loads(line)["status"]]))
+                offset += len(line)
+        self._active = (st.st_ino, offset, counts)
+        return counts
+
+    def _scan(self, path, matches, wanted):
+        rows = []
+        try:
+            for line in reverse_lines(path):
+                row = json.loads(line)
+                if matches(row):
+                    rows.append(row)
+                    if len(rows) >= wanted:
+                        break
+        except FileNotFoundError:
+            # Rotated since it was listed
+            pass
+        return rows
+
+    def read(self, status=None, source=None, limit=25, offset=0, cursor=None):
+        # Files are listed before the active file is read, so a rotation in
+        # between can only leave rows out of this one response
+        closed = self._closed()
+        with self._lock:
+            counters = Counter()
+            for _, _, path in closed:
+                counters.update(self._closed_counts(path, self._count_file))
+            counters.update(self._active_counts())
+
+        wanted = limit + offset
+        matches = row_filter(status, source, cursor)
+        sources = [
+            (last, lambda path=path: self._scan(path, matches, wanted))
+            for first, last, path in closed
+            if cursor is None or first < cursor
+        ]
+        # Everything in the active file is newer than the closed files
+        sources.append((float("inf"), lambda: self._scan(self.path, matches, wanted)))
+        return dict(counters), newest_rows(sources, wanted)[offset:]
+
+    def stats(self):
+        return {
+            **super().stats(),
+            "path": self.path,
+            "files": len(self._closed()) + os.path.exists(self.path),
+            "rotations": self.rotations,
+        }
+
+
+class SegmentSink(FileSink):
+    """Writes rows to compressed columnar segment files.
+
+    Rows are buffered and written as one Parquet file per segment once
+    ``segment_rows`` rows were buffered or ``segment_seconds`` after the
+    first of them. A segment is written to a temporary file and renamed, so
+    readers only see complete ones, and /metrics also reads the rows still
+    buffered by this process. A segment that fails to write stays buffered
+    for the next attempt and is reported by ``check``, it is not failed back
+    to the log writer, which would spill rows that are still buffered.
+    Buffered rows are lost if the process is killed, add a JSONL sink next
+    to it when every row must survive that.
+    """
+
+    name = "segments"
+
+    def __init__(
+        self,
+        directory=LOG_SEGMENT_DIR,
+        segment_rows=LOG_SEGMENT_ROWS,
+        segment_seconds=LOG_SEGMENT_SECONDS,
+        compression="zstd",
+        **kwargs,
+    ):
+        super().__init__(directory, **kwargs)
+        self.segment_rows = segment_rows
+        self.segment_seconds = segment_seconds
+        self.compression = compression
+        self.sequence = IdSequence(
+            os.path.join(directory, "ids.seq"), recover=self._last_id_on_disk
+        )
+        self.segments_written = 0
+        self.segment_failures = 0
+        self.last_error = None
+
+        # Rows with their id, waiting for the next segment
+        self._buffer = []
+        self._buffer_started = None
+        # Rows of the segment being written, still visible to readers
+        self._pending = []
+
+    def write(self, rows):
+        first = self.sequence.next(len(rows))
+        with self._lock:
+            if not self._buffer:
+                self._buffer_started = time.monotonic()
+            self._buffer.extend((first + i,) + tuple(row) for i, row in enumerate(rows))
+            full = len(self._buffer) >= self.segment_rows
+        if full:
+            self._write_segment()
+
+    def poll(self):
+        started = self._buffer_started
+        if started is not None and time.monotonic() - started >= self.segment_seconds:
+            self._write_segment()
+
+    def close(self):
+        self._write_segment(force_sync=True)
+
+    def _write_segment(self, force_sync=False):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+            self._buffer_started = None
+            self._pending = rows
+        if not rows:
+            return
+        try:
+            schema = row_schema()
+            arrays = [
+                pa.array(values, type=field.type)
+                for values, field in zip(zip(*rows), schema)
+            ]
+            name = f"segment-{rows[0][0]:012d}-{rows[-1][0]:012d}.parquet"
+            path = os.path.join(self.directory, name)
+            pq.write_table(
+                pa.Table.from_arrays(arrays, schema=schema),
+                path + ".tmp",
+                compression=self.compression,
+            )
+            self._unsynced = True
+            if self._sync_due(force=force_sync):
+                fsync_path(path + ".tmp")
+                self._synced()
+            os.replace(path + ".tmp", path)
+        except Exception as e:
+            print(f"Failed to write a segment of {len(rows)} log rows, retrying later")
+            traceback.print_exc()
+            with self._lock:
+                # Kept for the next attempt
+                self._buffer = rows + self._buffer
+                self._buffer_started = self._buffer_started or time.monotonic()
+                self.segment_failures += 1
+                self.last_error = str(e)
+            return
+        finally:
+            with self._lock:
+                self._pending = []
+        self.segments_written += 1
+        self.last_error = None
+
+    def check(self):
+        super().check()
+        if self.last_error is not None:
+            raise Exception(f"Log segment could not be written: {self.last_error}")
+
+    def _closed(self):
+        return self.closed_files(r"segment-\d+-\d+\.parquet")
+
+    def _last_id_on_disk(self):
+        closed = self._closed()
+        return max(last for _, last, _ in closed) if closed else 0
+
+    def _count_file(self, path):
+        import pyarrow.parquet as pq
+
+        return status_counters(pq.read_table(path, columns=["status"])[0].to_pylist())
+
+    def _scan(self, path, status, source, cursor, wanted):
+        import pyarrow.parquet as pq
+
+        filters = [("id", "<", cursor)] if cursor is not None else []
+        if status is not None:
+            filters.append(("status", "=", status))
+        if source is not None:
+            filters.append(("source", "=", source))
+        try:
+            table = pq.read_table(path, filters=filters or None)
+        except FileNotFoundError:
+            return []
+        return table.slice(max(0, table.num_rows - wanted)).to_pylist()[::-1]
+
+    def read(self, status=None, source=None, limit=25, offset=0, cursor=None):
+        closed = self._closed()
+        with self._lock:
+            buffered = [
+                dict(zip(("id",) + LOG_COLUMNS, row))
+                for row in self._pending + self._buffer
+            ]
+            counters = Counter()
+            for _, _, path in closed:
+                counters.update(self._closed_counts(path, self._count_file))
+        counters.update(status_counters(row["status"] for row in buffered))
+
+        wanted = limit + offset
+        matches = row_filter(status, source, cursor)
+        sources = [
+            (
+                last,
+                lambda path=path: self._scan(path, status, source, cursor, wanted),
+            )
+            for first, last, path in closed
+            if cursor is None or first < cursor
+        ]
+        # Other processes write their own segments, so ids can interleave
+        newest = [row for row in reversed(buffered) if matches(row)][:wanted]
+        if newest:
+            sources.append((newest[0]["id"], lambda: newest))
+        return dict(counters), newest_rows(sources, wanted)[offset:]
+
+    def stats(self):
+        with self._lock:
+            buffered = len(self._buffer)
+        return {
+            **super().stats(),
+            "directory": self.directory,
+            "segments": len(self._closed()),
+            "segments_written": self.segments_written,
+            "segment_failures": self.segment_failures,
+            "buffered_rows": buffered,
+        }
+
+
+class FanoutSink(LogSink):
+    """Writes every batch to several sinks and reads from the first.
+
+    A failing secondary sink does not fail the batch, its failed rows are
+    counted in ``stats``. A failure of the first sink is raised once the
+    others were written.
+    """
+
+    name = "fanout"
+
+    def __init__(self, sinks):
+        super().__init__()
+        self.sinks = list(sinks)
+        self.failed = Counter()
+
+    @property
+    def primary(self):
+        return self.sinks[0]
+
+    def open(self):
+        for sink in self.sinks:
+            sink.open()
+
+    def write(self, rows):
+        self._each("write", rows)
+
+    def poll(self):
+        self._each("poll")
+
+    def close(self):
+        self._each("close")
+
+    def _each(self, method, *args):
+        error = None
+        for sink in self.sinks:
+            try:
+                getattr(sink, method)(*args)
+            except Exception as e:
+                if method == "write":
+                    self.failed[sink.name] += len(args[0])
+                if sink is self.primary:
+                    error = e
+                else:
+                    print(f"Log sink {sink.name} failed to {method}")
+                    traceback.print_exc()
+        if error is not None:
+            raise error
+
+    def read(self, **kwargs):
+        return self.primary.read(**kwargs)
+
+    def check(self):
+        for sink in self.sinks:
+            sink.check()
+
+    def stats(self):
+        return {
+            **self.primary.stats(),
+            "sinks": {sink.name: sink.stats() for sink in self.sinks},
+            "failed_rows": dict(self.failed),
+        }
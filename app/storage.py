@@ -0,0 +1,160 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from app.config import (
+    LOG_DB_PATH,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_CACHE_SIZE_KB,
+    SQLITE_MMAP_SIZE_MB,
+    SQLITE_READ_POOL_SIZE,
+    SQLITE_STATEMENT_CACHE,
+)
+
+# Applied to every connection. WAL lets readers run alongside the writer and
+# several worker processes append safely, NORMAL sync is durable across
+# application crashes in WAL mode, and the busy timeout makes a writer wait
+# for another process's transaction instead of failing with "database is
+# locked".
+PRAGMAS = {
+    "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+    "cache_size": -SQLITE_CACHE_SIZE_KB,
+    "temp_store": "MEMORY",
+    "mmap_size": SQLITE_MMAP_SIZE_MB * 1024 * 1024,
+}
+
+WRITE_PRAGMAS = {
+    # Lets maintenance return the space of archived partitions without
+    # rewriting the whole file (new databases, or after the next VACUUM)
+    "auto_vacuum": "INCREMENTAL",
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+}
+
+
+def connect(path=LOG_DB_PATH, readonly=False, **kwargs):
+    """Open the log database with the tuned pragmas.
+
+    Read-only connections are opened with ``mode=ro`` and ``query_only`` so
+    they can never take the write lock, and return ``sqlite3.Row`` rows.
+    Statements are compiled once per connection and reused from its
+    statement cache.
+    """
+    kwargs.setdefault("cached_statements", SQLITE_STATEMENT_CACHE)
+    timeout = SQLITE_BUSY_TIMEOUT_MS / 1000
+    if readonly:
+        uri = f"file:{os.path.abspath(path)}?mode=ro"
+        db = sqlite3.connect(uri, uri=True, timeout=timeout, **kwargs)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA query_only=1")
+    else:
+        db = sqlite3.connect(path, timeout=timeout, **kwargs)
+        for name, value in WRITE_PRAGMAS.items():
+            db.execute(f"PRAGMA {name}={value}")
+    for name, value in PRAGMAS.items():
+        db.execute(f"PRAGMA {name}={value}")
+    return db
+
+
+class ConnectionPool:
+    """Up to ``size`` connections to one database, shared between threads.
+
+    Connections are opened on first use and handed to one thread at a time.
+    A thread that finds every connection in use waits for one to be released.
+    """
+
+    def __init__(self, path=LOG_DB_PATH, size=1, readonly=False):
+        self.path = path
+        self.size = size
+        self.readonly = readonly
+        self.created = 0
+        self.waits = 0
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        # Connections inherited over fork, kept so they are never closed here
+        self._abandoned = []
+
+    @contextmanager
+    def connection(self, timeout=None):
+        db = self._acquire(timeout)
+        try:
+            yield db
+        finally:
+            if db.in_transaction:
+                db.rollback()
+            self._idle.put(db)
+
+    def _acquire(self, timeout):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self.created < self.size:
+                self.created += 1
+                try:
+                    return connect(
+                        self.path, readonly=self.readonly, check_same_thread=False
+                    )
+                except Exception:
+                    self.created -= 1
+                    raise
+            self.waits += 1
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No free connection to {self.path}") from None
+
+    def reset(self):
+        """Forget every connection, for use in a freshly forked child."""
+        with self._lock:
+            while True:
+                try:
+                    self._abandoned.append(self._idle.get_nowait())
+                except queue.Empty:
+                    break
+            self._idle = queue.LifoQueue()
+            self.created = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "path": self.path,
+                "readonly": self.readonly,
+                "size": self.size,
+                "open": self.created,
+                "idle": self._idle.qsize(),
+                "waits": self.waits,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path=LOG_DB_PATH, readonly=False):
+    """The process-wide pool for ``path``.
+
+    Writes go through a single connection per process, SQLite allows one
+    writer at a time anyway. Reads get their own pool of read-only
+    connections, which in WAL mode never wait for the writer.
+    """
+    key = (os.path.abspath(path), readonly)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            size = SQLITE_READ_POOL_SIZE if readonly else 1
+            pool = _pools[key] = ConnectionPool(path, size, readonly)
+        return pool
+
+
+def _reset_after_fork():
+    # A SQLite connection must not be shared with a forked worker
+    for pool in _pools.values():
+        pool.reset()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
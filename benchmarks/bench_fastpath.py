@@ -0,0 +1,106 @@
+"""Compare pyfunc, raw sklearn and compiled fast-path prediction latency.
+
+Run from the repo root:
+
+    PYTHONPATH=. python benchmarks/bench_fastpath.py
+    PYTHONPATH=. python benchmarks/bench_fastpath.py \
+        --model-dir artifacts/iris_classifier
+"""
+import argparse
+import json
+import tempfile
+import time
+
+import mlflow.pyfunc
+import mlflow.sklearn
+import numpy as np
+from sklearn.datasets import load_iris
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+from app.fastpath import build_fast_path, load_sklearn_estimator, unwrap_estimator
+
+
+def time_call(fn, rows, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def bench_model(label, pyfunc_model, estimator, X, batch_sizes, repeat):
+    compiled = build_fast_path(pyfunc_model, rows=X)
+    predictors = {
+        "pyfunc": pyfunc_model.predict,
+        "sklearn": estimator.predict,
+    }
+    if compiled is not pyfunc_model:
+        predictors["fast_path"] = compiled.predict
+
+    rng = np.random.default_rng(0)
+    results = {}
+    for name, fn in predictors.items():
+        single = X[:1]
+        entry = {"per_row_us": round(time_call(fn, single, repeat) * 1e6, 2)}
+        for size in batch_sizes:
+            batch = X[rng.integers(0, len(X), size)]
+            seconds = time_call(fn, batch, max(3, repeat // 20))
+            entry[f"batch_{size}_ms"] = round(seconds * 1e3, 3)
+            entry[f"batch_{size}_us_per_row"] = round(seconds / size * 1e6, 3)
+        results[name] = entry
+
+    print(f"\n{label}")
+    for name, entry in results.items():
+        print(f"  {name:<10} " + "  ".join(f"{k}={v}" for k, v in entry.items()))
+    return results
+
+
+def trained_models(X, y):
+    return {
+        "logistic_regression": LogisticRegression(max_iter=500).fit(X, y),
+        "random_forest_classifier": RandomForestClassifier(
+            n_estimators=100, random_state=42
+        ).fit(X, y),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--model-dir", type=str, default=None, help="Benchmark this MLflow model dir"
+    )
+    parser.add_argument("--repeat", type=int, default=500, help="Single-row calls")
+    parser.add_argument(
+        "--batch-sizes", type=int, nargs="+", default=[100, 10_000, 100_000]
+    )
+    parser.add_argument("--output", type=str, default=None, help="Write JSON here")
+    args = parser.parse_args()
+
+    iris = load_iris()
+    X = iris.data
+    results = {}
+
+    if args.model_dir:
+        model = mlflow.pyfunc.load_model(args.model_dir)
+        estimator = load_sklearn_estimator(args.model_dir)
+        results[args.model_dir] = bench_model(
+            args.model_dir, model, estimator, X, args.batch_sizes, args.repeat
+        )
+    else:
+        y = np.array([iris.target_names[t] for t in iris.target])
+        for name, estimator in trained_models(X, y).items():
+            path = f"{tempfile.mkdtemp()}/{name}"
+            mlflow.sklearn.save_model(
+                estimator, path=path, serialization_format="cloudpickle"
+            )
+            model = mlflow.pyfunc.load_model(path)
+            results[name] = bench_model(
+                name, model, unwrap_estimator(model), X, args.batch_sizes, args.repeat
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to: {args.output}")
@@ -0,0 +1,124 @@
+"""Compare sustained log insert throughput of each log sink and fsync policy.
+
+Rows are pushed through a LogWriter as fast as it accepts them (block
+backpressure) and timed until the writer has drained its queue and closed the
+sink, so the figure includes batching and every fsync. Run from the repo root:
+
+    PYTHONPATH=. python benchmarks/bench_log_sinks.py
+    PYTHONPATH=. python benchmarks/bench_log_sinks.py --rows 200000 --fsync always
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from app.logger import LogWriter, SQLiteSink
+from app.sinks import FanoutSink, JsonlSink, SegmentSink
+
+SINKS = ["sqlite", "jsonl", "segments", "sqlite+jsonl"]
+FSYNC_POLICIES = ["always", "interval", "never"]
+
+
+def make_row(i):
+    return (
+        "2025-08-11 12:00:00",
+        "POST",
+        "http://localhost:8000/predict",
+        json.dumps(
+            {
+                "sepal_length": 5.1,
+                "sepal_width": 3.5,
+                "petal_length": 1.4,
+                "petal_width": 0.2,
+            }
+        ),
+        json.dumps("setosa"),
+        "error" if i % 20 == 0 else "success",
+        None,
+        "api",
+        None,
+        "Staging",
+        "iris_classifier",
+        "LOCAL",
+        "1",
+    )
+
+
+def build(name, workdir, fsync):
+    if "+" in name:
+        return FanoutSink(build(part, workdir, fsync) for part in name.split("+"))
+    if name == "sqlite":
+        return SQLiteSink(os.path.join(workdir, "logs.db"), fsync=fsync)
+    if name == "jsonl":
+        return JsonlSink(os.path.join(workdir, "requests.jsonl"), fsync=fsync)
+    return SegmentSink(os.path.join(workdir, "segments"), fsync=fsync)
+
+
+def disk_bytes(workdir):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(workdir)
+        for name in names
+    )
+
+
+def bench(name, fsync, rows, batch_size):
+    workdir = tempfile.mkdtemp(prefix="bench_log_sinks_")
+    try:
+        sink = build(name, workdir, fsync)
+        writer = LogWriter(
+            sink=sink,
+            queue_size=batch_size * 4,
+            batch_size=batch_size,
+            flush_interval=0.05,
+            backpressure="block",
+        )
+        batch = [make_row(i) for i in range(rows)]
+        start = time.perf_counter()
+        for row in batch:
+            writer.submit(row)
+        writer.stop(timeout=600)
+        elapsed = time.perf_counter() - start
+        stats = writer.stats()
+        return {
+            "rows": rows,
+            "written": stats["written"],
+            "failed": stats["failed"],
+            "seconds": round(elapsed, 4),
+            "rows_per_s": round(stats["written"] / elapsed),
+            "syncs": sink.stats()["syncs"],
+            "bytes_on_disk": disk_bytes(workdir),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--sinks", nargs="+", default=SINKS, choices=SINKS)
+    parser.add_argument(
+        "--fsync", nargs="+", default=FSYNC_POLICIES, choices=FSYNC_POLICIES
+    )
+    parser.add_argument("--output", type=str, default=None, help="Write JSON here")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.sinks:
+        results[name] = {}
+        for fsync in args.fsync:
+            summary = bench(name, fsync, args.rows, args.batch_size)
+            results[name][fsync] = summary
+            print(
+                f"{name:<13} fsync={fsync:<8} {summary['rows_per_s']:>9} rows/s "
+                f"syncs={summary['syncs']:<5} "
+                f"disk={summary['bytes_on_disk'] / 1e6:.1f}MB"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to: {args.output}")
@@ -0,0 +1,87 @@
+"""Compare per-request CPU of /predict body handling: pydantic path vs fast path.
+
+Both paths parse a request body, validate it, serialize the input and the
+prediction for the log row and render the response. No model is called, so
+the difference is what the endpoint itself spends per request. Run from the
+repo root:
+
+    PYTHONPATH=. python benchmarks/bench_request_codec.py
+    PYTHONPATH=. python benchmarks/bench_request_codec.py --requests 200000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.codec import dumps, orjson, parse_features, to_json
+from app.main import Input, prediction_response
+
+BODY = json.dumps(
+    {
+        "sepal_length": 5.1,
+        "sepal_width": 3.5,
+        "petal_length": 1.4,
+        "petal_width": 0.2,
+    }
+).encode()
+PREDICTION = np.str_("Iris-setosa")
+
+
+def pydantic_path(body):
+    # What FastAPI did for `data: Input` plus the log and response encoding
+    data = Input(**json.loads(body))
+    input_dict = data.model_dump()
+    row = (json.dumps(input_dict), json.dumps(PREDICTION))
+    response = JSONResponse(jsonable_encoder({"prediction": PREDICTION}))
+    return row, response.body
+
+
+def fast_path(body):
+    features, _, input_json = parse_features(body, Input)
+    prediction_json = dumps(PREDICTION)
+    row = (to_json(input_json), to_json(prediction_json))
+    response = prediction_response(prediction_json)
+    return row, response.body
+
+
+def cpu_per_request(fn, requests):
+    for _ in range(min(requests, 1000)):
+        fn(BODY)
+    start = time.process_time()
+    for _ in range(requests):
+        fn(BODY)
+    return (time.process_time() - start) / requests
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--output", type=str, default=None, help="Write JSON here")
+    args = parser.parse_args()
+
+    assert json.loads(pydantic_path(BODY)[1]) == json.loads(fast_path(BODY)[1])
+
+    results = {
+        "json_library": "orjson" if orjson is not None else "json",
+        "requests": args.requests,
+    }
+    for name, fn in (("pydantic", pydantic_path), ("fast_path", fast_path)):
+        results[f"{name}_us"] = round(cpu_per_request(fn, args.requests) * 1e6, 2)
+    results["saved_us"] = round(results["pydantic_us"] - results["fast_path_us"], 2)
+    results["speedup"] = round(results["pydantic_us"] / results["fast_path_us"], 2)
+
+    print(
+        f"pydantic  {results['pydantic_us']:>8} us/request\n"
+        f"fast path {results['fast_path_us']:>8} us/request "
+        f"({results['json_library']})\n"
+        f"saved     {results['saved_us']:>8} us/request "
+        f"({results['speedup']}x)"
+    )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to: {args.output}")
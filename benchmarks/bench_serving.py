@@ -0,0 +1,478 @@
+"""Load test the serving API and report latency percentiles and throughput.
+
+The app runs in-process (default), in a local uvicorn started for the run
+(--serve) or anywhere else (--url). In-process and --serve replace the MLflow
+model with a stub that answers after --model-latency-ms, and write request
+logs to a temporary directory. Traffic is replayed from a JSONL file
+(--traffic) or generated, either closed-loop with --concurrency clients or
+open-loop at a fixed --qps. Run from the repo root:
+
+    PYTHONPATH=. python benchmarks/bench_serving.py --requests 5000 --output run.json
+    PYTHONPATH=. python benchmarks/bench_serving.py --serve --qps 200 --duration 30
+    PYTHONPATH=. python benchmarks/bench_serving.py --baseline run.json
+
+With --baseline the run exits with status 1 if an endpoint got slower or
+started failing more than --tolerance allows.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import httpx
+import numpy as np
+
+# Nothing from app is imported at module level: the stub environment has to
+# be in place before app.config reads it
+
+RESULTS_VERSION = 1
+
+DEFAULT_MIX = {"predict": 0.9, "metrics": 0.05, "health": 0.05}
+
+# Feature ranges of the iris data, generated rows stay within them
+FEATURE_RANGES = {
+    "sepal_length": (4.3, 7.9),
+    "sepal_width": (2.0, 4.4),
+    "petal_length": (1.0, 6.9),
+    "petal_width": (0.1, 2.5),
+}
+
+
+class StubModel:
+    """Stands in for the MLflow model: a fixed answer after a fixed delay."""
+
+    def __init__(self, latency_ms=0.0):
+        self.latency = latency_ms / 1000
+
+    def predict(self, rows):
+        if self.latency:
+            time.sleep(self.latency)
+        return np.array(["Iris-setosa"] * len(rows), dtype=object)
+
+
+def stub_environment(workdir):
+    """Serve a local model and keep request logs and pollers out of the way."""
+    defaults = {
+        "MODEL_SOURCE": "LOCAL",
+        "MODEL_LOAD_MODE": "eager",
+        "MODEL_POLL_INTERVAL": "0",
+        "LOG_DB_PATH": os.path.join(workdir, "logs.db"),
+        "LOG_JSONL_PATH": os.path.join(workdir, "requests.jsonl"),
+        "LOG_SEGMENT_DIR": os.path.join(workdir, "segments"),
+        "LOG_ARCHIVE_DIR": os.path.join(workdir, "archive"),
+        "LOG_MAINTENANCE_INTERVAL": "0",
+    }
+    for name, value in defaults.items():
+        os.environ.setdefault(name, value)
+
+
+def load_stub_app(model_latency_ms=0.0):
+    import app.manager as manager
+
+    manager.load_model = lambda version=None: StubModel(model_latency_ms)
+    from app.main import app
+
+    if not isinstance(manager.model_manager.model, StubModel):
+        manager.model_manager.load()
+    return app
+
+
+def generated_traffic(n, mix=DEFAULT_MIX, seed=0):
+    rng = random.Random(seed)
+    kinds = rng.choices(list(mix), weights=list(mix.values()), k=n)
+    traffic = []
+    for kind in kinds:
+        if kind == "predict":
+            body = {
+                name: round(rng.uniform(low, high), 1)
+                for name, (low, high) in FEATURE_RANGES.items()
+            }
+            traffic.append({"method": "POST", "path": "/predict", "body": body})
+        elif kind == "metrics":
+            traffic.append({"method": "GET", "path": "/metrics?limit=25"})
+        else:
+            traffic.append({"method": "GET", "path": f"/{kind}"})
+    return traffic
+
+
+def read_traffic(path):
+    """Requests to replay from a JSONL file.
+
+    Lines are either ``{"method", "path", "body"}`` or request log rows as
+    written by the jsonl log sink (``method``, ``url``, ``input``).
+    """
+    traffic = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            target = record.get("path") or record.get("url")
+            if not target:
+                continue
+            parts = urlsplit(target)
+            body = record.get("body", record.get("input"))
+            if isinstance(body, str):
+                body = json.loads(body)
+            method = record.get("method") or ("POST" if body is not None else "GET")
+            traffic.append(
+                {
+                    "method": method.upper(),
+                    "path": parts.path + (f"?{parts.query}" if parts.query else ""),
+                    "body": body,
+                }
+            )
+    if not traffic:
+        raise ValueError(f"No requests found in {path}")
+    return traffic
+
+
+def endpoint(request):
+    return f"{request['method']} {request['path'].split('?')[0]}"
+
+
+class Recorder:
+    def __init__(self):
+        # Endpoint -> [(seconds, status code or None on a transport error)]
+        self.samples = defaultdict(list)
+
+    def add(self, request, seconds, status):
+        self.samples[endpoint(request)].append((seconds, status))
+
+
+async def send(client, request, headers, recorder, started):
+    try:
+        response = await client.request(
+            request["method"], request["path"], json=request.get("body"),
+            headers=headers,
+        )
+        status = response.status_code
+    except httpx.HTTPError:
+        status = None
+    recorder.add(request, time.perf_counter() - started, status)
+
+
+async def closed_loop(client, traffic, headers, recorder, concurrency, total, duration):
+    """``concurrency`` clients, each sending its next request on a response."""
+    deadline = time.perf_counter() + duration if duration else None
+    counter = itertools.count()
+
+    async def client_loop():
+        while True:
+            i = next(counter)
+            if (total and i >= total) or (deadline and time.perf_counter() >= deadline):
+                return
+            request = traffic[i % len(traffic)]
+            await send(client, request, headers, recorder, time.perf_counter())
+
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+
+
+async def open_loop(client, traffic, headers, recorder, qps, total, duration):
+    """Send at ``qps`` whatever the response times.
+
+    Latency counts from when a request was due, so a server that falls
+    behind shows up in the percentiles instead of slowing the load down.
+    """
+    total = total or int(qps * duration)
+    start = time.perf_counter()
+    tasks = []
+    for i in range(total):
+        due = start + i / qps
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        request = traffic[i % len(traffic)]
+        tasks.append(
+            asyncio.create_task(send(client, request, headers, recorder, due))
+        )
+    await asyncio.gather(*tasks)
+
+
+def summarize(samples, elapsed):
+    latencies = np.array([seconds for seconds, _ in samples]) * 1000
+    statuses = [status for _, status in samples]
+    errors = sum(1 for status in statuses if status is None or status >= 500)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4),
+        "status_codes": dict(Counter(str(status) for status in statuses)),
+        "throughput_rps": round(len(samples) / elapsed, 2),
+        "latency_ms": {
+            "mean": round(float(latencies.mean()), 3),
+            "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3),
+            "max": round(float(latencies.max()), 3),
+        },
+    }
+
+
+async def run_load(
+    target,
+    traffic,
+    token=None,
+    concurrency=8,
+    qps=None,
+    total=None,
+    duration=None,
+    warmup=0,
+):
+    """Run the load against ``target``, a base URL or an ASGI app.
+
+    Returns the per-endpoint and overall summary, warm-up requests excluded.
+    """
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    limits = httpx.Limits(max_connections=max(concurrency, 100))
+    if isinstance(target, str):
+        client = httpx.AsyncClient(base_url=target, limits=limits, timeout=60)
+        lifespan = None
+    else:
+        transport = httpx.ASGITransport(app=target)
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench")
+        lifespan = target.router.lifespan_context(target)
+
+    recorder = Recorder()
+    async with client:
+        if lifespan is not None:
+            await lifespan.__aenter__()
+        try:
+            if warmup:
+                await closed_loop(
+                    client, traffic, headers, Recorder(), concurrency, warmup, None
+                )
+            start = time.perf_counter()
+            if qps:
+                await open_loop(
+                    client, traffic, headers, recorder, qps, total, duration
+                )
+            else:
+                await closed_loop(
+                    client, traffic, headers, recorder, concurrency, total, duration
+                )
+            elapsed = time.perf_counter() - start
+        finally:
+            if lifespan is not None:
+                await lifespan.__aexit__(None, None, None)
+
+    everything = [s for samples in recorder.samples.values() for s in samples]
+    return {
+        "version": RESULTS_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "mode": "open" if qps else "closed",
+            "concurrency": None if qps else concurrency,
+            "qps": qps,
+            "duration_s": round(elapsed, 3),
+            "warmup": warmup,
+        },
+        "endpoints": {
+            name: summarize(samples, elapsed)
+            for name, samples in sorted(recorder.samples.items())
+        },
+        "total": summarize(everything, elapsed),
+    }
+
+
+def compare(results, baseline, tolerance=0.2, min_delta_ms=1.0):
+    """Regressions of ``results`` against ``baseline``, as readable lines.
+
+    A percentile regresses when it grew by more than ``tolerance`` and by
+    more than ``min_delta_ms``, so sub-millisecond jitter is ignored.
+    Throughput is only compared between closed-loop runs, an open-loop run
+    sends at the rate it was given.
+    """
+    if baseline.get("version") != RESULTS_VERSION:
+        raise ValueError("Baseline was written by another version of this benchmark")
+    closed = results["config"]["mode"] == baseline["config"]["mode"] == "closed"
+    regressions = []
+    for name, old in baseline["endpoints"].items():
+        new = results["endpoints"].get(name)
+        if new is None:
+            continue
+        for q in ("p50", "p95", "p99"):
+            before, after = old["latency_ms"][q], new["latency_ms"][q]
+            if after > before * (1 + tolerance) and after - before > min_delta_ms:
+                regressions.append(f"{name} {q} latency {before}ms -> {after}ms")
+        before, after = old["throughput_rps"], new["throughput_rps"]
+        if closed and after < before * (1 - tolerance):
+            regressions.append(f"{name} throughput {before} -> {after} req/s")
+        before, after = old["error_rate"], new["error_rate"]
+        if after > before + 0.01:
+            regressions.append(f"{name} error rate {before} -> {after}")
+    return regressions
+
+
+def start_server(port, model_latency_ms, timeout=60):
+    """Start uvicorn with the stub model in a child process."""
+    env = dict(os.environ)
+    env.setdefault("PYTHONPATH", ".")
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            __file__,
+            "--serve-only",
+            "--port",
+            str(port),
+            "--model-latency-ms",
+            str(model_latency_ms),
+        ],
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Benchmark server exited during startup")
+        try:
+            if httpx.get(f"{url}/readyz", timeout=1).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"Benchmark server did not start within {timeout}s")
+
+
+def serve(port, model_latency_ms):
+    import uvicorn
+
+    stub_environment(tempfile.mkdtemp(prefix="bench_serving_"))
+    app = load_stub_app(model_latency_ms)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def print_results(results):
+    config = results["config"]
+    load = (
+        f"{config['qps']} req/s" if config["mode"] == "open"
+        else f"{config['concurrency']} clients"
+    )
+    print(f"\n{config['mode']}-loop, {load}, {config['duration_s']}s")
+    rows = list(results["endpoints"].items()) + [("total", results["total"])]
+    for name, summary in rows:
+        latency = summary["latency_ms"]
+        print(
+            f"  {name:<22} n={summary['requests']:<7} "
+            f"{summary['throughput_rps']:>9} req/s  "
+            f"p50={latency['p50']}ms p95={latency['p95']}ms p99={latency['p99']}ms "
+            f"errors={summary['errors']}"
+        )
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight)
+    if not set(mix) <= set(DEFAULT_MIX):
+        raise argparse.ArgumentTypeError(f"Mix names must be in {list(DEFAULT_MIX)}")
+    return mix
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", type=str, default=None, help="Load a running server")
+    target.add_argument(
+        "--serve", action="store_true", help="Start a local uvicorn for the run"
+    )
+    target.add_argument("--serve-only", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--token", type=str, default=None, help="Default: API_TOKEN")
+    parser.add_argument("--traffic", type=str, default=None, help="JSONL to replay")
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=DEFAULT_MIX,
+        help="Generated traffic, e.g. predict=0.9,metrics=0.05,health=0.05",
+    )
+    parser.add_argument("--concurrency", type=int, default=8, help="Closed-loop")
+    parser.add_argument("--qps", type=float, default=None, help="Open-loop rate")
+    parser.add_argument("--requests", type=int, default=None)
+    parser.add_argument("--duration", type=float, default=None, help="Seconds")
+    parser.add_argument("--warmup", type=int, default=50, help="Untimed requests")
+    parser.add_argument("--model-latency-ms", type=float, default=0.0)
+    parser.add_argument("--output", type=str, default=None, help="Write JSON here")
+    parser.add_argument("--baseline", type=str, default=None, help="Compare to this")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--min-delta-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    if args.serve_only:
+        serve(args.port, args.model_latency_ms)
+        sys.exit(0)
+    if args.requests is None and args.duration is None:
+        args.requests = 2000
+
+    server = None
+    if args.url:
+        app_target, label = args.url, args.url
+    elif args.serve:
+        server, app_target = start_server(args.port, args.model_latency_ms)
+        label = f"uvicorn {app_target}"
+    else:
+        stub_environment(tempfile.mkdtemp(prefix="bench_serving_"))
+        app_target, label = load_stub_app(args.model_latency_ms), "in-process"
+
+    if args.token is None:
+        from app.config import API_TOKEN
+
+        args.token = API_TOKEN
+    traffic = (
+        read_traffic(args.traffic) if args.traffic
+        else generated_traffic(max(args.requests or 0, 1000), args.mix)
+    )
+
+    try:
+        results = asyncio.run(
+            run_load(
+                app_target,
+                traffic,
+                token=args.token,
+                concurrency=args.concurrency,
+                qps=args.qps,
+                total=args.requests,
+                duration=args.duration,
+                warmup=args.warmup,
+            )
+        )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(10)
+    results["config"].update(
+        target=label,
+        traffic=args.traffic or "generated",
+        model_latency_ms=None if args.url else args.model_latency_ms,
+    )
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for key in ("target", "mode", "concurrency", "qps", "model_latency_ms"):
+            if baseline["config"].get(key) != results["config"].get(key):
+                print(f"Note: {key} differs from the baseline run")
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline}")
@@ -0,0 +1,149 @@
+"""Compare training split load time and peak memory across file formats.
+
+Splits of each size are generated from the iris data, written in every
+format, then loaded with src.data_io.load_splits in a fresh interpreter so
+peak RSS only covers one load (Linux only, it is read from /proc). Run from
+the repo root:
+
+    PYTHONPATH=. python benchmarks/bench_split_io.py
+    PYTHONPATH=. python benchmarks/bench_split_io.py --rows 10000 1000000 --runs 5
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from src.data_io import SPLIT_FORMATS
+from src.preprocess_data import DATA_PATH, preprocess
+
+# Executed in the child interpreter, prints one JSON line of measurements
+CHILD = """
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow.ipc
+import pyarrow.parquet
+from src.data_io import load_splits
+
+
+def status_mb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1]) / 1024
+
+
+# Reset the peak RSS high-water mark so imports are not counted
+with open("/proc/self/clear_refs", "w") as f:
+    f.write("5")
+before = status_mb("VmRSS")
+start = time.perf_counter()
+X_train, X_test, y_train, y_test = load_splits(sys.argv[1])
+loaded = time.perf_counter()
+# Touch every value, memory-mapped pages are only read on access
+checksum = float(np.asarray(X_train).sum() + np.asarray(X_test).sum())
+touched = time.perf_counter()
+
+print(json.dumps({
+    "load_s": loaded - start,
+    "load_and_touch_s": touched - start,
+    "peak_rss_delta_mb": status_mb("VmHWM") - before,
+    "rows": len(X_train) + len(X_test),
+    "checksum": checksum,
+}))
+"""
+
+
+def make_raw(rows, path, seed=42):
+    """Resample the iris data to ``rows`` rows with a little noise."""
+    iris = pd.read_csv(DATA_PATH)
+    rng = np.random.default_rng(seed)
+    df = iris.sample(n=rows, replace=True, random_state=seed).reset_index(drop=True)
+    features = [c for c in df.columns if c not in ("Id", "Species")]
+    df[features] += rng.normal(0, 0.05, size=(rows, len(features)))
+    df["Id"] = np.arange(1, rows + 1)
+    df.to_csv(path, index=False)
+
+
+def run_once(data_dir):
+    env = dict(os.environ)
+    env.setdefault("PYTHONPATH", ".")
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, data_dir],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def bench_format(data_dir, runs):
+    samples = [run_once(data_dir) for _ in range(runs)]
+    summary = {"runs": runs, "rows": samples[0]["rows"]}
+    for key in ("load_s", "load_and_touch_s", "peak_rss_delta_mb"):
+        summary[key] = round(statistics.median(s[key] for s in samples), 4)
+    summary["bytes_on_disk"] = sum(
+        os.path.getsize(os.path.join(data_dir, name)) for name in os.listdir(data_dir)
+    )
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000, 1_000_000],
+        help="Raw dataset sizes",
+    )
+    parser.add_argument(
+        "--formats", nargs="+", default=list(SPLIT_FORMATS), choices=SPLIT_FORMATS
+    )
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes per load")
+    parser.add_argument("--output", type=str, default=None, help="Write JSON here")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_split_io_")
+    results = {}
+    try:
+        for rows in args.rows:
+            raw = os.path.join(workdir, f"raw_{rows}.csv")
+            make_raw(rows, raw)
+            results[rows] = {}
+            for fmt in args.formats:
+                data_dir = os.path.join(workdir, f"{rows}_{fmt}")
+                preprocess(raw, data_dir, fmt=fmt)
+                results[rows][fmt] = bench_format(data_dir, args.runs)
+
+            baseline = results[rows].get("csv")
+            print(f"\n{rows} rows")
+            for fmt, summary in results[rows].items():
+                speedup = ""
+                if baseline and fmt != "csv" and summary["load_and_touch_s"] > 0:
+                    ratio = baseline["load_and_touch_s"] / summary["load_and_touch_s"]
+                    speedup = f"  {ratio:.1f}x vs csv"
+                print(
+                    f"  {fmt:<8} load={summary['load_s']}s "
+                    f"load+touch={summary['load_and_touch_s']}s "
+                    f"peak_rss=+{summary['peak_rss_delta_mb']:.1f}MB "
+                    f"disk={summary['bytes_on_disk'] / 1e6:.1f}MB{speedup}"
+                )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to: {args.output}")
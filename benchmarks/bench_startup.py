@@ -0,0 +1,99 @@
+"""Measure serving cold start: import time and time to first prediction.
+
+Every run starts a fresh interpreter, so module caches from earlier runs do
+not hide import cost. Run from the repo root:
+
+    PYTHONPATH=. python benchmarks/bench_startup.py
+    PYTHONPATH=. python benchmarks/bench_startup.py --modes background --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Executed in the child interpreter, prints one JSON line of timings
+CHILD = """
+import json
+import time
+
+start = time.perf_counter()
+import app.main
+
+imported = time.perf_counter()
+
+from fastapi.testclient import TestClient
+from app.config import API_TOKEN
+from app.model import FEATURE_NAMES, WARM_UP_ROW
+
+with TestClient(app.main.app) as client:
+    started = time.perf_counter()
+    while client.get("/health").json().get("status") == "warming":
+        time.sleep(0.005)
+    row = dict(zip(FEATURE_NAMES, WARM_UP_ROW))
+    response = client.post(
+        "/predict", json=row, headers={"Authorization": f"Bearer {API_TOKEN}"}
+    )
+    first = time.perf_counter()
+
+print(json.dumps({
+    "import_s": imported - start,
+    "ready_to_serve_s": started - start,
+    "first_prediction_s": first - start,
+    "status_code": response.status_code,
+}))
+"""
+
+
+def run_once(mode):
+    env = dict(os.environ, MODEL_LOAD_MODE=mode)
+    env.setdefault("PYTHONPATH", ".")
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # The app prints while loading, the timings are the last line
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def bench_mode(mode, runs):
+    samples = [run_once(mode) for _ in range(runs)]
+    summary = {"runs": runs}
+    for key in ("import_s", "ready_to_serve_s", "first_prediction_s"):
+        values = [sample[key] for sample in samples]
+        summary[key] = {
+            "median": round(statistics.median(values), 4),
+            "min": round(min(values), 4),
+            "max": round(max(values), 4),
+        }
+    summary["status_codes"] = sorted({sample["status_code"] for sample in samples})
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--modes", nargs="+", default=["eager", "background"], help="MODEL_LOAD_MODE"
+    )
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per mode")
+    parser.add_argument("--output", type=str, default=None, help="Write JSON here")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in args.modes:
+        results[mode] = bench_mode(mode, args.runs)
+        timings = "  ".join(
+            f"{key}={value['median']}s"
+            for key, value in results[mode].items()
+            if isinstance(value, dict)
+        )
+        print(f"{mode:<10} {timings}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to: {args.output}")
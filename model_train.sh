@@ -1,5 +1,7 @@
 #!/bin/bash
 
+# src/model_train.py imports src.search
+export PYTHONPATH=$(pwd)
 
   python src/model_train.py \
   --mlflow-uri http://localhost:5002 \
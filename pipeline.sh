@@ -0,0 +1,14 @@
+#!/bin/bash
+
+# Preprocess and train, skipping stages whose inputs did not change
+export PYTHONPATH=$(pwd)
+
+  python src/pipeline.py \
+  --mlflow-uri http://localhost:5002 \
+  --experiment-name Iris_Classification \
+  --model-name iris_classifier \
+  --data-dir data/processed \
+  --output-dir artifacts \
+  --scale \
+  --stage Staging \
+  "$@"
@@ -0,0 +1,9 @@
+#!/bin/bash
+
+# Score a file offline with the same model the API serves
+export PYTHONPATH=$(pwd)
+
+  python src/score.py \
+  --input data/processed/X_test.csv \
+  --output predictions.csv \
+  --chunk-size 10000
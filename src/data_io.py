@@ -0,0 +1,294 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+SPLIT_NAMES = ["X_train", "X_test", "y_train", "y_test"]
+
+# File extension of each split format, in the order they are looked up
+SPLIT_FORMATS = {
+    "parquet": ".parquet",
+    "feather": ".feather",
+    "npy": ".npy",
+    "csv": ".csv",
+}
+
+# Written next to the splits, records their format, columns, dtypes and rows
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def hash_fraction(keys, seed=42):
+    """Map each row of ``keys`` to a fraction in [0, 1) that only depends on it.
+
+    The same row always gets the same fraction, whichever chunk or file
+    position it is read from, so splits are reproducible without holding the
+    data in memory.
+    """
+    hashed = pd.util.hash_pandas_object(keys, index=False).to_numpy(dtype=np.uint64)
+    # Numeric columns are hashed without a key, so the seed is mixed in after
+    mixed = pd.util.hash_array(hashed ^ np.uint64(seed))
+    return mixed / float(2**64)
+
+
+class StratifiedSplit:
+    """Sends ``test_size`` of each class to the test split, a chunk at a time.
+
+    A counter per class carries over between chunks: the n-th row of a class
+    goes to the test split when it brings the class's test rows up to
+    ``test_size * n``. Every class is split at the same rate to within one
+    row, whatever the chunk size, and ``seed`` shifts which rows are picked.
+    """
+
+    def __init__(self, test_size, seed=42):
+        self.test_size = test_size
+        self.seed = seed
+        self.seen = {}
+
+    def __call__(self, labels):
+        labels = pd.Series(labels).reset_index(drop=True)
+        test = np.zeros(len(labels), dtype=bool)
+        for label, index in labels.groupby(labels, sort=False).indices.items():
+            start = self.seen.get(label, 0)
+            seen = start + np.arange(len(index) + 1)
+            quota = np.floor(seen * self.test_size + self._offset(label))
+            test[index] = np.diff(quota) > 0
+            self.seen[label] = start + len(index)
+        return test
+
+    def _offset(self, label):
+        return hash_fraction(pd.Series([str(label)]), self.seed)[0]
+
+
+class SplitWriter:
+    """Appends chunks to one split file, one row group or batch per chunk.
+
+    NPY files hold a single array of one dtype, so they are written in one
+    piece and only from frames whose columns share that dtype.
+    """
+
+    def __init__(self, path, fmt):
+        self.path = path
+        self.format = fmt
+        self._writer = None
+        self._schema = None
+        self._started = False
+        self.rows = 0
+        self.columns = None
+
+    def write(self, frame):
+        if self.columns is None:
+            self.columns = {str(c): str(dtype) for c, dtype in frame.dtypes.items()}
+        if self.format == "npy":
+            if self._started:
+                raise ValueError("NPY splits cannot be appended to, use parquet")
+            np.save(self.path, frame_to_array(frame), allow_pickle=False)
+        elif self.format == "csv":
+            frame.to_csv(
+                self.path,
+                mode="a" if self._started else "w",
+                header=not self._started,
+                index=False,
+            )
+        else:
+            import pyarrow as pa
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                self._schema = table.schema
+                self._writer = self._open(pa, table.schema)
+            else:
+                # A chunk of whole numbers would otherwise be read as int64
+                table = table.cast(self._schema)
+            self._writer.write_table(table)
+        self._started = True
+        self.rows += len(frame)
+
+    def _open(self, pa, schema):
+        if self.format == "parquet":
+            import pyarrow.parquet as pq
+
+            # Column min/max per row group let readers skip row groups
+            return pq.ParquetWriter(self.path, schema, write_statistics=True)
+        return pa.ipc.new_file(self.path, schema)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def frame_to_array(frame):
+    if len(frame.columns) == 1:
+        column = frame.iloc[:, 0]
+        if not pd.api.types.is_numeric_dtype(column):
+            # Fixed-width unicode, so the file can still be memory-mapped
+            return column.to_numpy(dtype=str)
+        return column.to_numpy()
+    if frame.dtypes.nunique() != 1 or frame.dtypes.iloc[0] == object:
+        raise ValueError("NPY splits need columns of one numeric dtype")
+    return frame.to_numpy()
+
+
+def write_manifest(data_dir, fmt, writers):
+    """Record the format and schema of the splits written by ``writers``."""
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "format": fmt,
+        "splits": {
+            name: {
+                "file": os.path.basename(writer.path),
+                "rows": writer.rows,
+                "columns": writer.columns or {},
+            }
+            for name, writer in writers.items()
+        },
+    }
+    path = os.path.join(data_dir, MANIFEST)
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return path
+
+
+def read_manifest(data_dir):
+    try:
+        with open(os.path.join(data_dir, MANIFEST)) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported split manifest version in {data_dir}")
+    return manifest
+
+
+def split_path(data_dir, name, fmt):
+    return os.path.join(data_dir, name + SPLIT_FORMATS[fmt])
+
+
+def find_split(data_dir, name):
+    """Path of split ``name`` in ``data_dir``, or None.
+
+    The manifest names the file when there is one, otherwise the first format
+    found in ``SPLIT_FORMATS`` order is used.
+    """
+    manifest = read_manifest(data_dir)
+    if manifest is not None and name in manifest["splits"]:
+        path = os.path.join(data_dir, manifest["splits"][name]["file"])
+        return path if os.path.isfile(path) else None
+    for fmt in SPLIT_FORMATS:
+        path = split_path(data_dir, name, fmt)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def split_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    for fmt, suffix in SPLIT_FORMATS.items():
+        if suffix == ext:
+            return fmt
+    raise ValueError(f"Unsupported split file: {path}")
+
+
+def _read_table(path):
+    import pyarrow as pa
+
+    if split_format(path) == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.read_table(path, memory_map=True)
+    # Arrow IPC files are read in place from the page cache
+    return pa.ipc.open_file(pa.memory_map(path)).read_all()
+
+
+def read_split(path, columns=None):
+    """Read one split file as a DataFrame.
+
+    NPY files are memory-mapped and wrapped without a copy. Feather files are
+    memory-mapped and their numeric columns without nulls are not copied
+    either. ``columns`` (from the manifest) names the NPY columns and, for
+    the other formats, is checked against what was read.
+    """
+    fmt = split_format(path)
+    if fmt == "npy":
+        array = np.load(path, mmap_mode="r", allow_pickle=False)
+        names = list(columns or [str(i) for i in range(array.shape[1])])
+        if array.ndim == 1:
+            return pd.DataFrame({names[0]: array})
+        return pd.DataFrame(array, columns=names, copy=False)
+    if fmt == "csv":
+        # Keep the dtypes recorded at write time instead of re-inferring them
+        dtype = {c: d for c, d in (columns or {}).items() if d != "object"}
+        frame = pd.read_csv(path, dtype=dtype or None)
+    else:
+        frame = _read_table(path).to_pandas(split_blocks=True)
+    if columns is not None and list(frame.columns) != list(columns):
+        raise ValueError(f"Columns of {path} do not match the split manifest")
+    return frame
+
+
+def load_splits(data_dir):
+    """Read ``X_train, X_test, y_train, y_test`` in whatever format they were saved."""
+    manifest = read_manifest(data_dir) or {"splits": {}}
+    frames = []
+    for name in SPLIT_NAMES:
+        path = find_split(data_dir, name)
+        if path is None:
+            raise FileNotFoundError(f"No {name} split in {data_dir}")
+        columns = manifest["splits"].get(name, {}).get("columns")
+        frame = read_split(path, columns)
+        frames.append(frame.squeeze(axis=1) if name.startswith("y_") else frame)
+    return frames
+
+
+def read_columns(path):
+    """Column names of a split file from the manifest in its directory."""
+    manifest = read_manifest(os.path.dirname(path)) or {"splits": {}}
+    for split in manifest["splits"].values():
+        if split["file"] == os.path.basename(path):
+            return split["columns"]
+    return None
+
+
+def _iter_frames(path, batch_size):
+    fmt = split_format(path)
+    if fmt == "csv":
+        yield from pd.read_csv(path, chunksize=batch_size)
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield batch.to_pandas()
+    elif fmt == "npy":
+        frame = read_split(path, read_columns(path))
+        for offset in range(0, len(frame), batch_size):
+            yield frame.iloc[offset:offset + batch_size]
+    else:
+        table = _read_table(path)
+        for offset in range(0, table.num_rows, batch_size):
+            yield table.slice(offset, batch_size).to_pandas()
+
+
+def iter_split_batches(data_dir, split="train", batch_size=100_000):
+    """Yield ``(X, y)`` batches of a split without reading the whole file."""
+    X_path = find_split(data_dir, f"X_{split}")
+    y_path = find_split(data_dir, f"y_{split}")
+    if X_path is None or y_path is None:
+        raise FileNotFoundError(f"No {split} split in {data_dir}")
+    X_frames = _iter_frames(X_path, batch_size)
+    y_frames = _iter_frames(y_path, batch_size)
+    for X, y in zip(X_frames, y_frames):
+        if len(X) != len(y):
+            raise ValueError(f"Features and labels of the {split} split do not line up")
+        yield X, y.squeeze(axis=1)
+
+
+def split_classes(data_dir, split="train"):
+    """Sorted distinct labels of a split, reading only the label file."""
+    path = find_split(data_dir, f"y_{split}")
+    if path is None:
+        raise FileNotFoundError(f"No {split} split in {data_dir}")
+    classes = set()
+    for y in _iter_frames(path, 100_000):
+        classes.update(y.iloc[:, 0].unique())
+    return np.array(sorted(classes))
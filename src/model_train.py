@@ -2,34 +2,55 @@ import os
 import shutil
 import sys
 import argparse
-import pandas as pd
 import mlflow
 import mlflow.sklearn
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score
+from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 from mlflow.tracking import MlflowClient
 from mlflow.exceptions import RestException
 import requests
 import re
+from app.schema import METADATA_KEY, FeatureSchema
+from src.data_io import (
+    SPLIT_NAMES,
+    find_split,
+    iter_split_batches,
+    load_splits,
+    split_classes,
+)
+from src.search import (
+    STRATEGIES,
+    best_per_family,
+    build_estimator,
+    load_search_space,
+    log_trials,
+    run_search,
+)
+
+
+# The feature schema is stored in the MLmodel metadata, next to the model
+def schema_metadata(schema):
+    return {METADATA_KEY: schema.to_dict()} if schema is not None else None
 
 
 # Save model locally
-def save_model_locally(model, path):
+def save_model_locally(model, path, schema=None):
     if os.path.exists(path):
         print(f"🧹 Removing existing model directory: {path}")
         shutil.rmtree(path)
 
-    mlflow.sklearn.save_model(model, path=path)
+    mlflow.sklearn.save_model(model, path=path, metadata=schema_metadata(schema))
     print(f"Saved model locally to: {path}")
 
 
 # Validate inputs
 def validate_args(args):
-    required_files = ["X_train.csv", "X_test.csv", "y_train.csv", "y_test.csv"]
+    # Splits may be CSV, Parquet or Feather files
     missing = [
-        f for f in required_files if not os.path.isfile(os.path.join(args.data_dir, f))
+        f"{name}.csv" for name in SPLIT_NAMES if find_split(args.data_dir, name) is None
     ]
     if missing:
         print(f"Missing files in {args.data_dir}: {', '.join(missing)}")
@@ -62,7 +83,7 @@ def validate_args(args):
 
 # Register model only if using remote MLflow URI
 def register_model_if_remote(
-    model_uri, args, mlflow_client, local_model_path, best_model_instance
+    model_uri, args, mlflow_client, local_model_path, best_model_instance, schema=None
 ):
     if args.mlflow_uri.startswith("http"):
         try:
@@ -89,45 +110,91 @@ def register_model_if_remote(
                 print(f"Transitioned model to stage: {args.stage}")
 
             best_model_loaded = mlflow.sklearn.load_model(model_uri)
-            save_model_locally(best_model_loaded, local_model_path)
+            save_model_locally(best_model_loaded, local_model_path, schema)
 
         except Exception as e:
             print(f"Error registering or transitioning model: {e}")
             print("You can register manually via MLflow UI.")
-            save_model_locally(best_model_instance, local_model_path)
+            save_model_locally(best_model_instance, local_model_path, schema)
     else:
         print("ℹSkipping model registration — not using remote MLflow URI.")
-        save_model_locally(best_model_instance, local_model_path)
+        save_model_locally(best_model_instance, local_model_path, schema)
+
+
+# Cross-validated hyperparameter search, returns the best config per family
+def search_models(args, X_train, y_train, mlflow_client):
+    space = load_search_space(args.search_space)
+    with mlflow.start_run(run_name=f"{args.search}_search") as run:
+        trials, stopped_early = run_search(
+            X_train,
+            y_train,
+            strategy=args.search,
+            space=space,
+            cv=args.cv,
+            n_iter=args.n_iter,
+            workers=args.workers,
+            max_trials=args.max_trials,
+            max_seconds=args.max_seconds,
+            halving_factor=args.halving_factor,
+        )
+        best = best_per_family(trials)
+        print(f"Evaluated {len(trials)} trials" + (" (stopped early)" * stopped_early))
+        for family, trial in best.items():
+            print(f"Best {family}: {trial['params']} cv={trial['cv_mean']:.4f}")
+
+        # Trials go to MLflow in a few batched requests instead of one per trial
+        calls = log_trials(mlflow_client, run.info.run_id, trials)
+        mlflow.log_dict(
+            {"trials": trials, "stopped_early": stopped_early}, "trials.json"
+        )
+        print(f"Logged {len(trials)} trials in {calls} batch requests")
 
+    return {
+        family: build_estimator(family, trial["params"])
+        for family, trial in best.items()
+    }
 
-# Main training logic
-def train_and_register(args):
-    validate_args(args)
 
-    output_dir = os.path.abspath(args.output_dir)
+# Log one trained candidate to its MLflow run and save it locally
+def log_trained_model(
+    run, model_name, model_instance, acc, output_dir, fingerprint, schema=None
+):
+    print(f"{model_name} Accuracy: {acc:.4f}")
 
-    if not args.mlflow_uri or args.mlflow_uri.strip() == "":
-        print(
-            "MLflow URI not provided. "
-            "Please specify --mlflow-uri pointing to your MLflow server."
-        )
-        sys.exit(4)
+    print(f"MLflow tracking URI set to: {mlflow.get_tracking_uri()}")
 
-    mlflow.set_tracking_uri(args.mlflow_uri)
-    mlflow.set_experiment(args.experiment_name)
-    mlflow_client = MlflowClient()
+    print("Artifact URI:", mlflow.get_artifact_uri())
+
+    mlflow.log_param("model_type", model_name)
+    mlflow.log_metric("accuracy", acc)
+    if fingerprint:
+        mlflow.set_tag("pipeline.fingerprint", fingerprint)
+    mlflow.sklearn.log_model(
+        model_instance, artifact_path="model", metadata=schema_metadata(schema)
+    )
+
+    print(f"Logged model to run: {run.info.run_id}")
+
+    local_model_path = os.path.join(output_dir, f"{model_name}_classifier")
+    save_model_locally(model_instance, local_model_path, schema)
+    print(f"Saved local model: {local_model_path}")
+    return (model_name, acc, run.info.run_id, model_instance, schema)
 
-    # Load pre-split data
-    X_train = pd.read_csv(os.path.join(args.data_dir, "X_train.csv"))
-    X_test = pd.read_csv(os.path.join(args.data_dir, "X_test.csv"))
-    y_train = pd.read_csv(os.path.join(args.data_dir, "y_train.csv")).squeeze()
-    y_test = pd.read_csv(os.path.join(args.data_dir, "y_test.csv")).squeeze()
+
+# Train the candidate models on splits loaded fully into memory
+def train_in_memory(args, output_dir, fingerprint, mlflow_client):
+    # Load pre-split data, binary formats are memory-mapped
+    X_train, X_test, y_train, y_test = load_splits(args.data_dir)
 
     # Optional scaling
+    scaler = None
     if args.scale:
         print("Scaling features with StandardScaler")
-        scaler = StandardScaler()
-        X_train = scaler.fit_transform(X_train)
+        scaler = StandardScaler().fit(X_train)
+    # Recorded on the unscaled columns, serving applies the scaler itself
+    schema = FeatureSchema.capture(X_train, scaler)
+    if scaler is not None:
+        X_train = scaler.transform(X_train)
         X_test = scaler.transform(X_test)
 
     model_configs = {
@@ -136,6 +203,8 @@ def train_and_register(args):
             n_estimators=100, random_state=42, min_samples_leaf=1, max_features="sqrt"
         ),
     }
+    if getattr(args, "search", "none") != "none":
+        model_configs = search_models(args, X_train, y_train, mlflow_client)
 
     run_infos = []
 
@@ -144,27 +213,97 @@ def train_and_register(args):
             model_instance.fit(X_train, y_train)
             y_pred = model_instance.predict(X_test)
             acc = accuracy_score(y_test, y_pred)
+            run_infos.append(
+                log_trained_model(
+                    run,
+                    model_name,
+                    model_instance,
+                    acc,
+                    output_dir,
+                    fingerprint,
+                    schema,
+                )
+            )
+
+    return run_infos
+
 
-            print(f"{model_name} Accuracy: {acc:.4f}")
+# Train an SGD classifier batch by batch, never holding a whole split in memory
+def train_incremental(args, output_dir, fingerprint):
+    classes = split_classes(args.data_dir)
+    steps = []
+
+    if args.scale:
+        print("Scaling features with StandardScaler (first pass over the data)")
+        scaler = StandardScaler()
+        for X, _ in iter_split_batches(args.data_dir, "train", args.batch_size):
+            scaler.partial_fit(X)
+        steps.append(("scaler", scaler))
+
+    classifier = SGDClassifier(loss="log_loss", random_state=42)
+    # The scaler is a pipeline step here, so the schema holds no scaler
+    schema = None
+    for epoch in range(args.epochs):
+        for X, y in iter_split_batches(args.data_dir, "train", args.batch_size):
+            if schema is None:
+                schema = FeatureSchema.capture(X)
+            elif epoch == 0:
+                schema.observe(X)
+            if args.scale:
+                X = scaler.transform(X)
+            classifier.partial_fit(X, y, classes=classes)
+    steps.append(("classifier", classifier))
+    # The fitted steps are saved together so serving gets unscaled input
+    model_instance = Pipeline(steps)
+
+    correct = total = 0
+    for X, y in iter_split_batches(args.data_dir, "test", args.batch_size):
+        correct += int((model_instance.predict(X) == y.to_numpy()).sum())
+        total += len(y)
+    acc = correct / total if total else 0.0
+
+    with mlflow.start_run(run_name="sgd_classifier") as run:
+        mlflow.log_param("epochs", args.epochs)
+        mlflow.log_param("batch_size", args.batch_size)
+        return log_trained_model(
+            run,
+            "sgd_classifier",
+            model_instance,
+            acc,
+            output_dir,
+            fingerprint,
+            schema,
+        )
+
+
+# Main training logic
+def train_and_register(args):
+    validate_args(args)
 
-            print(f"MLflow tracking URI set to: {mlflow.get_tracking_uri()}")
+    output_dir = os.path.abspath(args.output_dir)
 
-            print("Artifact URI:", mlflow.get_artifact_uri())
+    if not args.mlflow_uri or args.mlflow_uri.strip() == "":
+        print(
+            "MLflow URI not provided. "
+            "Please specify --mlflow-uri pointing to your MLflow server."
+        )
+        sys.exit(4)
 
-            mlflow.log_param("model_type", model_name)
-            mlflow.log_metric("accuracy", acc)
-            mlflow.sklearn.log_model(model_instance, artifact_path="model")
+    mlflow.set_tracking_uri(args.mlflow_uri)
+    mlflow.set_experiment(args.experiment_name)
+    mlflow_client = MlflowClient()
 
-            print(f"Logged model to run: {run.info.run_id}")
-            run_infos.append((model_name, acc, run.info.run_id, model_instance))
+    # Set by src/pipeline.py so the runs can be reused for unchanged inputs
+    fingerprint = getattr(args, "pipeline_fingerprint", None)
 
-            local_model_path = os.path.join(output_dir, f"{model_name}_classifier")
-            save_model_locally(model_instance, local_model_path)
-            print(f"Saved local model: {local_model_path}")
+    if getattr(args, "partial_fit", False):
+        run_infos = [train_incremental(args, output_dir, fingerprint)]
+    else:
+        run_infos = train_in_memory(args, output_dir, fingerprint, mlflow_client)
 
-    best_model_name, best_accuracy, best_run_id, best_model_instance = sorted(
-        run_infos, key=lambda x: x[1], reverse=True
-    )[0]
+    best_model_name, best_accuracy, best_run_id, best_model_instance, schema = (
+        sorted(run_infos, key=lambda x: x[1], reverse=True)[0]
+    )
     model_uri = f"runs:/{best_run_id}/model"
     print(f"Best model: {best_model_name} with accuracy {best_accuracy:.4f}")
     print(f"Model URI: {model_uri}")
@@ -177,7 +316,10 @@ def train_and_register(args):
         mlflow_client=mlflow_client,
         local_model_path=local_model_path,
         best_model_instance=best_model_instance,
+        schema=schema,
     )
+    if fingerprint:
+        mlflow_client.set_tag(best_run_id, "pipeline.best", "true")
 
 
 # CLI entry point
@@ -226,5 +368,53 @@ if __name__ == "__main__":
         help="Optional stage to transition model",
     )
 
+    parser.add_argument(
+        "--search",
+        type=str,
+        default="none",
+        choices=("none",) + STRATEGIES,
+        help="Hyperparameter search strategy (default: train the two fixed configs)",
+    )
+    parser.add_argument(
+        "--search-space",
+        type=str,
+        default=None,
+        help="JSON file of {family: {param: [values]}} (default: built-in space)",
+    )
+    parser.add_argument("--cv", type=int, default=5, help="Cross-validation folds")
+    parser.add_argument(
+        "--n-iter", type=int, default=20, help="Candidates per family for random"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=0, help="Search processes (default: all cores)"
+    )
+    parser.add_argument(
+        "--max-trials", type=int, default=None, help="Stop after this many trials"
+    )
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=None,
+        help="Stop starting new trials after this many seconds",
+    )
+    parser.add_argument(
+        "--halving-factor",
+        type=int,
+        default=3,
+        help="Keep 1/N of the candidates per successive halving round",
+    )
+
+    parser.add_argument(
+        "--partial-fit",
+        action="store_true",
+        help="Train an SGD classifier batch by batch instead of in memory",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=100_000, help="Rows per --partial-fit batch"
+    )
+    parser.add_argument(
+        "--epochs", type=int, default=5, help="Passes over the data for --partial-fit"
+    )
+
     args = parser.parse_args()
     train_and_register(args)
@@ -0,0 +1,360 @@
+"""Run preprocessing and training, skipping stages whose inputs did not change.
+
+Each stage is fingerprinted from the md5 of its input files, its parameters
+and the md5 of its own source files. When a fingerprint was seen before, the
+stage's outputs are restored from the local cache (or, for training, from the
+MLflow run tagged with the fingerprint) instead of recomputed.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+from argparse import Namespace
+
+import yaml
+
+CACHE_DIR = ".pipeline"
+STATE_FILE = "state.json"
+
+
+class Stage:
+    def __init__(self, name, deps, code, outs, params, run, restore=None):
+        self.name = name
+        self.deps = deps
+        self.code = code
+        self.outs = outs
+        self.params = params
+        # Called with the stage fingerprint
+        self.run = run
+        # Optional fallback to rebuild outputs when the local cache misses
+        self.restore = restore
+
+
+class HashState:
+    """md5 of files keyed on path, size and mtime, like DVC's state database.
+
+    Unchanged files are not read again on later runs.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def md5(self, path):
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        entry = self.entries.get(key)
+        if entry and entry["size"] == stat.st_size:
+            if entry["mtime"] == stat.st_mtime_ns:
+                return entry["md5"]
+        digest = file_md5(path)
+        self.entries[key] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "md5": digest,
+        }
+        return digest
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(self.entries, f, indent=2)
+
+
+def file_md5(path, chunk_size=1 << 20):
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def dvc_md5(path):
+    """md5 recorded for ``path`` in its ``.dvc`` file, or None."""
+    try:
+        with open(f"{path}.dvc") as f:
+            outs = yaml.safe_load(f).get("outs", [])
+    except (OSError, AttributeError, yaml.YAMLError):
+        return None
+    name = os.path.basename(path)
+    for out in outs:
+        if out.get("path") == name:
+            return out.get("md5")
+    return None
+
+
+def dep_md5(path, state):
+    """md5 of a stage input.
+
+    A file present in the workspace is hashed. A missing file tracked by DVC
+    uses the md5 in its ``.dvc`` file, so a stage can be skipped without
+    running ``dvc pull`` first.
+    """
+    if os.path.isfile(path):
+        return state.md5(path)
+    if os.path.isdir(path):
+        digest = hashlib.md5()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                digest.update(os.path.relpath(full, path).encode())
+                digest.update(state.md5(full).encode())
+        return digest.hexdigest()
+    recorded = dvc_md5(path)
+    if recorded is None:
+        raise FileNotFoundError(f"Stage input not found: {path}")
+    return recorded
+
+
+def fingerprint(stage, state):
+    payload = {
+        "stage": stage.name,
+        "deps": {path: dep_md5(path, state) for path in stage.deps},
+        "code": {path: state.md5(path) for path in stage.code},
+        "params": stage.params,
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def copy_path(src, dst):
+    if os.path.isdir(dst):
+        shutil.rmtree(dst)
+    elif os.path.exists(dst):
+        os.remove(dst)
+    os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+    if os.path.isdir(src):
+        shutil.copytree(src, dst)
+    else:
+        shutil.copy2(src, dst)
+
+
+def outputs_match(stage, cache_path, state):
+    """True if every output in the workspace equals its cached copy."""
+    for index, out in enumerate(stage.outs):
+        cached = os.path.join(cache_path, str(index))
+        if not os.path.exists(out) or dep_md5(out, state) != dep_md5(cached, state):
+            return False
+    return True
+
+
+def check_dvc_outputs(stage, state):
+    # Outputs tracked by DVC whose content no longer matches the .dvc file
+    for out in stage.outs:
+        recorded = dvc_md5(out)
+        if recorded and os.path.isfile(out) and state.md5(out) != recorded:
+            print(f"  {out} differs from {out}.dvc, run `dvc add {out}` to track it")
+
+
+def run_stage(stage, state, cache_dir=CACHE_DIR, force=False, dry_run=False):
+    """Run ``stage`` unless its fingerprint is cached. Returns the action taken."""
+    key = fingerprint(stage, state)
+    cache_path = os.path.join(cache_dir, "cache", stage.name, key)
+    cached = os.path.isfile(os.path.join(cache_path, "meta.json"))
+
+    if cached and not force:
+        if outputs_match(stage, cache_path, state):
+            action = "skipped"
+        else:
+            action = "restored"
+            if not dry_run:
+                for index, out in enumerate(stage.outs):
+                    copy_path(os.path.join(cache_path, str(index)), out)
+        print(f"[{stage.name}] {action} ({key})")
+        return action
+
+    if not force and stage.restore is not None and not dry_run:
+        if stage.restore(key):
+            print(f"[{stage.name}] reused MLflow run ({key})")
+            save_outputs(stage, cache_path, key)
+            return "reused"
+
+    if dry_run:
+        print(f"[{stage.name}] would run ({key})")
+        return "stale"
+
+    print(f"[{stage.name}] running ({key})")
+    stage.run(key)
+    missing = [out for out in stage.outs if not os.path.exists(out)]
+    if missing:
+        raise RuntimeError(f"Stage {stage.name} did not produce {', '.join(missing)}")
+    save_outputs(stage, cache_path, key)
+    check_dvc_outputs(stage, state)
+    return "ran"
+
+
+def save_outputs(stage, cache_path, key):
+    for index, out in enumerate(stage.outs):
+        copy_path(out, os.path.join(cache_path, str(index)))
+    with open(os.path.join(cache_path, "meta.json"), "w") as f:
+        json.dump({"stage": stage.name, "fingerprint": key, "outs": stage.outs}, f)
+
+
+def run_pipeline(stages, cache_dir=CACHE_DIR, force=(), dry_run=False):
+    """Run stages in order. ``force`` names stages to rerun regardless of cache."""
+    state = HashState(os.path.join(cache_dir, STATE_FILE))
+    actions = {}
+    try:
+        for stage in stages:
+            actions[stage.name] = run_stage(
+                stage, state, cache_dir, stage.name in force, dry_run
+            )
+    finally:
+        state.save()
+    return actions
+
+
+def find_mlflow_model(args, key):
+    """Copy the best model of an earlier training run with this fingerprint."""
+    if not args.mlflow_uri:
+        return False
+    import mlflow
+    import mlflow.artifacts
+
+    mlflow.set_tracking_uri(args.mlflow_uri)
+    try:
+        runs = mlflow.search_runs(
+            experiment_names=[args.experiment_name],
+            filter_string=(
+                f"tags.`pipeline.fingerprint` = '{key}' "
+                "and tags.`pipeline.best` = 'true'"
+            ),
+            max_results=1,
+        )
+    except Exception as e:
+        print(f"  Could not search MLflow runs: {e}")
+        return False
+    if runs.empty:
+        return False
+
+    run_id = runs.iloc[0]["run_id"]
+    local = mlflow.artifacts.download_artifacts(f"runs:/{run_id}/model")
+    copy_path(local, os.path.join(args.output_dir, args.model_name))
+    print(f"  Best model restored from MLflow run {run_id}")
+    return True
+
+
+def build_stages(args):
+    from src.preprocess_data import DATA_PATH, preprocess, split_files
+
+    split_paths = [
+        os.path.join(args.data_dir, name) for name in split_files(args.format)
+    ]
+    # Everything that changes what training produces, the tracking server
+    # and the runner's own flags do not
+    train_params = {
+        key: value
+        for key, value in sorted(vars(args).items())
+        if key not in ("mlflow_uri", "cache_dir", "force", "dry_run")
+    }
+
+    preprocess_stage = Stage(
+        "preprocess",
+        deps=[str(DATA_PATH)],
+        code=["src/preprocess_data.py", "src/data_io.py"],
+        outs=split_paths,
+        params={
+            "test_size": args.test_size,
+            "random_state": args.random_state,
+            "format": args.format,
+        },
+        run=lambda key: preprocess(
+            DATA_PATH, args.data_dir, args.test_size, args.random_state, args.format
+        ),
+    )
+
+    def train(key):
+        from src.model_train import train_and_register
+
+        # Runs are tagged with the fingerprint so a later job can reuse them
+        train_and_register(Namespace(**vars(args), pipeline_fingerprint=key))
+
+    train_stage = Stage(
+        "train",
+        # The search space file is an input of training as well
+        deps=split_paths + ([args.search_space] if args.search_space else []),
+        # The feature schema written with the model comes from app/schema.py
+        code=[
+            "src/model_train.py",
+            "src/search.py",
+            "src/data_io.py",
+            "app/schema.py",
+        ],
+        outs=[os.path.join(args.output_dir, args.model_name)],
+        params=train_params,
+        run=train,
+        restore=lambda key: find_mlflow_model(args, key),
+    )
+    return [preprocess_stage, train_stage]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Preprocess and train, skipping stages whose inputs are unchanged"
+    )
+    parser.add_argument("--mlflow-uri", type=str, default="")
+    parser.add_argument("--experiment-name", type=str, default="Iris_Classification")
+    parser.add_argument("--model-name", type=str, default="iris_classifier")
+    parser.add_argument("--data-dir", type=str, default="data/processed")
+    parser.add_argument("--output-dir", type=str, default="./artifacts")
+    parser.add_argument("--scale", action="store_true")
+    parser.add_argument(
+        "--stage",
+        type=str,
+        default="None",
+        choices=["None", "Staging", "Production"],
+    )
+    parser.add_argument("--search", type=str, default="none")
+    parser.add_argument("--search-space", type=str, default=None)
+    parser.add_argument("--cv", type=int, default=5)
+    parser.add_argument("--n-iter", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--max-trials", type=int, default=None)
+    parser.add_argument("--max-seconds", type=float, default=None)
+    parser.add_argument("--halving-factor", type=int, default=3)
+    parser.add_argument("--partial-fit", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--random-state", type=int, default=42)
+    parser.add_argument(
+        "--format",
+        type=str,
+        default="csv",
+        choices=["csv", "parquet", "feather", "npy"],
+        help="Split file format",
+    )
+    parser.add_argument(
+        "--cache-dir", type=str, default=CACHE_DIR, help="Fingerprint cache"
+    )
+    parser.add_argument(
+        "--force",
+        action="append",
+        default=[],
+        choices=["preprocess", "train"],
+        help="Rerun a stage even if its fingerprint is cached (repeatable)",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Only report which stages would run"
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        actions = run_pipeline(
+            build_stages(args), args.cache_dir, args.force, args.dry_run
+        )
+    except FileNotFoundError as e:
+        print(e)
+        sys.exit(1)
+    return actions
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,160 @@
+import argparse
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from pathlib import Path
 
+from src.data_io import (
+    MANIFEST,
+    SPLIT_FORMATS,
+    SPLIT_NAMES,
+    SplitWriter,
+    StratifiedSplit,
+    split_path,
+    write_manifest,
+)
+
 DATA_PATH = Path("data/raw/iris.csv")
 PROCESSED_PATH = Path("data/processed")
-PROCESSED_PATH.mkdir(parents=True, exist_ok=True)
 
-# Load raw data
-df = pd.read_csv(DATA_PATH)
 
-# Split features and labels
-features = df.drop(columns=["Id", "Species"])
-labels = df["Species"]
+def split_files(fmt="csv"):
+    """Files written by preprocessing in ``fmt``, the manifest last."""
+    return [name + SPLIT_FORMATS[fmt] for name in SPLIT_NAMES] + [MANIFEST]
 
-# Train-test split
-X_train, X_test, y_train, y_test = train_test_split(
-    features, labels, test_size=0.2, random_state=42, stratify=labels
-)
 
-# Save processed features with headers
-pd.DataFrame(X_train, columns=features.columns).to_csv(
-    PROCESSED_PATH / "X_train.csv", index=False
-)
-pd.DataFrame(X_test, columns=features.columns).to_csv(
-    PROCESSED_PATH / "X_test.csv", index=False
-)
+def open_writers(processed_path, fmt):
+    return {
+        name: SplitWriter(split_path(processed_path, name, fmt), fmt)
+        for name in SPLIT_NAMES
+    }
+
+
+def preprocess(
+    data_path=DATA_PATH,
+    processed_path=PROCESSED_PATH,
+    test_size=0.2,
+    random_state=42,
+    fmt="csv",
+):
+    processed_path = Path(processed_path)
+    processed_path.mkdir(parents=True, exist_ok=True)
+
+    # Load raw data
+    df = pd.read_csv(data_path)
+
+    # Split features and labels
+    features = df.drop(columns=["Id", "Species"])
+    labels = df["Species"]
+
+    # Train-test split
+    X_train, X_test, y_train, y_test = train_test_split(
+        features,
+        labels,
+        test_size=test_size,
+        random_state=random_state,
+        stratify=labels,
+    )
+
+    # Save processed features with headers, and labels with proper wrapping
+    writers = open_writers(processed_path, fmt)
+    splits = {
+        "X_train": pd.DataFrame(X_train, columns=features.columns),
+        "X_test": pd.DataFrame(X_test, columns=features.columns),
+        "y_train": pd.DataFrame({"label": y_train}),
+        "y_test": pd.DataFrame({"label": y_test}),
+    }
+    for name, frame in splits.items():
+        writers[name].write(frame)
+        writers[name].close()
+    write_manifest(processed_path, fmt, writers)
+
+    print("Preprocessing complete. Files saved in:", processed_path)
+    return [processed_path / name for name in split_files(fmt)]
+
+
+def preprocess_streaming(
+    data_path=DATA_PATH,
+    processed_path=PROCESSED_PATH,
+    test_size=0.2,
+    random_state=42,
+    chunk_size=100_000,
+    fmt="parquet",
+):
+    """Split a raw file of any size, reading and writing one chunk at a time.
+
+    Rows go to the test split by a counter per class that carries over
+    between chunks, so each class is split at ``test_size`` whatever the
+    chunk boundaries and the whole file is never held in memory. Parquet
+    splits get one row group per chunk.
+    """
+    if fmt == "npy":
+        raise ValueError("Streaming preprocessing writes parquet, feather or csv")
+    processed_path = Path(processed_path)
+    processed_path.mkdir(parents=True, exist_ok=True)
+    writers = open_writers(processed_path, fmt)
+
+    split = StratifiedSplit(test_size, random_state)
+
+    try:
+        for chunk in pd.read_csv(data_path, chunksize=chunk_size):
+            test = split(chunk["Species"])
+            features = chunk.drop(columns=["Id", "Species"], errors="ignore")
+            labels = pd.DataFrame({"label": chunk["Species"]})
+
+            writers["X_train"].write(features[~test])
+            writers["X_test"].write(features[test])
+            writers["y_train"].write(labels[~test])
+            writers["y_test"].write(labels[test])
+    finally:
+        for writer in writers.values():
+            writer.close()
+    write_manifest(processed_path, fmt, writers)
+
+    print(
+        f"Streaming preprocessing complete: {writers['X_train'].rows} train rows, "
+        f"{writers['X_test'].rows} test rows saved in: {processed_path}"
+    )
+    return [processed_path / name for name in split_files(fmt)]
+
 
-# Save labels with proper wrapping
-pd.DataFrame({"label": y_train}).to_csv(PROCESSED_PATH / "y_train.csv", index=False)
-pd.DataFrame({"label": y_test}).to_csv(PROCESSED_PATH / "y_test.csv", index=False)
+# CLI entry point
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split the raw data for training")
+    parser.add_argument("--input", type=str, default=str(DATA_PATH))
+    parser.add_argument("--output-dir", type=str, default=str(PROCESSED_PATH))
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--random-state", type=int, default=42)
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Read the raw file in chunks and split each class as it streams",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=100_000, help="Rows per chunk (streaming)"
+    )
+    parser.add_argument(
+        "--format",
+        type=str,
+        default=None,
+        choices=list(SPLIT_FORMATS),
+        help="Split file format (default: csv, parquet when streaming)",
+    )
 
-print("Preprocessing complete. Files saved in:", PROCESSED_PATH)
+    args = parser.parse_args()
+    if args.streaming:
+        preprocess_streaming(
+            args.input,
+            args.output_dir,
+            args.test_size,
+            args.random_state,
+            args.chunk_size,
+            args.format or "parquet",
+        )
+    else:
+        preprocess(
+            args.input,
+            args.output_dir,
+            args.test_size,
+            args.random_state,
+            args.format or "csv",
+        )
@@ -0,0 +1,216 @@
+import os
+import sys
+import time
+import argparse
+import resource
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from app.model import FEATURE_NAMES, load_model, predict_batch
+
+# Columns that are never model features when --features is not given
+NON_FEATURE_COLUMNS = {"Id", "Species", "label", "prediction"}
+
+# Model used by this process (the parent, or a pool worker)
+_model = None
+
+
+FILE_FORMATS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".json": "jsonl",
+    ".parquet": "parquet",
+}
+
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FILE_FORMATS:
+        print(f"Unsupported file extension '{ext}'. Use .csv, .jsonl or .parquet")
+        sys.exit(1)
+    return FILE_FORMATS[ext]
+
+
+# Stream the input file in fixed-size chunks
+def iter_chunks(path, chunk_size):
+    fmt = detect_format(path)
+    if fmt == "csv":
+        yield from pd.read_csv(path, chunksize=chunk_size)
+    elif fmt == "jsonl":
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size)
+    else:
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+
+
+class ChunkWriter:
+    """Appends scored chunks to the output file as they complete."""
+
+    def __init__(self, path):
+        self.path = path
+        self.format = detect_format(path)
+        self._parquet = None
+        self._started = False
+
+    def write(self, chunk):
+        if self.format == "csv":
+            chunk.to_csv(
+                self.path,
+                mode="a" if self._started else "w",
+                header=not self._started,
+                index=False,
+            )
+        elif self.format == "jsonl":
+            with open(self.path, "a" if self._started else "w") as f:
+                chunk.to_json(f, orient="records", lines=True)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        self._started = True
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def select_features(chunk, features):
+    if features:
+        return features
+    if all(f in chunk.columns for f in FEATURE_NAMES):
+        return FEATURE_NAMES
+    # Training column names (e.g. SepalLengthCm), mapped through the schema
+    schema = getattr(_model, "schema", None)
+    if schema is not None and all(c in chunk.columns for c in schema.names):
+        return schema.columns_for(FEATURE_NAMES)
+    return [c for c in chunk.columns if c not in NON_FEATURE_COLUMNS]
+
+
+def _init_worker():
+    # Forked workers inherit the parent's model; spawned ones load their own
+    global _model
+    if _model is None:
+        _model = load_model()
+    if _model is None:
+        raise RuntimeError("Model could not be loaded")
+
+
+def score_chunk(chunk, features):
+    rows = chunk[select_features(chunk, features)].to_numpy(dtype="float64")
+    chunk = chunk.copy()
+    chunk["prediction"] = predict_batch(_model, rows)
+    return chunk
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return self_rss / 1024, child_rss / 1024
+
+
+def score_file(input_path, output_path, chunk_size=10_000, workers=0, features=None):
+    global _model
+
+    detect_format(input_path)
+
+    print(f"Loading model for scoring {input_path}")
+    _model = load_model()
+    # Dummy predictions would look like a valid output file
+    if _model is None:
+        print("Model could not be loaded, no predictions were written")
+        sys.exit(1)
+
+    writer = ChunkWriter(output_path)
+
+    start = time.perf_counter()
+    rows = 0
+
+    try:
+        if workers <= 0:
+            for chunk in iter_chunks(input_path, chunk_size):
+                writer.write(score_chunk(chunk, features))
+                rows += len(chunk)
+        else:
+            # Keep a bounded number of chunks in flight so memory stays flat
+            max_in_flight = workers * 2
+            pending = deque()
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker
+            ) as pool:
+                for chunk in iter_chunks(input_path, chunk_size):
+                    pending.append(pool.submit(score_chunk, chunk, features))
+                    if len(pending) >= max_in_flight:
+                        scored = pending.popleft().result()
+                        writer.write(scored)
+                        rows += len(scored)
+                while pending:
+                    scored = pending.popleft().result()
+                    writer.write(scored)
+                    rows += len(scored)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    self_rss, child_rss = peak_rss_mb()
+    stats = {
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed > 0 else None,
+        "peak_rss_mb": round(self_rss, 1),
+        "peak_worker_rss_mb": round(child_rss, 1),
+    }
+    print(
+        f"Scored {rows} rows in {elapsed:.2f}s "
+        f"({stats['rows_per_sec']} rows/sec), "
+        f"peak RSS {self_rss:.1f} MB (workers {child_rss:.1f} MB)"
+    )
+    print(f"Predictions written to: {output_path}")
+    return stats
+
+
+# CLI entry point
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Score a CSV/JSONL/Parquet file with the serving model"
+    )
+    parser.add_argument("--input", type=str, required=True, help="File to score")
+    parser.add_argument(
+        "--output",
+        type=str,
+        required=True,
+        help="Output file; input columns plus a 'prediction' column",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=10_000, help="Rows per chunk"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes (0 scores in the main process)",
+    )
+    parser.add_argument(
+        "--features",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Feature columns in model order (default: auto-detect)",
+    )
+
+    args = parser.parse_args()
+    score_file(
+        args.input,
+        args.output,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        features=args.features,
+    )
@@ -0,0 +1,268 @@
+import json
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import (
+    ParameterGrid,
+    ParameterSampler,
+    StratifiedKFold,
+    cross_val_score,
+    train_test_split,
+)
+
+# Model families and the hyperparameters searched for each. Override with
+# --search-space, a JSON file of the same shape.
+SEARCH_SPACE = {
+    "logistic_regression": {
+        "C": [0.01, 0.1, 1.0, 10.0, 100.0],
+        "max_iter": [500],
+    },
+    "random_forest_classifier": {
+        "n_estimators": [50, 100, 200],
+        "max_depth": [None, 3, 5, 8],
+        "min_samples_leaf": [1, 2, 4],
+        "max_features": ["sqrt"],
+    },
+}
+
+ESTIMATORS = {
+    "logistic_regression": LogisticRegression,
+    "random_forest_classifier": RandomForestClassifier,
+}
+
+STRATEGIES = ("grid", "random", "halving")
+
+# MLflow log_batch limits per request
+MAX_METRICS_PER_BATCH = 1000
+MAX_PARAMS_PER_BATCH = 100
+
+# Training data of this process (the parent, or a pool worker)
+_X = None
+_y = None
+
+
+def build_estimator(family, params):
+    estimator = ESTIMATORS[family](**params)
+    # n_jobs stays at its single-threaded default, the process pool
+    # provides the parallelism
+    if "random_state" in estimator.get_params():
+        estimator.set_params(random_state=42)
+    return estimator
+
+
+def load_search_space(path=None):
+    if path is None:
+        return SEARCH_SPACE
+    with open(path) as f:
+        space = json.load(f)
+    unknown = set(space) - set(ESTIMATORS)
+    if unknown:
+        raise ValueError(f"Unknown model families: {', '.join(sorted(unknown))}")
+    return space
+
+
+def candidates(space, strategy, n_iter=20, seed=42):
+    """List ``(family, params)`` candidates for a search strategy."""
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown search strategy '{strategy}'")
+    found = []
+    for family, grid in space.items():
+        if strategy == "random":
+            sampler = ParameterSampler(grid, n_iter=n_iter, random_state=seed)
+            params = list(sampler)
+        else:
+            params = list(ParameterGrid(grid))
+        # Sampling from small grids can repeat a combination
+        unique = {json.dumps(p, sort_keys=True): p for p in params}
+        found.extend((family, p) for p in unique.values())
+    return found
+
+
+def _init_worker(X, y):
+    global _X, _y
+    _X, _y = X, y
+
+
+def evaluate(trial_id, family, params, cv, n_samples):
+    """Cross-validated accuracy of one candidate on ``n_samples`` rows."""
+    X, y = _X, _y
+    if n_samples < len(y):
+        X, _, y, _ = train_test_split(
+            X, y, train_size=n_samples, stratify=y, random_state=42
+        )
+    folds = StratifiedKFold(n_splits=cv, shuffle=True, random_state=42)
+    start = time.perf_counter()
+    scores = cross_val_score(build_estimator(family, params), X, y, cv=folds)
+    return {
+        "trial": trial_id,
+        "family": family,
+        "params": params,
+        "n_samples": int(len(y)),
+        "cv_mean": float(np.mean(scores)),
+        "cv_std": float(np.std(scores)),
+        "fit_seconds": time.perf_counter() - start,
+    }
+
+
+class Budget:
+    """Stops a search after ``max_trials`` trials or ``max_seconds`` of wall clock."""
+
+    def __init__(self, max_trials=None, max_seconds=None):
+        self.max_trials = max_trials
+        self.max_seconds = max_seconds
+        self.started = time.monotonic()
+        self.trials = 0
+        # Set once a candidate was skipped because the budget ran out
+        self.stopped = False
+
+    @property
+    def out_of_time(self):
+        elapsed = time.monotonic() - self.started
+        return self.max_seconds is not None and elapsed >= self.max_seconds
+
+    @property
+    def exhausted(self):
+        if self.max_trials is not None and self.trials >= self.max_trials:
+            return True
+        return self.out_of_time
+
+
+def run_round(pool, tasks, cv, n_samples, budget, workers, round_index=0):
+    """Evaluate ``tasks`` on the pool, submitting no more than the budget allows."""
+    results = []
+    pending = set()
+    tasks = list(tasks)
+    while tasks or pending:
+        while tasks and len(pending) < workers * 2 and not budget.exhausted:
+            family, params = tasks.pop(0)
+            budget.trials += 1
+            pending.add(
+                pool.submit(evaluate, budget.trials, family, params, cv, n_samples)
+            )
+        if not pending:
+            break
+        done, pending = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+        for future in done:
+            result = future.result()
+            result["round"] = round_index
+            results.append(result)
+        if budget.out_of_time:
+            # Drop queued trials that have not started, let running ones finish
+            for future in pending:
+                if future.cancel():
+                    budget.stopped = True
+            pending = {f for f in pending if not f.cancelled()}
+    if tasks:
+        budget.stopped = True
+    return results
+
+
+def min_samples(y, cv):
+    # Every class needs at least two rows per fold after subsampling
+    return cv * 2 * len(np.unique(y))
+
+
+def run_search(
+    X,
+    y,
+    strategy="grid",
+    space=None,
+    cv=5,
+    n_iter=20,
+    workers=0,
+    max_trials=None,
+    max_seconds=None,
+    halving_factor=3,
+):
+    """Evaluate candidates in parallel and return ``(trials, stopped_early)``.
+
+    Every candidate is cross-validated on a process pool. ``halving`` starts
+    all candidates on a small stratified sample of the training rows and
+    keeps the best ``1/halving_factor`` of them for each next round on
+    ``halving_factor`` times as many rows, until one candidate or all rows
+    remain.
+    """
+    space = space or SEARCH_SPACE
+    workers = workers or os.cpu_count() or 1
+    X, y = np.asarray(X), np.asarray(y)
+    budget = Budget(max_trials, max_seconds)
+    todo = candidates(space, strategy, n_iter)
+    trials = []
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(X, y)
+    ) as pool:
+        if strategy != "halving":
+            trials = run_round(pool, todo, cv, len(y), budget, workers)
+        else:
+            rounds = max(1, math.ceil(math.log(len(todo), halving_factor)))
+            n_samples = max(
+                min_samples(y, cv), len(y) // halving_factor ** (rounds - 1)
+            )
+            for round_index in range(rounds + 1):
+                n_samples = min(n_samples, len(y))
+                results = run_round(
+                    pool, todo, cv, n_samples, budget, workers, round_index
+                )
+                trials.extend(results)
+                if len(results) <= 1 or n_samples >= len(y) or budget.stopped:
+                    break
+                results.sort(key=lambda r: r["cv_mean"], reverse=True)
+                keep = max(1, len(results) // halving_factor)
+                todo = [(r["family"], r["params"]) for r in results[:keep]]
+                n_samples *= halving_factor
+
+    return trials, budget.stopped
+
+
+def best_per_family(trials):
+    """Best trial of each family, preferring ones scored on more rows."""
+    best = {}
+    for trial in trials:
+        rank = (trial["n_samples"], trial["cv_mean"], -trial["cv_std"])
+        current = best.get(trial["family"])
+        if current is None or rank > current[0]:
+            best[trial["family"]] = (rank, trial)
+    return {family: trial for family, (_, trial) in best.items()}
+
+
+def log_trials(client, run_id, trials):
+    """Log all trials to one MLflow run with as few requests as possible.
+
+    Each trial becomes a step of the ``cv_accuracy``/``cv_std``/``fit_seconds``
+    metrics, and its family and parameters become ``trial_<n>.*`` params. Both
+    are sent with ``log_batch`` in chunks of the API's per-request limits.
+    """
+    from mlflow.entities import Metric, Param
+
+    timestamp = int(time.time() * 1000)
+    metrics, params = [], []
+    for trial in trials:
+        step = trial["trial"]
+        for key, value in (
+            ("cv_accuracy", trial["cv_mean"]),
+            ("cv_std", trial["cv_std"]),
+            ("fit_seconds", trial["fit_seconds"]),
+            ("n_samples", trial["n_samples"]),
+        ):
+            metrics.append(Metric(key, value, timestamp, step))
+        prefix = f"trial_{step}"
+        params.append(Param(f"{prefix}.family", trial["family"]))
+        params.extend(
+            Param(f"{prefix}.{name}", str(value))
+            for name, value in sorted(trial["params"].items())
+        )
+
+    calls = 0
+    for start in range(0, len(metrics), MAX_METRICS_PER_BATCH):
+        client.log_batch(run_id, metrics=metrics[start:start + MAX_METRICS_PER_BATCH])
+        calls += 1
+    for start in range(0, len(params), MAX_PARAMS_PER_BATCH):
+        client.log_batch(run_id, params=params[start:start + MAX_PARAMS_PER_BATCH])
+        calls += 1
+    return calls
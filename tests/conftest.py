@@ -0,0 +1,10 @@
+import os
+import tempfile
+
+# Set before app.config is imported, so tests never write logs into the repo
+LOG_DIR = tempfile.mkdtemp(prefix="mlops-test-logs-")
+os.environ["LOG_DB_PATH"] = os.path.join(LOG_DIR, "logs.db")
+os.environ["LOG_SPILL_PATH"] = os.path.join(LOG_DIR, "spill.jsonl")
+os.environ["LOG_JSONL_PATH"] = os.path.join(LOG_DIR, "requests.jsonl")
+os.environ["LOG_SEGMENT_DIR"] = os.path.join(LOG_DIR, "segments")
+os.environ["LOG_ARCHIVE_DIR"] = os.path.join(LOG_DIR, "archive")
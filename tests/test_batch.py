@@ -0,0 +1,79 @@
+import io
+import json
+import numpy as np
+import pyarrow as pa
+import pytest
+from app.batch import (
+    BatchValidationError,
+    iter_json_predictions,
+    parse_batch,
+    summarize,
+    validate_rows,
+)
+
+ROWS = [[5.1, 3.5, 1.4, 0.2], [6.7, 3.0, 5.2, 2.3]]
+FIELDS = ["sepal_length", "sepal_width", "petal_length", "petal_width"]
+
+
+def test_parse_json_records():
+    body = json.dumps([dict(zip(FIELDS, row)) for row in ROWS])
+    rows, fmt = parse_batch(body, "application/json")
+    assert fmt == "records"
+    assert rows.tolist() == ROWS
+
+
+def test_parse_json_columnar():
+    body = json.dumps({f: [row[i] for row in ROWS] for i, f in enumerate(FIELDS)})
+    rows, fmt = parse_batch(body, "application/json; charset=utf-8")
+    assert fmt == "columnar"
+    assert rows.tolist() == ROWS
+
+
+def test_parse_numpy_body():
+    buf = io.BytesIO()
+    np.save(buf, np.array(ROWS))
+    rows, fmt = parse_batch(buf.getvalue(), "application/x-npy")
+    assert fmt == "numpy"
+    assert rows.tolist() == ROWS
+
+
+def test_parse_arrow_body():
+    table = pa.table({f: [row[i] for row in ROWS] for i, f in enumerate(FIELDS)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    rows, fmt = parse_batch(
+        sink.getvalue().to_pybytes(), "application/vnd.apache.arrow.stream"
+    )
+    assert fmt == "arrow"
+    assert rows.tolist() == ROWS
+
+
+def test_columnar_length_mismatch():
+    body = json.dumps({f: [1.0] for f in FIELDS} | {"petal_width": [1.0, 2.0]})
+    with pytest.raises(BatchValidationError, match="equal length"):
+        parse_batch(body, "application/json")
+
+
+def test_unsupported_content_type():
+    with pytest.raises(BatchValidationError) as exc:
+        parse_batch(b"a,b", "text/csv")
+    assert exc.value.status_code == 415
+
+
+def test_validate_rows_reports_non_finite():
+    rows = np.array(ROWS + [[1.0, np.nan, 1.0, 1.0]])
+    with pytest.raises(BatchValidationError, match=r"first: \[2\]"):
+        validate_rows(rows)
+
+
+def test_validate_rows_wrong_width():
+    with pytest.raises(BatchValidationError, match="Expected rows of 4"):
+        validate_rows(np.ones((3, 2)))
+
+
+def test_streamed_predictions_are_valid_json():
+    predictions = [f"class-{i % 3}" for i in range(25)]
+    body = b"".join(iter_json_predictions(predictions, chunk_size=10))
+    assert json.loads(body) == {"predictions": predictions}
+    assert summarize(predictions) == {"class-0": 9, "class-1": 8, "class-2": 8}
@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from app.batcher import InferenceBatcher
+from app.model import predict_batch
+
+
+class RecordingModel:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, model, rows):
+        self.batch_sizes.append(rows.shape[0])
+        return [f"class-{row[0]:.0f}" for row in rows]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_call():
+    model = RecordingModel()
+    batcher = InferenceBatcher(model, max_batch_size=64, max_wait_us=50_000)
+
+    results = await asyncio.gather(
+        *[batcher.submit([i, 0.0, 0.0, 0.0]) for i in range(10)]
+    )
+
+    assert results == [f"class-{i}" for i in range(10)]
+    assert model.batch_sizes == [10]
+
+
+@pytest.mark.asyncio
+async def test_batches_are_capped_at_max_size():
+    model = RecordingModel()
+    batcher = InferenceBatcher(model, max_batch_size=4, max_wait_us=50_000)
+
+    results = await asyncio.gather(
+        *[batcher.submit([i, 0.0, 0.0, 0.0]) for i in range(10)]
+    )
+
+    assert results == [f"class-{i}" for i in range(10)]
+    assert model.batch_sizes == [4, 4, 2]
+
+
+@pytest.mark.asyncio
+async def test_model_error_fails_every_request_in_batch():
+    def failing_model(model, rows):
+        raise ValueError("Model crashed")
+
+    batcher = InferenceBatcher(failing_model, max_batch_size=8, max_wait_us=10_000)
+
+    results = await asyncio.gather(
+        *[batcher.submit([1.0, 2.0, 3.0, 4.0]) for _ in range(3)],
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+class NamedModel:
+    def __init__(self, name):
+        self.name = name
+        self.batch_sizes = []
+
+    def predict(self, rows):
+        self.batch_sizes.append(len(rows))
+        return [self.name] * len(rows)
+
+
+@pytest.mark.asyncio
+async def test_rows_are_scored_by_the_model_they_were_submitted_with():
+    old, new = NamedModel("old"), NamedModel("new")
+    batcher = InferenceBatcher(predict_batch, max_batch_size=64, max_wait_us=50_000)
+
+    # A swap lands while the first rows are still waiting for the flush
+    models = [old, old, new, old, new]
+    results = await asyncio.gather(
+        *[batcher.submit([1.0, 2.0, 3.0, 4.0], m) for m in models]
+    )
+
+    assert results == ["old", "old", "new", "old", "new"]
+    assert old.batch_sizes == [3] and new.batch_sizes == [2]
+
+
+def test_predict_batch_without_model():
+    assert predict_batch(None, [[1.0, 2.0, 3.0, 4.0]] * 3) == ["dummy-class"] * 3
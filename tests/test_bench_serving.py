@@ -0,0 +1,86 @@
+import asyncio
+import copy
+import json
+
+from fastapi import FastAPI, HTTPException
+
+from benchmarks.bench_serving import (
+    compare,
+    generated_traffic,
+    read_traffic,
+    run_load,
+)
+
+
+def make_app():
+    app = FastAPI()
+
+    @app.post("/predict")
+    def predict(body: dict):
+        return {"prediction": "setosa"}
+
+    @app.get("/health")
+    def health():
+        raise HTTPException(status_code=503)
+
+    return app
+
+
+def test_run_load_closed_loop():
+    traffic = generated_traffic(50, {"predict": 0.8, "health": 0.2})
+    results = asyncio.run(
+        run_load(make_app(), traffic, concurrency=4, total=50, warmup=5)
+    )
+
+    assert results["total"]["requests"] == 50
+    predict = results["endpoints"]["POST /predict"]
+    assert predict["status_codes"] == {"200": predict["requests"]}
+    assert predict["errors"] == 0
+    assert results["endpoints"]["GET /health"]["error_rate"] == 1.0
+    latency = results["total"]["latency_ms"]
+    assert 0 < latency["p50"] <= latency["p95"] <= latency["p99"] <= latency["max"]
+
+
+def test_run_load_open_loop():
+    traffic = generated_traffic(20, {"predict": 1.0})
+    results = asyncio.run(run_load(make_app(), traffic, qps=200, duration=0.1))
+    assert results["config"]["mode"] == "open"
+    assert results["total"]["requests"] == 20
+
+
+def test_read_traffic_replays_request_logs(tmp_path):
+    path = tmp_path / "requests.jsonl"
+    rows = [
+        {"method": "GET", "path": "/metrics?limit=5"},
+        # A row written by the jsonl log sink
+        {
+            "id": 1,
+            "method": "POST",
+            "url": "http://testserver/predict",
+            "input": json.dumps({"sepal_length": 5.1}),
+        },
+    ]
+    path.write_text("\n".join(json.dumps(row) for row in rows) + "\n")
+
+    assert read_traffic(path) == [
+        {"method": "GET", "path": "/metrics?limit=5", "body": None},
+        {"method": "POST", "path": "/predict", "body": {"sepal_length": 5.1}},
+    ]
+
+
+def test_compare_flags_regressions():
+    traffic = generated_traffic(30, {"predict": 1.0})
+    baseline = asyncio.run(run_load(make_app(), traffic, total=30))
+    assert compare(baseline, baseline) == []
+
+    slower = copy.deepcopy(baseline)
+    endpoint = slower["endpoints"]["POST /predict"]
+    endpoint["latency_ms"]["p99"] = baseline["endpoints"]["POST /predict"][
+        "latency_ms"
+    ]["p99"] * 2 + 5
+    endpoint["throughput_rps"] /= 2
+    endpoint["error_rate"] = 0.5
+
+    regressions = compare(slower, baseline)
+    assert len(regressions) == 3
+    assert regressions[0].startswith("POST /predict p99 latency")
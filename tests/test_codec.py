@@ -0,0 +1,101 @@
+import json
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from fastapi.exceptions import RequestValidationError
+from fastapi.testclient import TestClient
+
+from app import codec
+from app.codec import dumps, parse_features, to_json
+from app.main import Input, app
+
+client = TestClient(app)
+
+BODY = (
+    b'{"petal_width": 0.2, "sepal_length": 5, "sepal_width": 3.5, '
+    b'"petal_length": 1.4}'
+)
+
+
+def test_fast_path_reuses_body_and_orders_features():
+    features, row, input_json = parse_features(BODY, Input)
+    assert list(features) == list(Input.model_fields)
+    assert features["sepal_length"] == 5.0
+    assert row.dtype == np.float64 and row.tolist() == [5.0, 3.5, 1.4, 0.2]
+    assert input_json is BODY
+
+
+def test_pydantic_fallback_coerces_and_reserializes():
+    body = json.dumps(
+        {
+            "sepal_length": "5.1",
+            "sepal_width": 3.5,
+            "petal_length": 1.4,
+            "petal_width": 0.2,
+            "extra": True,
+        }
+    ).encode()
+    features, _, input_json = parse_features(body, Input)
+    assert features["sepal_length"] == 5.1
+    assert json.loads(input_json) == features
+
+
+@pytest.mark.parametrize(
+    "body, loc",
+    [
+        (b'{"sepal_length": 5.1}', ("body", "sepal_width")),
+        (b"not json", ("body",)),
+        (b"", ("body",)),
+    ],
+)
+def test_invalid_bodies(body, loc):
+    with pytest.raises(RequestValidationError) as exc:
+        parse_features(body, Input)
+    error = exc.value.errors()[0]
+    assert error["loc"] == loc
+    # The validation handler logs the errors as JSON
+    json.dumps(exc.value.errors())
+
+
+def test_non_finite_features_are_rejected():
+    # orjson refuses these as invalid JSON, the stdlib parses them
+    with patch("app.codec.orjson", None):
+        with pytest.raises(RequestValidationError) as exc:
+            parse_features(BODY.replace(b"0.2", b"1e999"), Input)
+    error = exc.value.errors()[0]
+    assert error["loc"] == ("body", "petal_width")
+    assert error["input"] == "inf"
+    assert error["msg"] == "Value must be a finite number"
+
+
+@pytest.mark.parametrize("library", [codec.orjson, None])
+def test_dumps_converts_numpy(library):
+    with patch("app.codec.orjson", library):
+        assert json.loads(dumps(np.int64(2))) == 2
+        assert json.loads(dumps({"p": np.str_("setosa")})) == {"p": "setosa"}
+        assert json.loads(dumps(np.array([1.5, 2.0]))) == [1.5, 2.0]
+    assert to_json(b'"setosa"') == '"setosa"'
+
+
+@patch("app.main.log_request")
+@patch("app.main.predict", return_value=np.int64(1))
+@patch("app.main.verify_token")
+def test_predict_serializes_once_for_response_and_log(
+    mock_verify, mock_predict, mock_log
+):
+    response = client.post("/predict", content=BODY)
+    assert response.status_code == 200
+    assert response.json() == {"prediction": 1}
+
+    kwargs = mock_log.call_args.kwargs
+    assert kwargs["input_data"] == BODY
+    assert kwargs["prediction"] == b"1"
+    # Features reach the model in training column order
+    assert list(mock_predict.call_args.args[1].values()) == [5.0, 3.5, 1.4, 0.2]
+
+
+def test_parse_checks_finiteness_only():
+    # Ranges are the model's, applied to single rows and batches alike
+    _, row, _ = parse_features(BODY.replace(b"5", b"-5", 1), Input)
+    assert row[0] == -5.0
@@ -0,0 +1,167 @@
+import json
+import os
+from argparse import Namespace
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from src.data_io import (
+    MANIFEST,
+    find_split,
+    iter_split_batches,
+    load_splits,
+    read_manifest,
+    read_split,
+    split_classes,
+    StratifiedSplit,
+)
+from src.model_train import train_incremental
+from src.preprocess_data import preprocess, preprocess_streaming
+
+RAW_PATH = "data/raw/iris.csv"
+
+
+def test_split_does_not_depend_on_chunking():
+    labels = pd.read_csv(RAW_PATH)["Species"].sample(frac=1, random_state=0)
+    whole = StratifiedSplit(0.2)(labels)
+    split = StratifiedSplit(0.2)
+    chunked = np.concatenate([split(labels.iloc[i:i + 7]) for i in range(0, 150, 7)])
+    assert (whole == chunked).all()
+    assert not (whole == StratifiedSplit(0.2, seed=7)(labels)).all()
+
+
+def test_split_is_stratified_per_class():
+    rng = np.random.default_rng(0)
+    labels = rng.choice(["a", "b", "c"], size=10_001, p=[0.6, 0.3, 0.1])
+    split = StratifiedSplit(0.2)
+    chunks = range(0, len(labels), 999)
+    test = np.concatenate([split(labels[i:i + 999]) for i in chunks])
+    for label in ("a", "b", "c"):
+        count = (labels == label).sum()
+        assert abs(test[labels == label].sum() - 0.2 * count) <= 1
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "feather", "csv"])
+def test_streaming_preprocess_round_trip(tmp_path, fmt):
+    paths = preprocess_streaming(RAW_PATH, tmp_path, chunk_size=40, fmt=fmt)
+    assert [path.suffix for path in paths] == ["." + fmt] * 4 + [".json"]
+
+    X_train, X_test, y_train, y_test = load_splits(tmp_path)
+    assert len(X_train) + len(X_test) == 150
+    assert len(X_train) == len(y_train) and len(X_test) == len(y_test)
+    assert list(X_train.columns) == [
+        "SepalLengthCm", "SepalWidthCm", "PetalLengthCm", "PetalWidthCm"
+    ]
+    assert y_train.name == "label"
+    assert list(split_classes(tmp_path)) == sorted(y_train.unique())
+
+
+@pytest.mark.parametrize("chunk_size", [7, 40, 1000])
+def test_streaming_split_keeps_class_proportions(tmp_path, chunk_size):
+    preprocess_streaming(RAW_PATH, tmp_path, chunk_size=chunk_size, fmt="csv")
+    _, _, y_train, y_test = load_splits(tmp_path)
+    # 50 rows per class, sorted by label in the raw file
+    assert y_test.value_counts().to_dict() == {
+        "Iris-Setosa": 10, "Iris-Versicolor": 10, "Iris-Virginica": 10
+    }
+    assert set(y_train.value_counts()) == {40}
+
+
+def test_parquet_splits_have_row_group_statistics(tmp_path):
+    preprocess_streaming(RAW_PATH, tmp_path, chunk_size=40, fmt="parquet")
+    metadata = pq.ParquetFile(tmp_path / "X_train.parquet").metadata
+    # One row group per chunk of the raw file
+    assert metadata.num_row_groups == 4
+    assert metadata.row_group(0).column(0).statistics.has_min_max
+
+
+def test_iter_split_batches(tmp_path):
+    preprocess_streaming(RAW_PATH, tmp_path, fmt="feather")
+    batches = list(iter_split_batches(tmp_path, "train", batch_size=50))
+    assert [len(X) for X, _ in batches][:2] == [50, 50]
+    assert sum(len(y) for _, y in batches) == len(load_splits(tmp_path)[2])
+
+
+def test_binary_splits_are_preferred_over_csv(tmp_path):
+    preprocess_streaming(RAW_PATH, tmp_path, fmt="csv")
+    assert find_split(tmp_path, "X_train").endswith(".csv")
+    preprocess_streaming(RAW_PATH, tmp_path, fmt="parquet")
+    assert find_split(tmp_path, "X_train").endswith(".parquet")
+    assert find_split(tmp_path, "X_missing") is None
+
+
+@patch("src.model_train.mlflow")
+def test_train_incremental(mock_mlflow, tmp_path):
+    # The raw file is sorted by species, SGD needs batches of mixed classes
+    raw = tmp_path / "raw.csv"
+    pd.read_csv(RAW_PATH).sample(frac=1, random_state=0).to_csv(raw, index=False)
+    preprocess_streaming(raw, tmp_path, chunk_size=40, fmt="parquet")
+    args = Namespace(data_dir=str(tmp_path), scale=True, batch_size=32, epochs=20)
+    mock_mlflow.start_run.return_value.__enter__.return_value.info.run_id = "123"
+
+    name, acc, run_id, model, schema = train_incremental(args, str(tmp_path), None)
+
+    assert (name, run_id) == ("sgd_classifier", "123")
+    assert acc > 0.7
+    assert model.predict(pd.read_parquet(tmp_path / "X_test.parquet")).shape
+    mock_mlflow.sklearn.save_model.assert_called_once()
+    kwargs = mock_mlflow.sklearn.save_model.call_args.kwargs
+    assert os.path.basename(kwargs["path"]) == "sgd_classifier_classifier"
+
+    # Ranges cover every batch, the scaler stays inside the pipeline
+    assert schema.fields == [
+        "sepal_length", "sepal_width", "petal_length", "petal_width"
+    ]
+    assert schema.columns[2]["min"] == 1.0 and schema.columns[2]["max"] == 6.9
+    assert kwargs["metadata"]["feature_schema"]["scaler"] is None
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet", "feather", "npy"])
+def test_preprocess_formats_match_csv(tmp_path, fmt):
+    preprocess(RAW_PATH, tmp_path / "csv")
+    preprocess(RAW_PATH, tmp_path / fmt, fmt=fmt)
+
+    manifest = read_manifest(tmp_path / fmt)
+    assert manifest["format"] == fmt
+    assert manifest["splits"]["X_train"]["rows"] == 120
+    expected = load_splits(tmp_path / "csv")
+    for want, got in zip(expected, load_splits(tmp_path / fmt)):
+        assert got.equals(want)
+
+
+def test_npy_splits_are_memory_mapped(tmp_path):
+    preprocess(RAW_PATH, tmp_path, fmt="npy")
+    X_train = load_splits(tmp_path)[0]
+
+    base = np.asarray(X_train)
+    while base is not None and not isinstance(base, np.memmap):
+        base = getattr(base, "base", None)
+    assert isinstance(base, np.memmap)
+    columns = read_manifest(tmp_path)["splits"]["X_train"]["columns"]
+    assert list(X_train.columns) == list(columns)
+
+
+def test_manifest_keeps_csv_dtypes(tmp_path):
+    path = tmp_path / "y_train.csv"
+    pd.DataFrame({"label": ["01", "02", "03"]}).to_csv(path, index=False)
+    assert read_split(str(path))["label"].tolist() == [1, 2, 3]
+    assert read_split(str(path), {"label": "str"})["label"].tolist() == [
+        "01", "02", "03"
+    ]
+
+
+def test_manifest_column_mismatch_is_rejected(tmp_path):
+    preprocess(RAW_PATH, tmp_path, fmt="parquet")
+    manifest = read_manifest(tmp_path)
+    manifest["splits"]["X_train"]["columns"] = {"other": "float64"}
+    (tmp_path / MANIFEST).write_text(json.dumps(manifest))
+    with pytest.raises(ValueError, match="manifest"):
+        load_splits(tmp_path)
+
+
+def test_streaming_rejects_npy(tmp_path):
+    with pytest.raises(ValueError):
+        preprocess_streaming(RAW_PATH, tmp_path, fmt="npy")
@@ -1,10 +1,13 @@
 import pytest
 import json
+import threading
 from fastapi import HTTPException
 from fastapi.exceptions import RequestValidationError
 from starlette.requests import Request as StarletteRequest
 from unittest.mock import patch
 from app.exceptions import handle_validation_error, handle_http_exception
+from app.executors import BoundedExecutor
+from app.logger import log_writer
 
 
 def make_post_request(json_body: dict) -> StarletteRequest:
@@ -66,3 +69,44 @@ async def test_handle_http_exception_generic(mock_log):
     args, kwargs = mock_log.call_args
     assert kwargs["source"] == "http"
     assert "Not found" in kwargs["error"]
+
+
+@pytest.mark.asyncio
+async def test_error_responses_log_off_the_event_loop():
+    request = make_post_request({"some": "input"})
+    threads = []
+
+    def record(**kwargs):
+        threads.append(threading.current_thread().name)
+
+    with patch("app.exceptions.log_request", side_effect=record):
+        response = await handle_http_exception(
+            request, HTTPException(status_code=401, detail="Missing token")
+        )
+
+    assert response.status_code == 401
+    assert threads and threads[0].startswith("io")
+
+
+@pytest.mark.asyncio
+async def test_error_responses_drop_log_rows_when_io_pool_is_full():
+    executor = BoundedExecutor("io", workers=1, queue_size=0)
+    release = threading.Event()
+    blocker = executor.submit(release.wait)
+    dropped = log_writer.stats()["dropped"]
+    try:
+        with patch("app.exceptions.io_executor", executor), patch(
+            "app.exceptions.log_request"
+        ) as mock_log:
+            response = await handle_validation_error(
+                make_post_request({}),
+                RequestValidationError(errors=[{"loc": ["body"], "msg": "bad"}]),
+            )
+    finally:
+        release.set()
+        blocker.result(timeout=5)
+        executor.shutdown()
+
+    assert response.status_code == 422
+    mock_log.assert_not_called()
+    assert log_writer.stats()["dropped"] == dropped + 1
@@ -0,0 +1,136 @@
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.batcher import InferenceBatcher
+from app.executors import BoundedExecutor, Overloaded
+from app.logger import log_writer
+from app.main import app, log_off_loop
+from app.metrics import metrics_router
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def valid_input():
+    return {
+        "sepal_length": 5.1,
+        "sepal_width": 3.5,
+        "petal_length": 1.4,
+        "petal_width": 0.2,
+    }
+
+
+def fill(executor):
+    """Occupy every worker and queue slot until the returned event is set."""
+    release = threading.Event()
+    futures = [
+        executor.submit(release.wait)
+        for _ in range(executor.workers + executor.queue_size)
+    ]
+    return release, futures
+
+
+def test_rejects_work_beyond_workers_and_queue():
+    executor = BoundedExecutor("test", workers=1, queue_size=1)
+    release, futures = fill(executor)
+    try:
+        with pytest.raises(Overloaded):
+            executor.submit(lambda: None)
+        with pytest.raises(Overloaded):
+            executor.admit()
+    finally:
+        release.set()
+        for future in futures:
+            future.result(timeout=5)
+
+    # Slots are released once tasks finish
+    assert executor.submit(lambda: 42).result(timeout=5) == 42
+    stats = executor.stats()
+    executor.shutdown()
+    assert stats["rejected"] == 2
+    assert stats["completed"] == 3
+    assert stats["queue_depth"] == 0 and stats["running"] == 0
+
+
+def test_run_awaits_without_blocking_loop():
+    executor = BoundedExecutor("test", workers=2, queue_size=0)
+
+    async def main():
+        return await asyncio.gather(
+            executor.run(sum, [1, 2]), executor.run(max, 3, 4)
+        )
+
+    assert asyncio.run(main()) == [3, 4]
+    executor.shutdown()
+
+
+def test_batcher_runs_on_executor():
+    executor = BoundedExecutor("test", workers=1, queue_size=0)
+    batcher = InferenceBatcher(
+        lambda model, rows: [threading.current_thread().name] * len(rows),
+        max_wait_us=0,
+        executor=executor,
+    )
+    name = asyncio.run(batcher.submit([1.0, 2.0, 3.0, 4.0]))
+    executor.shutdown()
+    assert name.startswith("test")
+
+
+@patch("app.main.verify_token")
+def test_predict_returns_503_when_inference_queue_is_full(mock_verify, valid_input):
+    executor = BoundedExecutor("inference", workers=1, queue_size=0)
+    release, futures = fill(executor)
+    try:
+        with patch("app.main.inference_executor", executor), patch(
+            "app.executors.inference_executor", executor
+        ), patch("app.exceptions.log_request") as mock_log:
+            response = client.post("/predict", json=valid_input)
+    finally:
+        release.set()
+        executor.shutdown()
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert "inference queue is full" in response.json()["detail"]
+    assert mock_log.call_args.kwargs["source"] == "overload"
+
+
+@patch("app.main.verify_token")
+def test_full_io_pool_drops_log_rows_without_logging_inline(mock_verify, valid_input):
+    executor = BoundedExecutor("io", workers=1, queue_size=0)
+    release, futures = fill(executor)
+    dropped = log_writer.stats()["dropped"]
+    try:
+        with patch("app.main.io_executor", executor), patch(
+            "app.executors.io_executor", executor
+        ), patch("app.exceptions.io_executor", executor), patch(
+            "app.main.log_request"
+        ) as main_log, patch(
+            "app.exceptions.log_request"
+        ) as handler_log:
+            response = client.post("/predict", json=valid_input)
+            asyncio.run(log_off_loop(request=None, input_data={}, prediction=None))
+    finally:
+        release.set()
+        executor.shutdown()
+
+    assert response.status_code == 503
+    assert "io queue is full" in response.json()["detail"]
+    main_log.assert_not_called()
+    handler_log.assert_not_called()
+    # The 503 and the direct call each dropped their row
+    assert log_writer.stats()["dropped"] == dropped + 2
+
+
+def test_metrics_expose_executor_queues():
+    body = TestClient(metrics_router).get("/metrics").json()
+    assert set(body["executors"]) == {"inference", "io"}
+    assert "queue_depth" in body["executors"]["inference"]
+
+    text = TestClient(metrics_router).get("/metrics/prometheus").text
+    assert 'mlops_executor_queue_depth{executor="inference"}' in text
+    assert 'mlops_executor_rejected_total{executor="io"}' in text
@@ -0,0 +1,118 @@
+import os
+import pickle
+import tempfile
+import numpy as np
+import pytest
+from sklearn.datasets import load_iris
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+from app.fastpath import (
+    ForestPredictor,
+    LinearPredictor,
+    build_fast_path,
+    compile_estimator,
+    load_sklearn_estimator,
+    parity_check,
+)
+
+
+@pytest.fixture(scope="module")
+def iris():
+    data = load_iris()
+    labels = np.array([f"Iris-{data.target_names[t]}" for t in data.target])
+    return data.data, labels
+
+
+class PyfuncLike:
+    """Mimics mlflow's PyFuncModel -> _SklearnModelWrapper nesting."""
+
+    def __init__(self, estimator):
+        self._model_impl = type("Wrapper", (), {"sklearn_model": estimator})()
+        self.metadata = "mlmodel-metadata"
+        self.estimator = estimator
+
+    def predict(self, rows):
+        return self.estimator.predict(rows)
+
+
+def test_logistic_regression_matches_sklearn(iris):
+    X, y = iris
+    model = LogisticRegression(max_iter=500).fit(X, y)
+
+    compiled = compile_estimator(model)
+
+    assert isinstance(compiled, LinearPredictor)
+    assert compiled.predict(X).tolist() == model.predict(X).tolist()
+    assert parity_check(model, compiled)
+
+
+def test_binary_logistic_regression(iris):
+    X, y = iris
+    binary = y == "Iris-setosa"
+    model = LogisticRegression(max_iter=500).fit(X, binary)
+
+    compiled = compile_estimator(model)
+
+    assert compiled.predict(X).tolist() == model.predict(X).tolist()
+
+
+def test_random_forest_matches_sklearn(iris):
+    X, y = iris
+    model = RandomForestClassifier(n_estimators=25, random_state=42).fit(X, y)
+
+    compiled = compile_estimator(model)
+
+    assert isinstance(compiled, ForestPredictor)
+    assert np.allclose(compiled.predict_proba(X), model.predict_proba(X))
+    assert compiled.predict(X).tolist() == model.predict(X).tolist()
+    assert parity_check(model, compiled)
+
+
+def test_large_forest_batches_match_sklearn(iris):
+    X, y = iris
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    batch = np.tile(X, (20, 1))
+
+    compiled = compile_estimator(model)
+
+    assert compiled.predict(batch).tolist() == model.predict(batch).tolist()
+
+
+def test_build_fast_path_unwraps_pyfunc(iris):
+    X, y = iris
+    wrapped = PyfuncLike(LogisticRegression(max_iter=500).fit(X, y))
+
+    fast = build_fast_path(wrapped, rows=X)
+
+    assert isinstance(fast, LinearPredictor)
+    assert fast.metadata == "mlmodel-metadata"
+
+
+def test_build_fast_path_keeps_unsupported_models(iris):
+    X, y = iris
+    model = DecisionTreeClassifier().fit(X, y)
+
+    assert build_fast_path(model) is model
+
+
+def test_build_fast_path_rejects_parity_mismatch(iris):
+    X, y = iris
+    wrapped = PyfuncLike(LogisticRegression(max_iter=500).fit(X, y))
+    wrapped.predict = lambda rows: np.full(len(rows), "wrong")
+
+    assert build_fast_path(wrapped, rows=X) is wrapped
+
+
+def test_load_sklearn_estimator_from_mlmodel_dir(iris):
+    X, y = iris
+    model = LogisticRegression(max_iter=500).fit(X, y)
+    path = tempfile.mkdtemp()
+    with open(os.path.join(path, "model.pkl"), "wb") as f:
+        pickle.dump(model, f)
+    with open(os.path.join(path, "MLmodel"), "w") as f:
+        f.write("flavors:\n  sklearn:\n    pickled_model: model.pkl\n")
+
+    loaded = load_sklearn_estimator(path)
+
+    assert loaded.predict(X).tolist() == model.predict(X).tolist()
@@ -1,6 +1,7 @@
 import pytest
 from fastapi.testclient import TestClient
-from app.health import health_router
+from app.health import HealthMonitor, health_router
+from app.manager import ServedModel
 from unittest.mock import patch
 
 
@@ -8,63 +9,122 @@ client = TestClient(health_router)
 
 
 @pytest.fixture
-def dummy_input():
-    return {
-        "sepal_length": 5.1,
-        "sepal_width": 3.5,
-        "petal_length": 1.4,
-        "petal_width": 0.2,
-    }
-
-
-@patch("app.health.sqlite3.connect")
-@patch("app.health.predict")
-def test_health_ok(mock_predict, mock_connect, dummy_input):
-    # Mock DB connection and table check
-    mock_conn = mock_connect.return_value
-    mock_cursor = mock_conn.cursor.return_value
-    mock_cursor.fetchone.return_value = ("logs",)
-
-    # Mock model prediction
-    mock_predict.return_value = "setosa"
+def monitor():
+    # Check on every read, nothing is cached between tests
+    monitor = HealthMonitor(interval=0)
+    with patch("app.health.health_monitor", monitor):
+        yield monitor
 
-    response = client.get("/health")
-    assert response.status_code == 200
-    assert response.json() == {
-        "status": "ok",
-        "components": ["sqlite", "model"]
-    }
 
+class StubModel:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
 
-@patch("app.health.sqlite3.connect")
-def test_health_sqlite_failure(mock_connect):
-    # Simulate missing table
-    mock_conn = mock_connect.return_value
-    mock_cursor = mock_conn.cursor.return_value
-    mock_cursor.fetchone.return_value = None
+    def predict(self, rows):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return ["setosa"] * len(rows)
 
-    response = client.get("/health")
-    assert response.status_code == 200
-    body = response.json()
-    assert body["status"] == "error"
-    assert body["component"] == "sqlite"
-    assert "Table 'logs' does not exist" in body["detail"]
 
+@pytest.fixture
+def served():
+    served = ServedModel(StubModel(), "3")
+    with patch("app.health.model_manager.current", served):
+        yield served
 
-@patch("app.health.sqlite3.connect")
-@patch("app.health.predict")
-def test_health_model_failure(mock_predict, mock_connect):
-    # DB is fine
-    mock_conn = mock_connect.return_value
-    mock_cursor = mock_conn.cursor.return_value
-    mock_cursor.fetchone.return_value = ("logs",)
 
-    # Model prediction fails
-    mock_predict.side_effect = ValueError("Model crashed")
+@pytest.fixture
+def sqlite_ok():
+    with patch("app.health.log_sink.read_pool") as mock_pool:
+        mock_conn = mock_pool.connection.return_value.__enter__.return_value
+        mock_conn.execute.return_value.fetchone.return_value = ("logs",)
+        yield mock_conn
 
+
+def test_livez():
+    assert client.get("/livez").json() == {"status": "ok"}
+
+
+def test_health_ok_uses_served_model(monitor, served, sqlite_ok):
     response = client.get("/health")
     assert response.status_code == 200
     body = response.json()
+    assert body["status"] == "ok"
+    assert set(body["components"]) == {"log_sink", "model", "workers"}
+    model = body["components"]["model"]
+    assert model["detail"] == "version 3"
+    assert model["latency_ms"] >= 0 and model["checked_at"]
+    # The loaded model is scored, not the dummy fallback
+    assert served.model.calls == 1
+
+
+def test_health_is_served_from_cache(served, sqlite_ok):
+    monitor = HealthMonitor(interval=60)
+    with patch("app.health.health_monitor", monitor):
+        monitor.run_once()
+        for _ in range(3):
+            assert client.get("/health").json()["status"] == "ok"
+    assert monitor.runs == 1
+    assert served.model.calls == 1
+
+
+def test_health_sqlite_failure(monitor, served, sqlite_ok):
+    # Simulate missing table
+    sqlite_ok.execute.return_value.fetchone.return_value = None
+
+    body = client.get("/health").json()
+    assert body["status"] == "error"
+    assert body["component"] == "log_sink"
+    assert "Table 'logs' does not exist" in body["detail"]
+
+
+def test_health_model_failure(monitor, sqlite_ok):
+    # A real model object that raises, not a patched predict
+    broken = ServedModel(StubModel(ValueError("Model crashed")), "3")
+    with patch("app.health.model_manager.current", broken):
+        body = client.get("/health").json()
     assert body["status"] == "error"
     assert body["component"] == "model"
     assert "Model crashed" in body["detail"]
+
+
+def test_health_without_loaded_model(monitor, sqlite_ok):
+    with patch("app.health.model_manager.current", ServedModel(None, "local")):
+        body = client.get("/health").json()
+    assert body["component"] == "model"
+    assert body["detail"] == "No model is loaded"
+
+
+@patch("app.health.model_warming")
+def test_health_model_warming(mock_warming, monitor, sqlite_ok):
+    mock_warming.is_set.return_value = True
+
+    body = client.get("/health").json()
+    assert body["status"] == "warming"
+    assert body["component"] == "model"
+
+
+def test_readyz(served):
+    assert client.get("/readyz").json() == {"status": "ready"}
+
+
+def test_readyz_not_ready_without_model():
+    with patch("app.health.model_manager.current", None), patch(
+        "app.health.log_writer.accepting", return_value=False
+    ):
+        response = client.get("/readyz")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.json()["detail"] == "model not loaded; log queue full"
+
+
+def test_readyz_waits_for_every_worker(served):
+    with patch("app.health.worker_readiness", return_value=(1, 2)):
+        response = client.get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["detail"] == "1/2 workers ready"
+
+    with patch("app.health.worker_readiness", return_value=(2, 2)):
+        assert client.get("/readyz").json() == {"status": "ready"}
@@ -0,0 +1,113 @@
+import threading
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+from app.instrumentation import (
+    ShardedHistogram,
+    quantile,
+    render_histogram,
+    summarize_window,
+    timed,
+)
+from app.main import app
+
+
+client = TestClient(app)
+
+
+def make_histogram(now=1_000_000.0):
+    histogram = ShardedHistogram("test_seconds", "Test histogram", ["stage"])
+    histogram.clock = lambda: now
+    return histogram
+
+
+def test_observations_from_many_threads_are_merged():
+    histogram = make_histogram()
+
+    def observe():
+        for _ in range(1000):
+            histogram.observe(0.002, "inference")
+
+    threads = [threading.Thread(target=observe) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    counts, total, count = histogram.collect()[("inference",)]
+    assert count == 4000
+    assert sum(counts) == 4000
+    assert abs(total - 8.0) < 1e-6
+
+
+def test_rolling_window_drops_old_slots():
+    histogram = make_histogram(now=1_000_000.0)
+    histogram.observe(0.01, "inference")
+    histogram.clock = lambda: 1_000_000.0 + 120
+    histogram.observe(0.01, "inference")
+
+    assert histogram.collect(60)[("inference",)][2] == 1
+    assert histogram.collect(300)[("inference",)][2] == 2
+    assert histogram.collect()[("inference",)][2] == 2
+
+    [summary] = summarize_window(histogram, 60)
+    assert summary["stage"] == "inference"
+    assert summary["count"] == 1
+    assert 5 <= summary["p50_ms"] <= 10
+
+
+def test_quantile_interpolates_within_bucket():
+    buckets = (1.0, 2.0, float("inf"))
+    assert quantile(buckets, [0, 10, 0], 0.5) == 1.5
+    assert quantile(buckets, [0, 0, 0], 0.5) is None
+
+
+def test_prometheus_histogram_is_cumulative():
+    histogram = make_histogram()
+    histogram.observe(0.0002, "logging")
+    histogram.observe(0.2, "logging")
+
+    lines = render_histogram(histogram)
+    assert "# TYPE test_seconds histogram" in lines
+    assert 'test_seconds_bucket{stage="logging",le="0.00025"} 1' in lines
+    assert 'test_seconds_bucket{stage="logging",le="+Inf"} 2' in lines
+    assert 'test_seconds_count{stage="logging"} 2' in lines
+
+
+def test_timed_records_even_on_error():
+    histogram = make_histogram()
+
+    with patch("app.instrumentation.stage_latency", histogram):
+
+        @timed("inference")
+        def fail():
+            raise ValueError("boom")
+
+        try:
+            fail()
+        except ValueError:
+            pass
+
+    assert histogram.collect()[("inference",)][2] == 1
+
+
+@patch("app.main.verify_token")
+@patch("app.main.log_request")
+def test_predict_is_exposed_in_prometheus_and_rolling_json(mock_log, mock_verify):
+    payload = {
+        "sepal_length": 5.1,
+        "sepal_width": 3.5,
+        "petal_length": 1.4,
+        "petal_width": 0.2,
+    }
+    assert client.post("/predict", json=payload).status_code == 200
+
+    text = client.get("/metrics/prometheus").text
+    assert 'mlops_stage_latency_seconds_count{stage="inference"}' in text
+    assert 'mlops_stage_latency_seconds_count{stage="validation"}' in text
+    assert 'route="/predict",status="200"' in text
+    assert "mlops_log_queue_depth" in text
+
+    windows = client.get("/metrics/latency").json()["windows"]
+    assert set(windows) == {"1m", "5m", "1h"}
+    routes = {entry["route"] for entry in windows["1m"]["requests"]}
+    assert "/predict" in routes
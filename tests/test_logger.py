@@ -1,7 +1,11 @@
 import json
+import os
+import sqlite3
+import tempfile
+import threading
 import pytest
-from unittest.mock import patch, MagicMock
-from app.logger import log_request
+from unittest.mock import patch
+from app.logger import log_request, LogWriter
 
 
 class DummyRequest:
@@ -10,13 +14,34 @@ class DummyRequest:
         self.url = url
 
 
-@patch("app.logger.sqlite3.connect")
-def test_log_request_success(mock_connect):
-    mock_conn = MagicMock()
-    mock_cursor = MagicMock()
-    mock_connect.return_value = mock_conn
-    mock_conn.cursor.return_value = mock_cursor
+def make_row(status="success"):
+    return (
+        "2025-08-11 12:00:00",
+        "POST",
+        "http://localhost/predict",
+        json.dumps({"sepal_length": 5.1}),
+        json.dumps("setosa"),
+        status,
+        None,
+        "prediction",
+        None,
+        "Staging",
+        "iris_classifier",
+        "LOCAL",
+        "1",
+    )
+
+
+@pytest.fixture
+def db_path():
+    tmpdir = tempfile.mkdtemp()
+    yield os.path.join(tmpdir, "logs.db")
+
 
+@patch("app.logger.model_manager")
+@patch("app.logger.log_writer")
+def test_log_request_success(mock_writer, mock_manager):
+    mock_manager.version.return_value = "7"
     request = DummyRequest()
     input_data = {"sepal_length": 5.1}
     prediction = {"class": "setosa"}
@@ -31,26 +56,99 @@ def test_log_request_success(mock_connect):
         details=None,
     )
 
-    mock_connect.assert_called_once_with("logs/logs.db")
-    mock_cursor.execute.assert_called_once()
-
-    # Validate SQL args
-    args = mock_cursor.execute.call_args[0][1]
-    assert args[0] == "POST"
-    assert args[1] == "http://localhost/predict"
-    assert json.loads(args[2]) == input_data
-    assert json.loads(args[3]) == prediction
-    assert args[4] == "success"
-    assert args[5] is None
-    assert args[6] == "prediction"
-    assert args[7] is None
-
-    # Config values
-    from app.config import MODEL_STAGE, MODEL_NAME, MODEL_SOURCE, MODEL_VERSION
-    assert args[8] == MODEL_STAGE
-    assert args[9] == MODEL_NAME
-    assert args[10] == MODEL_SOURCE
-    assert args[11] == MODEL_VERSION
-
-    mock_conn.commit.assert_called_once()
-    mock_conn.close.assert_called_once()
+    mock_writer.submit.assert_called_once()
+
+    # Validate queued row
+    row = mock_writer.submit.call_args[0][0]
+    assert row[1] == "POST"
+    assert row[2] == "http://localhost/predict"
+    assert json.loads(row[3]) == input_data
+    assert json.loads(row[4]) == prediction
+    assert row[5] == "success"
+    assert row[6] is None
+    assert row[7] == "prediction"
+    assert row[8] is None
+
+    # Config values and the version being served
+    from app.config import MODEL_STAGE, MODEL_NAME, MODEL_SOURCE
+    assert row[9] == MODEL_STAGE
+    assert row[10] == MODEL_NAME
+    assert row[11] == MODEL_SOURCE
+    assert row[12] == "7"
+
+
+@patch("app.logger.log_writer")
+def test_log_request_explicit_model_version(mock_writer):
+    log_request(DummyRequest(), {}, "setosa", model_version="3")
+    assert mock_writer.submit.call_args[0][0][12] == "3"
+
+
+def test_writer_batches_rows(db_path):
+    writer = LogWriter(db_path=db_path, batch_size=10, flush_interval=0.01)
+    for _ in range(25):
+        writer.submit(make_row())
+    writer.stop()
+
+    # Rows land in the daily partition of their timestamp
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM logs_20250811").fetchone()[0] == 25
+    assert writer.stats()["written"] == 25
+    assert writer.stats()["queue_depth"] == 0
+
+
+def test_writer_drop_policy_counts_rows(db_path):
+    writer = LogWriter(db_path=db_path, queue_size=2, backpressure="drop")
+    # Keep the writer thread from draining the queue
+    with patch.object(writer, "start"):
+        results = [writer.submit(make_row()) for _ in range(5)]
+
+    assert results == [True, True, False, False, False]
+    assert writer.stats()["dropped"] == 3
+    assert writer.stats()["queue_depth"] == 2
+
+
+def test_writer_spill_policy_writes_file(db_path):
+    spill_path = db_path + ".spill.jsonl"
+    writer = LogWriter(
+        db_path=db_path, queue_size=1, backpressure="spill", spill_path=spill_path
+    )
+    with patch.object(writer, "start"):
+        writer.submit(make_row())
+        writer.submit(make_row(status="error"))
+
+    assert writer.stats()["spilled"] == 1
+    with open(spill_path) as f:
+        spilled = [json.loads(line) for line in f]
+    assert spilled[0]["status"] == "error"
+
+
+def test_spill_file_is_written_outside_the_counter_lock(db_path):
+    writer = LogWriter(
+        db_path=db_path,
+        queue_size=1,
+        backpressure="spill",
+        spill_path=db_path + ".spill.jsonl",
+    )
+    with patch.object(writer, "start"):
+        writer.submit(make_row())
+        # A slow spill: the file write waits while another thread holds it
+        with writer._spill_lock:
+            spiller = threading.Thread(target=writer.submit, args=(make_row(),))
+            spiller.start()
+            spiller.join(0.1)
+            assert spiller.is_alive()
+            # Counters stay available to request threads meanwhile
+            assert writer._lock.acquire(timeout=1)
+            writer._lock.release()
+        spiller.join(5)
+
+    assert writer.stats()["spilled"] == 1
+
+
+def test_writer_without_partitioning_uses_logs_table(db_path):
+    writer = LogWriter(db_path=db_path, flush_interval=0.01, partitioning="none")
+    writer.submit(make_row())
+    writer.stop()
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0] == 1
@@ -1,6 +1,10 @@
+import threading
+import time
+
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
+from app.manager import ModelManager, ServedModel
 from unittest.mock import patch
 
 
@@ -23,7 +27,7 @@ def valid_input():
 
 @patch("app.main.verify_token")
 @patch("app.main.predict")
-@patch("app.main.load_model")
+@patch("app.manager.load_model")
 def test_predict_success(mock_load_model, mock_predict, mock_verify_token, valid_input):
     mock_verify_token.return_value = None
     mock_predict.return_value = "setosa"
@@ -36,7 +40,7 @@ def test_predict_success(mock_load_model, mock_predict, mock_verify_token, valid
 
 @patch("app.main.verify_token")
 @patch("app.main.predict")
-@patch("app.main.load_model")
+@patch("app.manager.load_model")
 def test_predict_failure(mock_load_model, mock_predict, mock_verify_token, valid_input):
     mock_verify_token.return_value = None
     mock_predict.side_effect = ValueError("Model error")
@@ -60,3 +64,97 @@ def test_predict_validation_error():
     assert response.status_code == 422
     assert "Input should be a valid number" in response.text
 
+
+@patch("app.main.verify_token")
+@patch("app.main.PREDICT_BATCHING", True)
+@patch("app.main.batcher.predict_fn")
+def test_predict_batched(mock_predict_batch, mock_verify_token, valid_input):
+    mock_verify_token.return_value = None
+    mock_predict_batch.return_value = ["setosa"]
+    served = ServedModel(object(), "7")
+
+    with patch("app.main.model_manager.current", served):
+        response = client.post("/predict", json=valid_input)
+
+    assert response.status_code == 200
+    assert response.json() == {"prediction": "setosa"}
+    # The batch is scored by the model the request read
+    model, rows = mock_predict_batch.call_args[0]
+    assert model is served.model
+    assert rows.tolist() == [list(valid_input.values())]
+
+
+@patch("app.main.verify_token")
+@patch("app.main.log_request")
+@patch("app.main.predict_batch")
+def test_predict_batch_columnar(
+    mock_predict_batch, mock_log, mock_verify_token, valid_input
+):
+    mock_predict_batch.return_value = ["setosa", "setosa"]
+    payload = {key: [value, value] for key, value in valid_input.items()}
+
+    response = client.post("/predict/batch", json=payload)
+
+    assert response.status_code == 200
+    assert response.json() == {"predictions": ["setosa", "setosa"]}
+    mock_log.assert_called_once()
+    kwargs = mock_log.call_args.kwargs
+    assert kwargs["source"] == "batch"
+    assert kwargs["input_data"]["rows"] == 2
+    assert kwargs["prediction"] == {"setosa": 2}
+
+
+@patch("app.main.verify_token")
+@patch("app.main.log_request")
+@patch("app.main.predict_batch")
+def test_predict_batch_streamed(
+    mock_predict_batch, mock_log, mock_verify_token, valid_input
+):
+    mock_predict_batch.return_value = ["setosa"] * 3
+
+    response = client.post("/predict/batch?stream=true", json=[valid_input] * 3)
+
+    assert response.status_code == 200
+    assert response.json() == {"predictions": ["setosa"] * 3}
+
+
+@patch("app.main.verify_token")
+@patch("app.main.log_request")
+def test_predict_batch_validation_error(mock_log, mock_verify_token, valid_input):
+    response = client.post("/predict/batch", json=[{"sepal_length": 1.0}])
+
+    assert response.status_code == 422
+    assert "Missing field" in response.json()["detail"]
+    assert mock_log.call_args.kwargs["source"] == "batch_validation"
+
+
+@patch("app.main.verify_token")
+@patch("app.main.log_request")
+def test_predict_while_warming(mock_log, mock_verify_token, valid_input):
+    warming = threading.Event()
+    warming.set()
+    with patch("app.main.model_warming", warming):
+        response = client.post("/predict", json=valid_input)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+@patch("app.main.mark_worker_ready")
+@patch("app.manager.load_model", return_value=None)
+def test_background_load(mock_load_model, mock_ready):
+    warming = threading.Event()
+    warming.set()
+    manager = ModelManager(poll_interval=0)
+    with patch("app.main.model_warming", warming), patch(
+        "app.main.model_manager", manager
+    ):
+        with TestClient(app):
+            # Startup does not wait for the model
+            for _ in range(100):
+                if not warming.is_set():
+                    break
+                time.sleep(0.01)
+            assert not warming.is_set()
+            assert manager.current is not None
+            mock_ready.assert_called_once()
@@ -0,0 +1,160 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.admin import admin_router
+from app.manager import ModelLoadError, ModelManager
+
+admin_app = FastAPI()
+admin_app.include_router(admin_router)
+client = TestClient(admin_app)
+
+
+class VersionedModel:
+    def __init__(self, name, run_id=None, fail=False):
+        self.metadata = SimpleNamespace(model_uuid=f"uuid-{name}", run_id=run_id)
+        self.name = name
+        self.fail = fail
+
+    def predict(self, rows):
+        if self.fail:
+            raise ValueError("broken model")
+        return [self.name for _ in rows]
+
+
+@pytest.fixture
+def manager():
+    with patch("app.manager.MODEL_SOURCE", "REMOTE"), patch(
+        "app.manager.MODEL_VERSION", None
+    ):
+        yield ModelManager(poll_interval=0)
+
+
+def test_load_swaps_and_keeps_previous(manager):
+    with patch("app.manager.load_model", side_effect=[VersionedModel("a")]):
+        manager.load("1")
+    in_flight = manager.current
+
+    with patch("app.manager.load_model", side_effect=[VersionedModel("b")]):
+        manager.load("2")
+
+    # A request holding the old reference still uses the old model
+    assert in_flight.model.predict([[0]]) == ["a"]
+    assert manager.model.name == "b"
+    assert manager.version() == "2"
+    assert manager.previous is in_flight
+    assert manager.swaps == 1
+
+
+def test_failed_reload_keeps_serving(manager):
+    with patch("app.manager.load_model", side_effect=[VersionedModel("a")]):
+        manager.load("1")
+
+    broken = VersionedModel("b", fail=True)
+    with patch("app.manager.load_model", side_effect=[broken]):
+        with pytest.raises(ModelLoadError):
+            manager.load("2")
+
+    assert manager.model.name == "a"
+    assert manager.status()["last_error"] == "broken model"
+
+
+def test_reload_does_not_fall_back_when_registry_is_down(manager):
+    with patch("app.manager.load_model", side_effect=[VersionedModel("a")]):
+        manager.load("1")
+
+    local = VersionedModel("local")
+    with patch("app.model.MODEL_SOURCE", "REMOTE"), patch(
+        "app.model.load_cached_model", return_value=None
+    ), patch("app.model.import_mlflow", side_effect=OSError("unreachable")), patch(
+        "app.model.load_local_model", return_value=local
+    ) as load_local:
+        with pytest.raises(ModelLoadError, match="from the registry"):
+            manager.load("5")
+        # The initial load may still fall back to the local model
+        assert ModelManager(poll_interval=0).load().model.name == "local"
+
+    assert load_local.call_count == 1
+    assert manager.model.name == "a"
+    assert manager.version() == "1"
+
+
+def test_rollback_pauses_polling(manager):
+    with patch("app.manager.load_model", side_effect=[VersionedModel("a")]):
+        manager.load("1")
+    with pytest.raises(ValueError):
+        manager.rollback()
+
+    with patch("app.manager.load_model", side_effect=[VersionedModel("b")]):
+        manager.load("2")
+    manager.rollback()
+
+    assert manager.version() == "1"
+    assert manager.auto_update is False
+    assert manager.check_for_update() is False
+
+
+def test_stage_update_reloads_new_version(manager):
+    with patch("app.manager.load_model", return_value=VersionedModel("a", "run-a")):
+        with patch("app.manager.MODEL_STAGE", "Staging"):
+            manager.load()
+    assert manager.version() == "Staging"
+
+    # Same run as the one loaded by stage name: only the label is filled in
+    with patch("app.manager.registry_version", return_value=("4", "run-a")):
+        assert manager.check_for_update() is False
+    assert manager.version() == "4"
+
+    new = VersionedModel("b", "run-b")
+    with patch("app.manager.registry_version", return_value=("5", "run-b")), patch(
+        "app.manager.load_model", return_value=new
+    ) as load:
+        assert manager.check_for_update() is True
+    load.assert_called_once_with("5", fallback=False)
+    assert manager.version() == "5"
+
+
+def test_local_model_change_triggers_reload():
+    with patch("app.manager.MODEL_SOURCE", "LOCAL"):
+        manager = ModelManager(poll_interval=0)
+        with patch("app.manager.local_fingerprint", return_value=1), patch(
+            "app.manager.load_model", return_value=VersionedModel("a")
+        ):
+            manager.load()
+            assert manager.check_for_update() is False
+        assert manager.version() == "local-uuid-a"
+
+        with patch("app.manager.local_fingerprint", return_value=2), patch(
+            "app.manager.load_model", return_value=VersionedModel("b")
+        ):
+            assert manager.check_for_update() is True
+        assert manager.model.name == "b"
+
+
+@patch("app.admin.verify_token")
+def test_admin_reload_and_rollback(mock_verify_token, manager):
+    with patch("app.admin.model_manager", manager), patch(
+        "app.manager.load_model", side_effect=[VersionedModel("a"), VersionedModel("b")]
+    ):
+        assert client.post("/admin/model/reload?version=1").status_code == 200
+        response = client.post("/admin/model/reload?version=2")
+        assert response.json()["current"]["version"] == "2"
+
+        response = client.post("/admin/model/rollback")
+        assert response.status_code == 200
+        assert response.json()["current"]["version"] == "1"
+        assert response.json()["auto_update"] is False
+
+
+@patch("app.admin.verify_token")
+def test_admin_reload_failure(mock_verify_token, manager):
+    broken = VersionedModel("a", fail=True)
+    with patch("app.admin.model_manager", manager), patch(
+        "app.manager.load_model", return_value=broken
+    ):
+        response = client.post("/admin/model/reload?version=1")
+
+    assert response.status_code == 500
+    assert "broken model" in response.json()["detail"]
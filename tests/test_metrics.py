@@ -1,56 +1,46 @@
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
+from app.logger import SQLiteSink, ensure_schema, INSERT_LOG
 from app.metrics import metrics_router
+from app.storage import connect
 
 
 client = TestClient(metrics_router)
 
 
-def mock_cursor_sequence():
-    """Returns a cursor with sequential fetchone/fetchall behavior."""
-    cursor = MagicMock()
-    cursor.execute = MagicMock()
-
-    # Simulate sequential results
-    cursor.fetchone.side_effect = [
-        [100],  # total
-        [80],   # success
-        [20],   # error
-    ]
-    cursor.fetchall.return_value = [
-        {
-            "id": 1,
-            "timestamp": "2025-08-11T12:00:00",
-            "method": "POST",
-            "url": "/predict",
-            "status": "success",
-            "source": "api",
-        }
-    ]
-    return cursor
-
-
-@patch("app.metrics.conn")
-def test_metrics_no_filters(mock_conn):
-    mock_cursor = MagicMock()
-    mock_cursor.fetchone.side_effect = [
-        [100],  # total
-        [80],   # success
-        [20],   # error
-    ]
-    mock_cursor.fetchall.return_value = [
-        {
-            "id": 1,
-            "timestamp": "2025-08-11T12:00:00",
-            "method": "POST",
-            "url": "/predict",
-            "status": "success",
-            "source": "api",
-        }
-    ]
-    mock_conn.execute.return_value = mock_cursor
+def make_row(status, source):
+    return (
+        "2025-08-11 12:00:00",
+        "POST",
+        "/predict",
+        "{}",
+        "null",
+        status,
+        None,
+        source,
+        None,
+        "Staging",
+        "iris_classifier",
+        "LOCAL",
+        "1",
+    )
 
+
+@pytest.fixture
+def metrics_db(tmp_path):
+    """Log store with 80 successes from 'api' and 20 errors from 'cli'."""
+    db_path = str(tmp_path / "logs.db")
+    db = connect(db_path)
+    ensure_schema(db)
+    rows = [make_row("success", "api")] * 80 + [make_row("error", "cli")] * 20
+    with db:
+        db.executemany(INSERT_LOG, rows)
+    with patch("app.metrics.log_sink", SQLiteSink(db_path)):
+        yield db
+
+
+def test_metrics_no_filters(metrics_db):
     response = client.get("/metrics")
     assert response.status_code == 200
     body = response.json()
@@ -62,42 +52,61 @@ def test_metrics_no_filters(mock_conn):
     assert body["offset"] == 0
     assert body["status_filter"] is None
     assert body["source_filter"] is None
-    assert len(body["logs"]) == 1
-    assert body["logs"][0]["status"] == "success"
-
-
-@patch("app.metrics.conn")
-def test_metrics_with_filters(mock_conn):
-    mock_cursor = MagicMock()
-    mock_cursor.fetchone.side_effect = [
-        [50],  # total
-        [30],  # success
-        [20],  # error
-    ]
-    mock_cursor.fetchall.return_value = [
-        {
-            "id": 2,
-            "timestamp": "2025-08-11T13:00:00",
-            "method": "POST",
-            "url": "/predict",
-            "status": "error",
-            "source": "cli",
-        }
-    ]
-    mock_conn.execute.return_value = mock_cursor
+    assert len(body["logs"]) == 25
+    assert body["logs"][0]["id"] == 100
+    assert body["logs"][0]["status"] == "error"
+    assert body["next_cursor"] == 76
+
 
+def test_metrics_with_filters(metrics_db):
     response = client.get("/metrics?status=error&source=cli&limit=10&offset=5")
     assert response.status_code == 200
     body = response.json()
 
-    assert body["total_requests"] == 50
-    assert body["success_count"] == 30
+    assert body["total_requests"] == 100
+    assert body["success_count"] == 80
     assert body["error_count"] == 20
     assert body["limit"] == 10
     assert body["offset"] == 5
     assert body["status_filter"] == "error"
     assert body["source_filter"] == "cli"
-    assert len(body["logs"]) == 1
-    assert body["logs"][0]["source"] == "cli"
-    assert body["logs"][0]["status"] == "error"
+    assert len(body["logs"]) == 10
+    assert body["logs"][0]["id"] == 95
+    assert all(log["source"] == "cli" for log in body["logs"])
+    assert all(log["status"] == "error" for log in body["logs"])
+
+
+def test_metrics_keyset_pagination(metrics_db):
+    first = client.get("/metrics?status=error&limit=15").json()
+    second = client.get(f"/metrics?status=error&limit=15&cursor={first['next_cursor']}")
+    body = second.json()
 
+    assert [log["id"] for log in body["logs"]] == list(range(85, 80, -1))
+    assert body["next_cursor"] is None
+
+
+def test_counters_follow_deletes_and_backfill(metrics_db):
+    with metrics_db:
+        metrics_db.execute("DELETE FROM logs WHERE status = 'error'")
+    body = client.get("/metrics").json()
+    assert body["total_requests"] == 80
+    assert body["error_count"] == 0
+
+    # Rebuilding the counters table backfills from existing rows
+    with metrics_db:
+        metrics_db.execute("DROP TABLE log_counters")
+    ensure_schema(metrics_db)
+    body = client.get("/metrics").json()
+    assert body["total_requests"] == 80
+    assert body["success_count"] == 80
+
+
+def test_shadow_rows_are_not_counted_as_requests(metrics_db):
+    rows = [make_row("agree", "shadow")] * 3 + [make_row("disagree", "shadow")]
+    with metrics_db:
+        metrics_db.executemany(INSERT_LOG, rows)
+
+    body = client.get("/metrics").json()
+    assert body["total_requests"] == 100
+    assert body["success_count"] == 80
+    assert "shadow" in body and "canary" in body
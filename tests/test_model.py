@@ -0,0 +1,142 @@
+import os
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from app.model import (
+    MISSING,
+    PredictionCache,
+    download_model,
+    load_cached_model,
+    model_identity,
+    predict,
+    resolve_model,
+)
+
+
+class CountingModel:
+    def __init__(self, uuid="uuid-1"):
+        self.metadata = SimpleNamespace(model_uuid=uuid)
+        self.calls = 0
+
+    def predict(self, rows):
+        self.calls += 1
+        return ["setosa" for _ in rows]
+
+
+@pytest.fixture
+def features():
+    return {
+        "sepal_length": 5.1,
+        "sepal_width": 3.5,
+        "petal_length": 1.4,
+        "petal_width": 0.2,
+    }
+
+
+def test_cache_hit_skips_inference(features):
+    model = CountingModel()
+    with patch("app.model.prediction_cache", PredictionCache(max_entries=10)):
+        assert predict(model, features) == "setosa"
+        assert predict(model, dict(features)) == "setosa"
+        assert predict(model, features, use_cache=False) == "setosa"
+
+    assert model.calls == 2
+
+
+def test_keys_are_canonical_floats():
+    cache = PredictionCache(max_entries=10)
+    model = CountingModel()
+
+    assert cache.key(model, [5, -0.0, 1, 0]) == cache.key(model, [5.0, 0.0, 1.0, 0.0])
+    assert cache.key(model, [5.0, 0.0, 1.0, 0.0]) != cache.key(model, [5.0, 0, 1, 1])
+
+
+def test_lru_eviction_is_bounded():
+    cache = PredictionCache(max_entries=2)
+    model = CountingModel()
+    keys = [cache.key(model, [float(i)] * 4) for i in range(3)]
+
+    cache.put(keys[0], "a")
+    cache.put(keys[1], "b")
+    cache.get(keys[0])  # keys[1] is now least recently used
+    cache.put(keys[2], "c")
+
+    assert cache.get(keys[1]) is MISSING
+    assert cache.get(keys[0]) == "a"
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 2
+
+
+def test_entries_expire_after_ttl():
+    cache = PredictionCache(max_entries=10, ttl=30)
+    model = CountingModel()
+    key = cache.key(model, [1.0] * 4)
+
+    with patch("app.model.time.monotonic", return_value=1000.0):
+        cache.put(key, "a")
+    with patch("app.model.time.monotonic", return_value=1031.0):
+        assert cache.get(key) is MISSING
+
+    assert cache.stats()["expirations"] == 1
+
+
+def test_model_change_invalidates_cache():
+    cache = PredictionCache(max_entries=10)
+    old_model, new_model = CountingModel("uuid-1"), CountingModel("uuid-2")
+    old_key = cache.key(old_model, [1.0] * 4)
+    cache.put(old_key, "a")
+
+    new_key = cache.key(new_model, [1.0] * 4)
+
+    assert new_key != old_key
+    assert cache.get(new_key) is MISSING
+    assert cache.stats()["size"] == 0
+    assert cache.stats()["invalidations"] == 1
+    # A late write for the old model is ignored
+    cache.put(old_key, "a")
+    assert cache.stats()["size"] == 0
+
+
+def test_disabled_cache_and_model_identity():
+    assert PredictionCache(max_entries=0).key(CountingModel(), [1.0]) is None
+    assert model_identity(CountingModel("abc")) == "abc"
+    assert model_identity(None) is None
+
+
+def test_fresh_cached_artifact_skips_registry():
+    with patch("app.model.MODEL_SOURCE", "REMOTE"), patch(
+        "app.model.MODEL_NAME", "iris_classifier"
+    ), patch("app.model.MODEL_VERSION", "3"), patch(
+        "app.model.load_cached_model", return_value="cached"
+    ) as cached, patch("app.model.import_mlflow") as mlflow:
+        assert resolve_model() == "cached"
+    # Pinned versions never expire
+    cached.assert_called_once_with("models:/iris_classifier/3", None)
+    mlflow.assert_not_called()
+
+
+def test_download_model_populates_cache(tmp_path):
+    def download_artifacts(artifact_uri, dst_path):
+        local = tmp_path / "cache" / dst_path.split("/")[-1] / "model"
+        local.mkdir()
+        (local / "MLmodel").write_text("flavors: {}\n")
+        return str(local)
+
+    mlflow = SimpleNamespace(
+        artifacts=SimpleNamespace(download_artifacts=download_artifacts),
+        pyfunc=SimpleNamespace(load_model=lambda path: f"model@{path}"),
+    )
+    cache_dir = str(tmp_path / "cache")
+    with patch("app.model.MODEL_CACHE_DIR", cache_dir), patch(
+        "app.model.import_mlflow", return_value=mlflow
+    ):
+        path = download_model("models:/iris_classifier/Production")
+        assert path == os.path.join(cache_dir, "iris_classifier--Production")
+        assert os.listdir(cache_dir) == ["iris_classifier--Production"]
+
+        uri = "models:/iris_classifier/Production"
+        assert load_cached_model(uri, max_age=60) == f"model@{path}"
+        # Older than max_age: the stage has to be resolved again
+        os.utime(os.path.join(path, ".downloaded"), (0, 0))
+        assert load_cached_model(uri, max_age=60) is None
+        assert load_cached_model(uri, max_age=None) == f"model@{path}"
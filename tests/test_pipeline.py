@@ -0,0 +1,173 @@
+import os
+from argparse import Namespace
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import pytest
+
+from src.pipeline import HashState, Stage, build_stages, main, run_pipeline
+from src.preprocess_data import preprocess, split_files
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "input.txt").write_text("a,b\n1,2\n")
+    (tmp_path / "stage.py").write_text("# stage code\n")
+    return tmp_path
+
+
+def copy_stage(params=None):
+    def run(key):
+        with open("input.txt") as src, open("output.txt", "w") as dst:
+            dst.write(src.read().upper())
+
+    return Stage(
+        "copy",
+        deps=["input.txt"],
+        code=["stage.py"],
+        outs=["output.txt"],
+        params=params or {"upper": True},
+        run=MagicMock(side_effect=run),
+    )
+
+
+def test_second_run_is_skipped(workdir):
+    stage = copy_stage()
+    assert run_pipeline([stage]) == {"copy": "ran"}
+    assert run_pipeline([stage]) == {"copy": "skipped"}
+    assert stage.run.call_count == 1
+    assert (workdir / "output.txt").read_text() == "A,B\n1,2\n"
+
+
+def test_changed_input_code_or_params_reruns(workdir):
+    stage = copy_stage()
+    run_pipeline([stage])
+
+    (workdir / "input.txt").write_text("c,d\n3,4\n")
+    assert run_pipeline([stage]) == {"copy": "ran"}
+    (workdir / "stage.py").write_text("# changed\n")
+    assert run_pipeline([stage]) == {"copy": "ran"}
+    assert run_pipeline([copy_stage({"upper": False})]) == {"copy": "ran"}
+    assert (workdir / "output.txt").read_text() == "C,D\n3,4\n"
+
+
+def test_reverted_input_restores_cached_output(workdir):
+    stage = copy_stage()
+    run_pipeline([stage])
+    (workdir / "input.txt").write_text("c,d\n")
+    run_pipeline([stage])
+
+    (workdir / "input.txt").write_text("a,b\n1,2\n")
+    assert run_pipeline([stage]) == {"copy": "restored"}
+    assert stage.run.call_count == 2
+    assert (workdir / "output.txt").read_text() == "A,B\n1,2\n"
+
+
+def test_deleted_output_is_restored(workdir):
+    stage = copy_stage()
+    run_pipeline([stage])
+    os.remove(workdir / "output.txt")
+
+    assert run_pipeline([stage]) == {"copy": "restored"}
+    assert stage.run.call_count == 1
+    assert (workdir / "output.txt").exists()
+
+
+def test_force_and_dry_run(workdir):
+    stage = copy_stage()
+    assert run_pipeline([stage], dry_run=True) == {"copy": "stale"}
+    assert stage.run.call_count == 0
+
+    run_pipeline([stage])
+    assert run_pipeline([stage], force=["copy"]) == {"copy": "ran"}
+    assert stage.run.call_count == 2
+
+
+def test_restore_hook_reuses_earlier_run(workdir):
+    stage = copy_stage()
+
+    def restore(key):
+        (workdir / "output.txt").write_text("from mlflow")
+        return True
+
+    stage.restore = restore
+    assert run_pipeline([stage]) == {"copy": "reused"}
+    stage.run.assert_not_called()
+    assert run_pipeline([stage]) == {"copy": "skipped"}
+
+
+def test_missing_input_uses_dvc_md5(workdir):
+    stage = copy_stage()
+    run_pipeline([stage])
+    before = HashState(".pipeline/state.json").md5("input.txt")
+
+    # Input not pulled yet, only its .dvc pointer is in the workspace
+    os.remove(workdir / "input.txt")
+    (workdir / "input.txt.dvc").write_text(
+        f"outs:\n- md5: {before}\n  size: 8\n  hash: md5\n  path: input.txt\n"
+    )
+    assert run_pipeline([stage]) == {"copy": "skipped"}
+
+
+def test_missing_input_without_dvc_fails(workdir):
+    os.remove(workdir / "input.txt")
+    with pytest.raises(FileNotFoundError):
+        run_pipeline([copy_stage()])
+
+
+def test_unchanged_files_are_not_rehashed(workdir):
+    state = HashState(".pipeline/state.json")
+    digest = state.md5("input.txt")
+    state.save()
+
+    with patch("src.pipeline.file_md5") as file_md5:
+        assert HashState(".pipeline/state.json").md5("input.txt") == digest
+    file_md5.assert_not_called()
+
+
+def test_preprocess_writes_splits(tmp_path):
+    paths = preprocess("data/raw/iris.csv", tmp_path, test_size=0.2)
+    assert [p.name for p in paths] == split_files()
+    assert len(pd.read_csv(tmp_path / "X_test.csv")) == 30
+    assert list(pd.read_csv(tmp_path / "y_train.csv").columns) == ["label"]
+
+
+def test_pipeline_skips_preprocess_and_training(tmp_path):
+    data_dir = tmp_path / "processed"
+    output_dir = tmp_path / "artifacts"
+
+    def train(args):
+        assert args.pipeline_fingerprint
+        os.makedirs(os.path.join(args.output_dir, args.model_name), exist_ok=True)
+
+    argv = [
+        "--mlflow-uri", "http://dummy-uri",
+        "--data-dir", str(data_dir),
+        "--output-dir", str(output_dir),
+        "--cache-dir", str(tmp_path / ".pipeline"),
+    ]
+    with patch("src.model_train.train_and_register", side_effect=train) as trained, \
+            patch("src.pipeline.find_mlflow_model", return_value=False):
+        assert main(argv) == {"preprocess": "ran", "train": "ran"}
+        assert main(argv) == {"preprocess": "skipped", "train": "skipped"}
+        assert main(argv + ["--scale"]) == {"preprocess": "skipped", "train": "ran"}
+    assert trained.call_count == 2
+
+
+def test_build_stages_tracks_search_space(tmp_path):
+    args = Namespace(
+        data_dir="data/processed",
+        output_dir="artifacts",
+        model_name="iris_classifier",
+        search_space="space.json",
+        format="parquet",
+        test_size=0.2,
+        random_state=42,
+    )
+    _, train = build_stages(args)
+    assert train.deps[-1] == "space.json"
+    assert "data/processed/X_train.parquet" in train.deps
+    assert train.outs == [os.path.join("artifacts", "iris_classifier")]
+    # A schema format change retrains the model it is saved with
+    assert "app/schema.py" in train.code
@@ -0,0 +1,129 @@
+import threading
+import time
+
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.pool import ModelPool, check_model_ref
+
+
+class SizedModel:
+    def __init__(self, name, size):
+        self.name = name
+        self.payload = b"x" * size
+
+    def predict(self, rows):
+        return [self.name for _ in rows]
+
+
+class CountingLoader:
+    def __init__(self, size=1000, delay=0.0, fail=False):
+        self.size = size
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+
+    def __call__(self, name, version):
+        self.calls.append((name, version))
+        time.sleep(self.delay)
+        if self.fail:
+            raise FileNotFoundError(f"{name}/{version} not found")
+        return SizedModel(f"{name}:{version}", self.size)
+
+
+def test_loads_lazily_and_reuses():
+    loader = CountingLoader()
+    pool = ModelPool(max_bytes=10_000, loader=loader)
+
+    assert pool.stats()["models"] == []
+    first = pool.get("random_forest_classifier", "1")
+    assert pool.get("random_forest_classifier", "1") is first
+    assert loader.calls == [("random_forest_classifier", "1")]
+    assert pool.stats()["hits"] == 1
+
+
+def test_evicts_least_recently_used_over_budget():
+    # Each model pickles to a bit over 1000 bytes, the budget fits two
+    pool = ModelPool(max_bytes=2500, loader=CountingLoader(size=1000))
+    pool.get("a", "1")
+    pool.get("b", "1")
+    pool.get("a", "1")  # b is now the coldest
+    pool.get("c", "1")
+
+    loaded = [(m["name"], m["version"]) for m in pool.stats()["models"]]
+    assert loaded == [("a", "1"), ("c", "1")]
+    assert pool.stats()["evictions"] == 1
+
+
+def test_model_larger_than_budget_is_still_served():
+    pool = ModelPool(max_bytes=10, loader=CountingLoader(size=1000))
+    pool.get("a", "1")
+    assert pool.get("b", "1").name == "b:1"
+    assert [m["name"] for m in pool.stats()["models"]] == ["b"]
+
+
+def test_concurrent_requests_share_one_load():
+    loader = CountingLoader(delay=0.1)
+    pool = ModelPool(max_bytes=10_000, loader=loader)
+    results = []
+
+    def request():
+        results.append(pool.get("a", "2"))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loader.calls) == 1
+    assert len(results) == 8 and all(model is results[0] for model in results)
+    assert pool.stats()["shared_loads"] == 7
+
+
+def test_failed_load_is_not_cached():
+    loader = CountingLoader(fail=True)
+    pool = ModelPool(max_bytes=10_000, loader=loader)
+    for _ in range(2):
+        with pytest.raises(FileNotFoundError):
+            pool.get("missing", "1")
+    assert len(loader.calls) == 2
+    assert pool.stats()["load_failures"] == 2
+
+
+def test_check_model_ref():
+    check_model_ref("logistic_regression_classifier", "Production")
+    for name, version in [("../etc", "1"), ("a", "..")]:
+        with pytest.raises(ValueError):
+            check_model_ref(name, version)
+    with patch("app.pool.MODEL_POOL_ALLOWED", ["iris_classifier"]):
+        with pytest.raises(ValueError):
+            check_model_ref("random_forest_classifier", "1")
+
+
+@patch("app.main.verify_token")
+@patch("app.main.log_request")
+def test_predict_pooled_endpoint(mock_log, mock_verify_token):
+    pool = ModelPool(max_bytes=10_000, loader=CountingLoader())
+    features = {
+        "sepal_length": 5.1,
+        "sepal_width": 3.5,
+        "petal_length": 1.4,
+        "petal_width": 0.2,
+    }
+    with patch("app.main.model_pool", pool):
+        response = TestClient(app).post(
+            "/models/random_forest_classifier/3/predict", json=features
+        )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "model": "random_forest_classifier",
+        "version": "3",
+        "prediction": "random_forest_classifier:3",
+    }
+    kwargs = mock_log.call_args.kwargs
+    assert kwargs["model_name"] == "random_forest_classifier"
+    assert kwargs["model_version"] == "3"
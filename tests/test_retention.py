@@ -0,0 +1,182 @@
+import os
+import tempfile
+from datetime import date
+from unittest.mock import patch
+
+import pyarrow.parquet as pq
+import pytest
+from fastapi.testclient import TestClient
+
+from app.logger import LogWriter, SQLiteSink, list_partitions
+from app.metrics import metrics_router
+from app.retention import LogMaintenance, export_partition
+from app.storage import connect
+
+
+def make_row(day, status="success"):
+    return (
+        f"{day} 12:00:00",
+        "POST",
+        "/predict",
+        "{}",
+        "null",
+        status,
+        None,
+        "api",
+        None,
+        "Staging",
+        "iris_classifier",
+        "LOCAL",
+        "1",
+    )
+
+
+def write_rows(db_path, rows):
+    writer = LogWriter(db_path=db_path, flush_interval=0.01)
+    for row in rows:
+        writer.submit(row)
+    writer.stop()
+
+
+@pytest.fixture
+def db_path():
+    tmpdir = tempfile.mkdtemp()
+    yield os.path.join(tmpdir, "logs.db")
+
+
+def test_rows_are_partitioned_by_day_with_growing_ids(db_path):
+    write_rows(db_path, [make_row("2025-08-10")] * 3 + [make_row("2025-08-11")] * 2)
+    write_rows(db_path, [make_row("2025-08-10")])
+
+    db = connect(db_path)
+    assert list_partitions(db) == ["logs_20250811", "logs_20250810", "logs"]
+    ids = {
+        table: [r[0] for r in db.execute(f"SELECT id FROM {table} ORDER BY id")]
+        for table in ("logs_20250810", "logs_20250811")
+    }
+    # One id sequence across partitions, in insertion order
+    assert ids == {"logs_20250810": [1, 2, 3, 6], "logs_20250811": [4, 5]}
+
+
+def test_metrics_pages_across_partitions(db_path):
+    write_rows(
+        db_path,
+        [make_row("2025-08-10")] * 5
+        + [make_row("2025-08-11", "error")] * 3
+        + [make_row("2025-08-12")] * 4,
+    )
+    client = TestClient(metrics_router)
+
+    with patch("app.metrics.log_sink", SQLiteSink(db_path)):
+        body = client.get("/metrics", params={"limit": 5}).json()
+        assert [log["id"] for log in body["logs"]] == [12, 11, 10, 9, 8]
+        body = client.get(
+            "/metrics", params={"limit": 5, "cursor": body["next_cursor"]}
+        ).json()
+        assert [log["id"] for log in body["logs"]] == [7, 6, 5, 4, 3]
+        body = client.get("/metrics", params={"status": "error"}).json()
+        assert [log["id"] for log in body["logs"]] == [8, 7, 6]
+        body = client.get("/metrics", params={"limit": 3, "offset": 3}).json()
+        assert [log["id"] for log in body["logs"]] == [9, 8, 7]
+
+    assert body["total_requests"] == 12
+    assert body["log_storage"]["partitions"][0] == "logs_20250812"
+
+
+def test_maintenance_archives_expired_partitions(db_path):
+    write_rows(
+        db_path,
+        [make_row("2025-08-01")] * 4
+        + [make_row("2025-08-09", "error")] * 2
+        + [make_row("2025-08-10")] * 3,
+    )
+    archive_dir = os.path.join(os.path.dirname(db_path), "archive")
+    maintenance = LogMaintenance(
+        db_path=db_path, retention_days=1, archive_dir=archive_dir
+    )
+
+    # Today and the day before are kept
+    result = maintenance.run_once(today=date(2025, 8, 11))
+
+    assert result["rows"] == 4 + 2
+    assert sorted(os.listdir(archive_dir)) == [
+        "logs_20250801.parquet",
+        "logs_20250809.parquet",
+    ]
+    table = pq.read_table(os.path.join(archive_dir, "logs_20250809.parquet"))
+    assert table.column("status").to_pylist() == ["error", "error"]
+    assert table.column("id").to_pylist() == [5, 6]
+
+    db = connect(db_path)
+    assert list_partitions(db) == ["logs_20250810", "logs"]
+    # Counters still count archived rows
+    counters = dict(db.execute("SELECT name, count FROM log_counters"))
+    assert counters["total"] == 9
+    assert counters["status:error"] == 2
+
+    # Space of the dropped partitions is returned to the filesystem
+    assert db.execute("PRAGMA freelist_count").fetchone()[0] == 0
+
+    # Ids continue after the archived partitions
+    write_rows(db_path, [make_row("2025-08-11")])
+    assert db.execute("SELECT id FROM logs_20250811").fetchone()[0] == 10
+    assert maintenance.stats()["archived_partitions"] == 2
+
+
+def test_late_rows_are_archived_separately(db_path):
+    archive_dir = os.path.join(os.path.dirname(db_path), "archive")
+    maintenance = LogMaintenance(
+        db_path=db_path, retention_days=1, archive_dir=archive_dir
+    )
+    write_rows(db_path, [make_row("2025-08-01")])
+    maintenance.run_once(today=date(2025, 8, 11))
+    write_rows(db_path, [make_row("2025-08-01")])
+    maintenance.run_once(today=date(2025, 8, 11))
+
+    assert sorted(os.listdir(archive_dir)) == [
+        "logs_20250801.1.parquet",
+        "logs_20250801.parquet",
+    ]
+
+
+def test_old_archives_are_deleted(db_path):
+    archive_dir = os.path.join(os.path.dirname(db_path), "archive")
+    maintenance = LogMaintenance(
+        db_path=db_path,
+        retention_days=1,
+        archive_dir=archive_dir,
+        archive_retention_days=30,
+    )
+    write_rows(db_path, [make_row("2025-06-01"), make_row("2025-08-01")])
+
+    result = maintenance.run_once(today=date(2025, 8, 11))
+    assert result["deleted_archives"] == ["logs_20250601.parquet"]
+    assert os.listdir(archive_dir) == ["logs_20250801.parquet"]
+
+
+def test_maintenance_skips_when_another_process_holds_the_lock(db_path):
+    write_rows(db_path, [make_row("2025-08-01")])
+    maintenance = LogMaintenance(db_path=db_path, retention_days=1)
+    with patch("app.retention.fcntl.flock", side_effect=BlockingIOError):
+        assert maintenance.run_once(today=date(2025, 8, 11)) is None
+    assert "logs_20250801" in list_partitions(connect(db_path))
+
+
+def test_maintenance_keeps_partition_with_late_rows(db_path):
+    write_rows(db_path, [make_row("2025-08-01")])
+    archive_dir = os.path.join(os.path.dirname(db_path), "archive")
+    maintenance = LogMaintenance(
+        db_path=db_path, retention_days=1, archive_dir=archive_dir
+    )
+
+    def export_then_late_row(db, table, path):
+        exported = export_partition(db, table, path)
+        write_rows(db_path, [make_row("2025-08-01")])
+        return exported
+
+    with patch("app.retention.export_partition", side_effect=export_then_late_row):
+        result = maintenance.run_once(today=date(2025, 8, 11))
+
+    assert result["archived"] == []
+    assert os.listdir(archive_dir) == []
+    assert "logs_20250801" in list_partitions(connect(db_path))
@@ -0,0 +1,106 @@
+import threading
+
+import numpy as np
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.pool import ModelPool
+from app.rollout import CanarySplit, ShadowRunner
+
+
+class FixedModel:
+    def __init__(self, label, gate=None):
+        self.label = label
+        self.gate = gate
+
+    def predict(self, rows):
+        if self.gate is not None:
+            self.gate.wait(5)
+        return np.array([self.label] * len(rows))
+
+
+@pytest.fixture
+def features():
+    return {
+        "sepal_length": 5.1,
+        "sepal_width": 3.5,
+        "petal_length": 1.4,
+        "petal_width": 0.2,
+    }
+
+
+def pool_of(model):
+    return ModelPool(max_bytes=10**9, loader=lambda name, version: model)
+
+
+@pytest.mark.parametrize(
+    "candidate, status", [("setosa", "agree"), ("virginica", "disagree")]
+)
+@patch("app.rollout.log_request")
+def test_shadow_comparison_is_logged(mock_log, candidate, status, features):
+    runner = ShadowRunner(version="4", fraction=1.0, name="iris_classifier")
+    with patch("app.rollout.model_pool", pool_of(FixedModel(candidate))):
+        assert runner.maybe_submit(None, features, "setosa", 0.002)
+        runner.shutdown()
+
+    kwargs = mock_log.call_args.kwargs
+    assert kwargs["source"] == "shadow"
+    assert kwargs["status"] == status
+    assert kwargs["model_version"] == "4"
+    comparison = kwargs["prediction"]
+    assert comparison["primary"] == "setosa"
+    assert comparison["shadow"] == candidate
+    assert comparison["latency_delta_ms"] == pytest.approx(
+        comparison["shadow_ms"] - comparison["primary_ms"], abs=1e-3
+    )
+    assert runner.stats()["agreement_rate"] == (1.0 if status == "agree" else 0.0)
+
+
+@patch("app.rollout.log_request")
+def test_shadow_drops_when_saturated(mock_log, features):
+    gate = threading.Event()
+    runner = ShadowRunner(version="4", fraction=1.0, workers=1, max_pending=1)
+    with patch("app.rollout.model_pool", pool_of(FixedModel("setosa", gate))):
+        assert runner.maybe_submit(None, features, "setosa", 0.001)
+        assert not runner.maybe_submit(None, features, "setosa", 0.001)
+        gate.set()
+        runner.shutdown()
+    assert runner.stats()["dropped"] == 1
+    assert runner.stats()["agreed"] == 1
+
+
+@patch("app.rollout.log_request")
+def test_shadow_load_failure(mock_log, features):
+    def loader(name, version):
+        raise FileNotFoundError("no such version")
+
+    runner = ShadowRunner(version="9", fraction=1.0)
+    with patch("app.rollout.model_pool", ModelPool(loader=loader)):
+        runner.maybe_submit(None, features, "setosa", 0.001)
+        runner.shutdown()
+    assert mock_log.call_args.kwargs["status"] == "shadow_error"
+    assert runner.stats()["failed"] == 1
+
+
+def test_disabled_without_version():
+    assert not ShadowRunner(version=None, fraction=1.0).enabled
+    assert not CanarySplit(version=None, weight=1.0).pick()
+    assert not CanarySplit(version="2", weight=0.0).pick()
+    assert CanarySplit(version="2", weight=1.0).pick()
+
+
+@patch("app.main.verify_token")
+@patch("app.main.log_request")
+def test_canary_serves_weighted_share(mock_log, mock_verify_token, features):
+    canary = CanarySplit(version="5", weight=1.0)
+    with patch("app.main.canary_split", canary), patch(
+        "app.rollout.model_pool", pool_of(FixedModel("virginica"))
+    ):
+        response = TestClient(app).post("/predict", json=features)
+
+    assert response.status_code == 200
+    assert response.json() == {"prediction": "virginica"}
+    assert mock_log.call_args.kwargs["model_version"] == "5"
+    assert canary.stats()["routed"] == 1
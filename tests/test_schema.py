@@ -0,0 +1,162 @@
+import warnings
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.datasets import load_iris
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from app.fastpath import build_fast_path
+from app.main import app
+from app.manager import ServedModel
+from app.model import FEATURE_NAMES, load_model, with_schema
+from app.schema import FeatureSchema, SchemaMismatch, SchemaModel, field_name
+
+COLUMNS = ["SepalLengthCm", "SepalWidthCm", "PetalLengthCm", "PetalWidthCm"]
+
+client = TestClient(app)
+
+
+class PyfuncLike:
+    """Mimics mlflow's PyFuncModel with the schema in its MLmodel metadata."""
+
+    def __init__(self, estimator, schema):
+        self._model_impl = type("Wrapper", (), {"sklearn_model": estimator})()
+        self.metadata = SimpleNamespace(
+            model_uuid="abc", metadata={"feature_schema": schema.to_dict()}
+        )
+        self.estimator = estimator
+
+    def predict(self, rows):
+        return self.estimator.predict(pd.DataFrame(rows, columns=COLUMNS))
+
+
+@pytest.fixture(scope="module")
+def iris():
+    data = load_iris()
+    return pd.DataFrame(data.data, columns=COLUMNS), data.target
+
+
+@pytest.fixture(scope="module")
+def scaled_model(iris):
+    X, y = iris
+    scaler = StandardScaler().fit(X)
+    estimator = LogisticRegression(max_iter=500).fit(
+        pd.DataFrame(scaler.transform(X), columns=COLUMNS), y
+    )
+    return estimator, scaler, FeatureSchema.capture(X, scaler)
+
+
+def test_field_names():
+    assert [field_name(c) for c in COLUMNS] == FEATURE_NAMES
+    assert field_name("feature1") == "feature1"
+
+
+def test_capture_round_trip(scaled_model):
+    _, scaler, schema = scaled_model
+    restored = FeatureSchema.from_dict(schema.to_dict())
+    assert restored.names == COLUMNS and restored.fields == FEATURE_NAMES
+    assert restored.columns[2]["min"] == 1.0 and restored.columns[2]["max"] == 6.9
+    assert restored.scaler["mean"] == scaler.mean_.tolist()
+
+
+@pytest.mark.parametrize("fast_path", [False, True])
+def test_served_model_scales_like_training(iris, scaled_model, fast_path):
+    X, _ = iris
+    estimator, scaler, schema = scaled_model
+    model = PyfuncLike(estimator, schema)
+    with patch("app.model.resolve_model", return_value=model), patch(
+        "app.model.FAST_PATH", fast_path
+    ):
+        served = load_model()
+
+    assert isinstance(served, SchemaModel)
+    assert served.metadata.model_uuid == "abc"
+    expected = estimator.predict(pd.DataFrame(scaler.transform(X), columns=COLUMNS))
+    assert served.predict(X.to_numpy()).tolist() == expected.tolist()
+
+
+def test_feature_names_warning_is_silenced_only_in_predict(iris, scaled_model):
+    X, _ = iris
+    estimator, _, schema = scaled_model
+    served = SchemaModel(estimator, schema, FEATURE_NAMES)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        served.predict(X.to_numpy()[:3])
+        # Outside the served model the warning still reaches the caller
+        with pytest.raises(UserWarning, match="valid feature names"):
+            estimator.predict(X.to_numpy()[:3])
+
+
+def test_columns_are_reordered_to_training_order(iris):
+    X, y = iris
+    # Trained with the petal columns first
+    reordered = X[COLUMNS[2:] + COLUMNS[:2]]
+    estimator = LogisticRegression(max_iter=500).fit(reordered, y)
+    schema = FeatureSchema.capture(reordered)
+    served = with_schema(build_fast_path(PyfuncLike(estimator, schema)), schema)
+
+    # Rows arrive in FEATURE_NAMES (sepal first) order
+    assert served.predict(X.to_numpy()).tolist() == estimator.predict(
+        reordered
+    ).tolist()
+    low, high = served.bounds
+    assert low[0] < X["SepalLengthCm"].min() and high[0] > X["SepalLengthCm"].max()
+
+
+def test_mismatched_schema_is_rejected_at_load(iris, scaled_model):
+    estimator, _, schema = scaled_model
+    with pytest.raises(SchemaMismatch, match="request fields"):
+        SchemaModel(estimator, schema, ["a", "b", "c", "d"])
+
+    # The schema lists the columns in another order than the model was fit on
+    swapped = FeatureSchema.from_dict(schema.to_dict())
+    swapped = FeatureSchema(swapped.columns[::-1], swapped.scaler)
+    with pytest.raises(SchemaMismatch, match="fitted on columns"):
+        SchemaModel(estimator, swapped, FEATURE_NAMES)
+
+    with patch(
+        "app.model.resolve_model", return_value=PyfuncLike(estimator, swapped)
+    ), pytest.raises(SchemaMismatch):
+        load_model()
+
+
+def test_model_without_schema_is_served_as_is():
+    model = object()
+    assert with_schema(model, None) is model
+
+
+@patch("app.main.verify_token")
+def test_predict_rejects_features_outside_training_range(
+    mock_verify, iris, scaled_model
+):
+    estimator, _, schema = scaled_model
+    served = ServedModel(with_schema(PyfuncLike(estimator, schema), schema), "1")
+    body = {
+        "sepal_length": 5.1,
+        "sepal_width": 3.5,
+        "petal_length": 1.4,
+        "petal_width": 0.2,
+    }
+    with patch("app.main.model_manager.current", served), patch(
+        "app.main.PREDICT_BATCHING", False
+    ):
+        assert client.post("/predict", json=body).json() == {"prediction": 0}
+        response = client.post("/predict", json={**body, "petal_length": 40.0})
+
+        batch = client.post(
+            "/predict/batch", json=[[5.1, 3.5, 1.4, 0.2], [5.1, 3.5, 40.0, 0.2]]
+        )
+
+    assert response.status_code == 422
+    error = response.json()["detail"][0]
+    assert error["loc"] == ["body", "petal_length"]
+    assert error["msg"].startswith("Value must be between")
+    assert np.isclose(served.model.bounds[1][2], 6.9 + 0.5 * 5.9)
+    # Batches are held to the same ranges
+    assert batch.status_code == 422
+    assert "outside the model's range (first: [1])" in batch.json()["detail"]
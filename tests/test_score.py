@@ -0,0 +1,67 @@
+import json
+import os
+import tempfile
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from src.score import score_file
+
+
+class FirstFeatureModel:
+    def predict(self, rows):
+        return ["big" if row[0] > 5 else "small" for row in rows]
+
+
+@pytest.fixture
+def input_csv():
+    tmpdir = tempfile.mkdtemp()
+    path = os.path.join(tmpdir, "input.csv")
+    pd.DataFrame(
+        {
+            "Id": range(10),
+            "SepalLengthCm": [float(i) for i in range(10)],
+            "SepalWidthCm": [1.0] * 10,
+            "PetalLengthCm": [1.0] * 10,
+            "PetalWidthCm": [1.0] * 10,
+        }
+    ).to_csv(path, index=False)
+    return path
+
+
+@patch("src.score.load_model", return_value=FirstFeatureModel())
+def test_score_csv_in_chunks(mock_load, input_csv):
+    output = input_csv.replace("input.csv", "output.csv")
+
+    stats = score_file(input_csv, output, chunk_size=3, workers=0)
+
+    scored = pd.read_csv(output)
+    assert stats["rows"] == 10
+    assert scored["Id"].tolist() == list(range(10))
+    assert scored["prediction"].tolist() == ["small"] * 6 + ["big"] * 4
+
+
+@patch("src.score.load_model", return_value=FirstFeatureModel())
+def test_score_jsonl_with_process_pool(mock_load, input_csv):
+    jsonl_input = input_csv.replace(".csv", ".jsonl")
+    pd.read_csv(input_csv).to_json(jsonl_input, orient="records", lines=True)
+    output = input_csv.replace("input.csv", "output.jsonl")
+
+    stats = score_file(jsonl_input, output, chunk_size=4, workers=2)
+
+    with open(output) as f:
+        scored = [json.loads(line) for line in f]
+    assert stats["rows"] == 10
+    assert [row["Id"] for row in scored] == list(range(10))
+    assert scored[9]["prediction"] == "big"
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_missing_model_fails_without_output(input_csv, workers):
+    output = input_csv.replace("input.csv", "output.csv")
+
+    with patch("src.score.load_model", return_value=None):
+        with pytest.raises(SystemExit) as exc:
+            score_file(input_csv, output, workers=workers)
+
+    assert exc.value.code == 1
+    assert not os.path.exists(output)
@@ -0,0 +1,89 @@
+import json
+import pytest
+from unittest.mock import MagicMock
+from sklearn.datasets import load_iris
+
+from src.search import (
+    best_per_family,
+    candidates,
+    load_search_space,
+    log_trials,
+    run_search,
+)
+
+SMALL_SPACE = {
+    "logistic_regression": {"C": [0.1, 1.0, 10.0], "max_iter": [500]},
+    "random_forest_classifier": {"n_estimators": [5, 10], "max_depth": [2, None]},
+}
+
+
+@pytest.fixture(scope="module")
+def iris():
+    return load_iris(return_X_y=True)
+
+
+def test_candidates():
+    assert len(candidates(SMALL_SPACE, "grid")) == 7
+    # Sampling more than the grid holds yields each combination once
+    assert len(candidates(SMALL_SPACE, "random", n_iter=2)) == 4
+    with pytest.raises(ValueError):
+        candidates(SMALL_SPACE, "bayesian")
+
+
+def test_grid_search_in_parallel(iris):
+    X, y = iris
+    trials, stopped_early = run_search(X, y, "grid", SMALL_SPACE, cv=3, workers=2)
+
+    assert len(trials) == 7 and not stopped_early
+    assert sorted(t["trial"] for t in trials) == list(range(1, 8))
+    assert all(0 <= t["cv_mean"] <= 1 and t["n_samples"] == 150 for t in trials)
+    best = best_per_family(trials)
+    assert set(best) == set(SMALL_SPACE)
+
+
+def test_trial_budget_stops_early(iris):
+    X, y = iris
+    trials, stopped_early = run_search(
+        X, y, "grid", SMALL_SPACE, cv=3, workers=2, max_trials=3
+    )
+    assert len(trials) == 3 and stopped_early
+
+
+def test_successive_halving_narrows_candidates(iris):
+    X, y = iris
+    trials, _ = run_search(X, y, "halving", SMALL_SPACE, cv=3, workers=2)
+
+    rounds = sorted({t["round"] for t in trials})
+    per_round = [sum(t["round"] == r for t in trials) for r in rounds]
+    samples = [max(t["n_samples"] for t in trials if t["round"] == r) for r in rounds]
+    assert per_round[0] == 7 and per_round == sorted(per_round, reverse=True)
+    assert samples == sorted(samples) and samples[-1] == 150
+
+
+def test_log_trials_batches_requests():
+    trials = [
+        {
+            "trial": i,
+            "family": "logistic_regression",
+            "params": {"C": 1.0, "max_iter": 500},
+            "n_samples": 150,
+            "cv_mean": 0.9,
+            "cv_std": 0.01,
+            "fit_seconds": 0.1,
+        }
+        for i in range(1, 61)
+    ]
+    client = MagicMock()
+    calls = log_trials(client, "run-1", trials)
+
+    # 240 metrics fit one request, 180 params need two
+    assert calls == client.log_batch.call_count == 3
+    batches = client.log_batch.call_args_list
+    assert sum(len(c.kwargs.get("params") or []) for c in batches) == 180
+
+
+def test_load_search_space_rejects_unknown_family(tmp_path):
+    path = tmp_path / "space.json"
+    path.write_text(json.dumps({"svm": {"C": [1]}}))
+    with pytest.raises(ValueError):
+        load_search_space(str(path))
@@ -0,0 +1,56 @@
+import multiprocessing
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app import serve
+from app.health import HealthMonitor, health_router
+from app.main import app
+from app.manager import ServedModel
+
+
+class DummyModel:
+    def predict(self, rows):
+        return ["setosa"] * len(rows)
+
+
+def test_readiness_outside_prefork_mode():
+    assert serve.worker_readiness() is None
+    # No shared array, so these are no-ops
+    serve.mark_worker_ready()
+    serve.mark_worker_stopped()
+
+
+def test_mark_worker_ready_and_stopped():
+    ready = multiprocessing.Array("b", 3)
+    with patch.object(serve, "worker_ready", ready), patch.object(
+        serve, "worker_id", 1
+    ):
+        serve.mark_worker_ready()
+        assert serve.worker_readiness() == (1, 3)
+        serve.mark_worker_stopped()
+        assert serve.worker_readiness() == (0, 3)
+
+
+@patch("app.health.health_monitor", HealthMonitor(interval=0))
+@patch("app.health.worker_readiness", return_value=(1, 2))
+@patch("app.health.log_sink.read_pool")
+def test_health_warming_until_all_workers_ready(mock_pool, mock_readiness):
+    mock_conn = mock_pool.connection.return_value.__enter__.return_value
+    mock_conn.execute.return_value.fetchone.return_value = ("logs",)
+
+    with patch("app.health.model_manager.current", ServedModel(DummyModel(), "1")):
+        body = TestClient(health_router).get("/health").json()
+    assert body["status"] == "warming"
+    assert body["component"] == "workers"
+    assert body["detail"] == "1/2 workers ready"
+
+
+@patch("app.main.mark_worker_stopped")
+@patch("app.main.mark_worker_ready")
+def test_lifespan_marks_worker_ready(mock_ready, mock_stopped):
+    # The model is loaded and warmed at import, so startup only reports in
+    with TestClient(app):
+        mock_ready.assert_called_once()
+        mock_stopped.assert_not_called()
+    mock_stopped.assert_called_once()
@@ -0,0 +1,196 @@
+import json
+import os
+from unittest.mock import patch
+
+import pyarrow.parquet as pq
+import pytest
+from fastapi.testclient import TestClient
+
+from app.logger import LogWriter
+from app.metrics import metrics_router
+from app.sinks import FanoutSink, JsonlSink, LogSink, SegmentSink, reverse_lines
+
+
+def make_row(status="success", source="api"):
+    return (
+        "2025-08-11 12:00:00",
+        "POST",
+        "/predict",
+        "{}",
+        "null",
+        status,
+        None,
+        source,
+        None,
+        "Staging",
+        "iris_classifier",
+        "LOCAL",
+        "1",
+    )
+
+
+def rows(n, status="success", source="api"):
+    return [make_row(status, source)] * n
+
+
+def ids(logs):
+    return [log["id"] for log in logs]
+
+
+def test_jsonl_sink_appends_and_rotates(tmp_path):
+    sink = JsonlSink(str(tmp_path / "requests.jsonl"), max_bytes=2000)
+    for _ in range(6):
+        sink.write(rows(3) + rows(1, "error"))
+    sink.close()
+
+    rotated = sorted(p.name for p in tmp_path.glob("requests-*.jsonl"))
+    assert rotated and rotated[0].startswith("requests-000000000001-")
+    counters, logs = sink.read(limit=5)
+    assert counters == {"total": 24, "status:success": 18, "status:error": 6}
+    assert ids(logs) == [24, 23, 22, 21, 20]
+
+    # Pages continue across rotated files
+    _, older = sink.read(limit=10, cursor=20)
+    assert ids(older) == list(range(19, 9, -1))
+    _, errors = sink.read(status="error", limit=3)
+    assert ids(errors) == [24, 20, 16]
+
+
+def test_jsonl_sink_ids_continue_after_restart(tmp_path):
+    path = str(tmp_path / "requests.jsonl")
+    JsonlSink(path).write(rows(2))
+    os.remove(path + ".seq")
+    sink = JsonlSink(path)
+    sink.write(rows(1))
+    assert ids(sink.read()[1]) == [3, 2, 1]
+
+
+def test_jsonl_counts_skip_partial_last_line(tmp_path):
+    path = tmp_path / "requests.jsonl"
+    sink = JsonlSink(str(path))
+    sink.write(rows(2))
+    with open(path, "a") as f:
+        f.write('{"id": 3, "status": "succ')
+    counters, logs = sink.read()
+    assert counters["total"] == 2
+    assert ids(logs) == [2, 1]
+    assert [json.loads(line)["id"] for line in reverse_lines(path, 16)] == [2, 1]
+
+
+@pytest.mark.parametrize(
+    "policy, syncs", [("always", 3), ("interval", 0), ("never", 0)]
+)
+def test_jsonl_fsync_policy(tmp_path, policy, syncs):
+    sink = JsonlSink(
+        str(tmp_path / "requests.jsonl"), fsync=policy, fsync_interval=3600
+    )
+    with patch("app.sinks.os.fsync") as mock_fsync:
+        for _ in range(3):
+            sink.write(rows(2))
+    assert mock_fsync.call_count == syncs
+
+
+def test_segment_sink_buffers_then_writes_parquet(tmp_path):
+    sink = SegmentSink(str(tmp_path), segment_rows=10, segment_seconds=3600)
+    sink.write(rows(6))
+    assert sink.stats()["segments"] == 0
+    # Buffered rows are visible before their segment is written
+    assert ids(sink.read(limit=2)[1]) == [6, 5]
+
+    sink.write(rows(6, "error", "cli"))
+    sink.write(rows(3))
+    segment = tmp_path / "segment-000000000001-000000000012.parquet"
+    metadata = pq.ParquetFile(segment).metadata
+    assert metadata.num_rows == 12
+    assert metadata.row_group(0).column(1).compression == "ZSTD"
+
+    counters, logs = sink.read(source="cli", limit=4)
+    assert counters["total"] == 15 and counters["status:error"] == 6
+    assert ids(logs) == [12, 11, 10, 9]
+    assert ids(sink.read(limit=5, cursor=14)[1]) == [13, 12, 11, 10, 9]
+
+    sink.close()
+    assert sink.stats()["segments"] == 2 and sink.stats()["buffered_rows"] == 0
+    assert SegmentSink(str(tmp_path)).sequence.next(1) == 16
+
+
+def test_segment_sink_rolls_after_segment_seconds(tmp_path):
+    sink = SegmentSink(str(tmp_path), segment_rows=1000, segment_seconds=0)
+    sink.write(rows(2))
+    sink.poll()
+    assert [p.name for p in tmp_path.glob("*.parquet")] == [
+        "segment-000000000001-000000000002.parquet"
+    ]
+
+
+def test_failed_segment_is_retried_not_spilled(tmp_path):
+    sink = SegmentSink(str(tmp_path / "segments"), segment_rows=4)
+    spill_path = str(tmp_path / "spill.jsonl")
+    writer = LogWriter(sink=sink, backpressure="spill", spill_path=spill_path)
+
+    # _write marks queued rows as done
+    for row in rows(4):
+        writer.queue.put_nowait(row)
+    writer._write(rows(2))
+    with patch("pyarrow.parquet.write_table", side_effect=OSError("disk full")):
+        writer._write(rows(2))
+    # The rows stay buffered and the failure shows in the health check
+    assert writer.stats()["failed"] == 0 and not os.path.exists(spill_path)
+    assert sink.stats()["buffered_rows"] == 4
+    assert sink.stats()["segment_failures"] == 1
+    with pytest.raises(Exception, match="disk full"):
+        sink.check()
+
+    sink.poll()
+    sink.close()
+    counters, logs = sink.read(limit=10)
+    # Each row is written once
+    assert counters["total"] == 4 and ids(logs) == [4, 3, 2, 1]
+    sink.check()
+
+
+def test_segment_reads_merge_interleaved_ids(tmp_path):
+    # Two processes buffering at once write segments with interleaved ids
+    first = SegmentSink(str(tmp_path), segment_rows=4)
+    second = SegmentSink(str(tmp_path), segment_rows=4)
+    first.write(rows(2))
+    second.write(rows(4))
+    first.write(rows(2))
+    assert ids(first.read(limit=3)[1]) == [8, 7, 6]
+    assert ids(first.read(limit=3, offset=3)[1]) == [5, 4, 3]
+
+
+class FailingSink(LogSink):
+    name = "failing"
+
+    def write(self, rows):
+        raise OSError("disk full")
+
+
+def test_fanout_sink(tmp_path):
+    jsonl = JsonlSink(str(tmp_path / "requests.jsonl"))
+    fanout = FanoutSink([jsonl, FailingSink()])
+    fanout.write(rows(3))
+    assert fanout.read(limit=1)[0]["total"] == 3
+    assert fanout.stats()["failed_rows"] == {"failing": 3}
+
+    with pytest.raises(OSError):
+        FanoutSink([FailingSink(), jsonl]).write(rows(1))
+    # The other sinks are still written when the first one fails
+    assert jsonl.read()[0]["total"] == 4
+
+
+def test_writer_and_metrics_with_jsonl_sink(tmp_path):
+    sink = JsonlSink(str(tmp_path / "requests.jsonl"))
+    writer = LogWriter(sink=sink, batch_size=4, flush_interval=0.01)
+    for row in rows(7) + rows(3, "error"):
+        writer.submit(row)
+    writer.stop()
+    assert writer.stats()["written"] == 10
+
+    with patch("app.metrics.log_sink", sink):
+        body = TestClient(metrics_router).get("/metrics?status=error").json()
+    assert body["total_requests"] == 10
+    assert body["error_count"] == 3
+    assert ids(body["logs"]) == [10, 9, 8]
+    assert body["log_storage"]["sink"] == "jsonl"
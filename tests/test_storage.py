@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from app.storage import ConnectionPool, connect, get_pool
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "logs.db")
+    with connect(path) as db:
+        db.execute("CREATE TABLE t (x INTEGER)")
+    return path
+
+
+def test_write_connection_pragmas(db_path):
+    db = connect(db_path)
+    assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert db.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert db.execute("PRAGMA busy_timeout").fetchone()[0] > 0
+    assert db.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+
+
+def test_readonly_connection_rejects_writes(db_path):
+    db = connect(db_path, readonly=True)
+    with pytest.raises(sqlite3.OperationalError):
+        db.execute("INSERT INTO t VALUES (1)")
+    assert isinstance(db.execute("SELECT 1 AS one").fetchone(), sqlite3.Row)
+
+
+def test_reader_is_not_blocked_by_open_write_transaction(db_path):
+    writer = connect(db_path)
+    with writer:
+        writer.execute("INSERT INTO t VALUES (1)")
+    writer.execute("BEGIN IMMEDIATE")
+    writer.execute("INSERT INTO t VALUES (2)")
+
+    reader = connect(db_path, readonly=True)
+    reader.execute("PRAGMA busy_timeout=0")
+    # Readers see the last committed snapshot while the write is in flight
+    assert reader.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
+    writer.commit()
+    assert reader.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 2
+
+
+def test_pool_reuses_connections(db_path):
+    pool = ConnectionPool(db_path, size=2, readonly=True)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    assert pool.stats()["open"] == 1
+
+
+def test_pool_rolls_back_on_release(db_path):
+    pool = ConnectionPool(db_path)
+    with pool.connection() as db:
+        db.execute("BEGIN")
+        db.execute("INSERT INTO t VALUES (1)")
+    with pool.connection() as db:
+        assert not db.in_transaction
+        assert db.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+
+def test_pool_waits_for_a_free_connection(db_path):
+    pool = ConnectionPool(db_path, size=1, readonly=True)
+    acquired = []
+
+    with pool.connection() as db:
+        with pytest.raises(TimeoutError):
+            with pool.connection(timeout=0.01):
+                pass
+        thread = threading.Thread(
+            target=lambda: acquired.append(pool._acquire(timeout=5))
+        )
+        thread.start()
+    thread.join()
+
+    assert acquired == [db]
+    assert pool.stats()["waits"] == 2
+    assert pool.stats()["open"] == 1
+
+
+def test_pool_is_reset_in_forked_child(db_path):
+    pool = get_pool(db_path, readonly=True)
+    with pool.connection():
+        pass
+    assert pool.stats()["open"] == 1
+
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # Child: the inherited connection must not be handed out
+        os.write(write_end, str(pool.stats()["open"]).encode())
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read_end, 16) == b"0"
+    assert pool.stats()["open"] == 1
+
+
+def test_get_pool_is_shared_per_path_and_mode(db_path):
+    assert get_pool(db_path) is get_pool(db_path)
+    assert get_pool(db_path).size == 1
+    assert get_pool(db_path, readonly=True) is not get_pool(db_path)